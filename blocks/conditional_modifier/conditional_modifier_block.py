@@ -1,8 +1,13 @@
+from time import monotonic
+
 from nio.block.base import Block
+from nio.command import command
 from nio.signal.base import Signal
 from nio.properties import (StringProperty, PropertyHolder, BoolProperty,
                             Property, ListProperty, VersionProperty)
 
+from .latency import BlockLatency, carry_ingest_stamp
+
 
 class LookupProperty(PropertyHolder):
     formula = Property(default='{{True}}', title='Formula', order=0)
@@ -14,6 +19,7 @@ class SignalField(PropertyHolder):
     lookup = ListProperty(LookupProperty, title='Lookup', default=[], order=1)
 
 
+@command("latency")
 class ConditionalModifier(Block):
     """ Conditional Modifier block.
 
@@ -30,16 +36,22 @@ class ConditionalModifier(Block):
 
     fields = ListProperty(SignalField, title='Fields', default=[], order=0)
     exclude = BoolProperty(default=False, title='Exclude existing fields?')
-    version = VersionProperty("1.1.0")
+    version = VersionProperty("1.2.0")
+
+    def __init__(self):
+        super().__init__()
+        self._latency = BlockLatency()
 
     def process_signals(self, signals):
+        entered = monotonic()
         fresh_signals = []
 
         for signal in signals:
 
             # if we are including only the specified fields, create
             # a new, empty signal object
-            tmp = Signal() if self.exclude() else signal
+            tmp = carry_ingest_stamp([signal], Signal()) \
+                if self.exclude() else signal
 
             # iterate over the specified fields, evaluating the formula
             # in the context of the original signal
@@ -53,8 +65,13 @@ class ConditionalModifier(Block):
         if self.exclude:
             signals = fresh_signals
 
+        self._latency.record(signals, entered)
         self.notify_signals(signals)
 
+    def latency(self):
+        """ Command that returns the latency of signals stamped at ingest """
+        return self._latency.to_dict()
+
     def _evaluate_lookup(self, lookup, signal):
         for lu in lookup:
             value = lu.formula(signal)
@@ -1,7 +1,10 @@
+from time import monotonic
+
 from nio.block.terminals import DEFAULT_TERMINAL
 from nio.signal.base import Signal
 from nio.testing.block_test_case import NIOBlockTestCase
 from ..conditional_modifier_block import ConditionalModifier
+from ..latency import INGEST_ATTR
 
 
 class FlavorSignal(Signal):
@@ -176,3 +179,27 @@ class TestConditionalModifier(NIOBlockTestCase):
         blk.start()
         blk.process_signals(signals)
         self.assertEqual(len(self.last_notified[DEFAULT_TERMINAL]), 1)
+
+    def test_latency(self):
+        """Ingest stamps survive exclude and are recorded on the way out"""
+        stamped = FlavorSignal("banana")
+        setattr(stamped, INGEST_ATTR, monotonic() - 0.01)
+        blk = ConditionalModifier()
+        self.configure_block(blk, {
+            "exclude": True,
+            "fields": [{
+                "title": "greeting",
+                "lookup": [{"formula": "{{True}}", "value": "hi"}]
+            }]
+        })
+        blk.start()
+        blk.process_signals([stamped, FlavorSignal("apple")])
+        blk.stop()
+        notified = self.last_notified[DEFAULT_TERMINAL]
+        self.assertEqual(notified[0].to_dict(), {"greeting": "hi"})
+        self.assertEqual(getattr(notified[0], INGEST_ATTR),
+                         getattr(stamped, INGEST_ATTR))
+        latency = blk.latency()
+        self.assertEqual(latency['in_block']['count'], 1)
+        self.assertEqual(latency['since_ingest']['count'], 1)
+        self.assertGreaterEqual(latency['since_ingest']['max_ms'], 10)
@@ -0,0 +1,69 @@
+""" Compare the list based FrequencyTracker with the bucketed one at 10k
+batches/sec, reporting once a second over a 60 second averaging interval.
+
+Time is simulated, so this measures the cost of `record` and of a report
+at the steady state reached after the first interval. Run from the
+project root with:
+
+    python -m blocks.counter.benchmarks.bench_frequency_tracker
+
+"""
+import time
+from copy import copy
+from threading import Lock
+from unittest.mock import patch
+
+from .. import counter_fast_block
+from ..counter_fast_block import FrequencyTracker
+
+RATE = 10000
+PERIOD = 60
+
+
+class ListFrequencyTracker(object):
+
+    """ The original tracker: a tuple per batch, filtered on report """
+
+    def __init__(self, period=1):
+        self.signals = []
+        self._signals_lock = Lock()
+        self.period = period
+        self._start_time = counter_fast_block._time()
+
+    def record(self, count):
+        with self._signals_lock:
+            self.signals.append((counter_fast_block._time(), count))
+
+    def get_frequency(self):
+        with self._signals_lock:
+            ctime = counter_fast_block._time()
+            self.signals = [(ct, c) for (ct, c) in self.signals
+                            if ctime - ct < self.period]
+            signals = copy(self.signals)
+        total_count = sum([grp[1] for grp in signals])
+        return total_count / self.period
+
+
+def run(name, tracker_class, seconds=PERIOD * 2):
+    now = [0.0]
+    with patch.object(counter_fast_block, '_time', lambda: now[0]):
+        tracker = tracker_class(PERIOD)
+        record = report = 0.0
+        for second in range(seconds):
+            start = time.perf_counter()
+            for batch in range(RATE):
+                now[0] = second + batch / RATE
+                tracker.record(1)
+            record += time.perf_counter() - start
+            start = time.perf_counter()
+            frequency = tracker.get_frequency()
+            if second >= PERIOD:
+                report += time.perf_counter() - start
+    print("{:>8}: record {:>5.2f} us, report {:>8.1f} us, frequency "
+          "{:.0f}/sec".format(name, record / (seconds * RATE) * 1e6,
+                              report / (seconds - PERIOD) * 1e6, frequency))
+
+
+if __name__ == '__main__':
+    run('list', ListFrequencyTracker)
+    run('buckets', FrequencyTracker)
@@ -0,0 +1,53 @@
+""" Compare the throughput of counting under a single lock, as CounterFast
+does by default, with counting on per-thread stripes, from 1, 2, 4 and 8
+threads.
+
+Each thread adds 1 at a time and reads the count back once per batch of
+adds, like a block notifying the cumulative count of a batch of signals.
+A batch of 1 reads after every add. Threads only add in parallel where
+they can run on more than one core at once, so the core count is printed
+too. Run from the project root with:
+
+    python -m blocks.counter.benchmarks.bench_striped_counter
+
+"""
+import os
+import time
+from threading import Barrier, Thread
+
+from ..striped import LockedCounter, StripedCounter
+
+ADDS = 200000
+BATCHES = (1, 100)
+
+
+def run(counter, threads, batch):
+    barrier = Barrier(threads + 1)
+
+    def add():
+        barrier.wait()
+        for i in range(1, ADDS + 1):
+            counter.add(1)
+            if i % batch == 0:
+                counter.value()
+
+    workers = [Thread(target=add) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    assert counter.value() == threads * ADDS
+    return threads * ADDS / elapsed
+
+
+if __name__ == '__main__':
+    print("{} cores, adds/sec".format(os.cpu_count()))
+    for batch in BATCHES:
+        print("read every {} adds".format(batch))
+        for threads in (1, 2, 4, 8):
+            print("  {} threads: lock {:>10.0f}, striped {:>10.0f}".format(
+                threads, run(LockedCounter(), threads, batch),
+                run(StripedCounter(), threads, batch)))
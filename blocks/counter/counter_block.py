@@ -1,5 +1,8 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from enum import Enum
+from threading import Lock
+from time import monotonic
 
 from nio.block.base import Block
 from nio.signal.base import Signal
@@ -11,6 +14,10 @@ from nio.block.mixins.enrich.enrich_signals import EnrichSignals
 from nio.block.mixins.group_by.group_by import GroupBy
 from nio.block.mixins.persistence.persistence import Persistence
 
+from .latency import BlockLatency, carry_ingest_stamp
+from .striped import LockedCounter, StripedCounter
+from .windows import GroupWindow
+
 
 class ResetScheme(Enum):
     INTERVAL = 0
@@ -31,6 +38,30 @@ class ResetInfo(PropertyHolder):
     interval = TimeDeltaProperty(title='Reset Interval', default=timedelta(0))
 
 
+class WindowMode(Enum):
+    TUMBLING = 0
+    SLIDING = 1
+
+
+class WindowInfo(PropertyHolder):
+    windowing = BoolProperty(title='Count in Windows', default=False)
+    mode = SelectProperty(WindowMode, default=WindowMode.SLIDING,
+                          title='Window Mode')
+    length = TimeDeltaProperty(title='Window Length',
+                               default={"seconds": 60})
+    rates = BoolProperty(title='Moving Average Rates', default=False)
+
+
+class GroupLimits(PropertyHolder):
+    max_groups = IntProperty(title='Max Groups', default=0)
+    idle_ttl = TimeDeltaProperty(title='Idle Time to Live',
+                                 default=timedelta(0))
+    notify_evicted = BoolProperty(title='Notify Evicted Groups',
+                                  default=False)
+
+
+@command("evictions")
+@command("latency")
 @command("reset")
 class Counter(EnrichSignals, Persistence, GroupBy, Block):
 
@@ -50,21 +81,111 @@ class Counter(EnrichSignals, Persistence, GroupBy, Block):
                 which the counter should be reset. Corresponds to CRON mode.
             interval (timedelta): The interval at which the counter should
                 be reset. Corresponds to INTERVAL mode.
+        window_info (WindowInfo):
+            windowing (bool): Does each count include a windowed count?
+            mode (WindowMode): Whether windows tumble or slide
+            length (timedelta): The length of each window.
+            rates (bool): Does each count include 1, 5 and 15 minute
+                moving average rates?
+        group_limits (GroupLimits):
+            max_groups (int): The most groups counted at once, the least
+                recently counted are evicted past it. Zero for no limit.
+            idle_ttl (timedelta): How long a group can go uncounted before
+                it is evicted. Zero to never evict idle groups.
+            notify_evicted (bool): Notify a final count for each group
+                evicted?
+        striped (bool): Does each thread add to its own count of a group,
+            summed when the count is read, instead of adding under a lock?
 
     """
     reset_info = ObjectProperty(ResetInfo, title='Reset Info',
                                 default=ResetInfo())
-    version = VersionProperty("0.1.1")
+    window_info = ObjectProperty(WindowInfo, title='Window Info',
+                                 default=WindowInfo(), advanced=True)
+    group_limits = ObjectProperty(GroupLimits, title='Group Limits',
+                                  default=GroupLimits(), advanced=True)
+    striped = BoolProperty(title='Per-Thread Counts', default=False,
+                           advanced=True)
+    version = VersionProperty("0.2.0")
 
     def __init__(self):
         super().__init__()
-        self._cumulative_count = {}
+        self._counters = {}
+        self._counter_type = LockedCounter
+        # guards adding and removing groups, and their recency
+        self._counters_lock = Lock()
+        self._windows = {}
+        self._windowing = False
+        # when each group was last counted, least recently first
+        self._last_counted = OrderedDict()
+        self._evictions = {"max_groups": 0, "idle": 0}
+        self._evict_job = None
         self._reset_job = None
         self._last_reset = None
+        self._latency = BlockLatency()
+
+    def configure(self, context):
+        super().configure(context)
+        if self.striped():
+            self._counter_type = StripedCounter
+            # counts set before now, such as persisted ones, are carried over
+            self._cumulative_count = self._cumulative_count
+        self._windowing = self.window_info().windowing() or \
+            self.window_info().rates()
+        # groups loaded from persistence are idle from now
+        now = monotonic()
+        for key in self._groups:
+            self._last_counted[key] = now
 
     def start(self):
         if self.reset_info().resetting():
             self._schedule_reset()
+        idle_ttl = self.group_limits().idle_ttl()
+        if idle_ttl.total_seconds() > 0:
+            # idle groups are evicted within a tenth of the TTL
+            self._evict_job = Job(self._evict_idle, idle_ttl / 10, True)
+
+    def stop(self):
+        if self._evict_job is not None:
+            self._evict_job.cancel()
+            self._evict_job = None
+        super().stop()
+
+    @property
+    def _cumulative_count(self):
+        """ The cumulative count of each group """
+        return {key: counter.value()
+                for key, counter in list(self._counters.items())}
+
+    @_cumulative_count.setter
+    def _cumulative_count(self, counts):
+        self._counters = {key: self._counter_type(count)
+                          for key, count in counts.items()}
+
+    def _counter(self, key):
+        """ The counter of a group, created the first time it is counted """
+        try:
+            return self._counters[key]
+        except KeyError:
+            with self._counters_lock:
+                return self._counters.setdefault(key, self._counter_type())
+
+    def _window(self, key):
+        """ The windowed count of a group, created the first time it is
+        counted.
+
+        """
+        try:
+            return self._windows[key]
+        except KeyError:
+            window_info = self.window_info()
+            window = GroupWindow(
+                window_info.length().total_seconds()
+                if window_info.windowing() else None,
+                window_info.mode() == WindowMode.SLIDING,
+                window_info.rates())
+            with self._counters_lock:
+                return self._windows.setdefault(key, window)
 
     def persisted_values(self):
         """Persist values with block mixin"""
@@ -146,7 +267,16 @@ class Counter(EnrichSignals, Persistence, GroupBy, Block):
         return date
 
     def process_signals(self, signals):
-        self.notify_signals(self.for_each_group(self.process_group, signals))
+        entered = monotonic()
+        counts = self.for_each_group(self._count_group, signals)
+        self._latency.record(counts, entered)
+        self.notify_signals(counts + self._evict_groups())
+
+    def _count_group(self, signals, key):
+        with self._counters_lock:
+            self._last_counted[key] = monotonic()
+            self._last_counted.move_to_end(key)
+        return self.process_group(signals, key)
 
     def process_group(self, signals, key):
         """ Executed on each group of incoming signal objects.
@@ -166,14 +296,19 @@ class Counter(EnrichSignals, Persistence, GroupBy, Block):
         self.logger.debug(
             "Ready to process {} signals in group {}".format(count, key)
         )
-        self._cumulative_count[key] = self._cumulative_count.get(key, 0)
-        self._cumulative_count[key] += count
-        enriched_signal = self.get_output_signal({
+        counter = self._counter(key)
+        counter.add(count)
+        cumulative_count = counter.value()
+        attrs = {
             "count": count,
-            "cumulative_count": self._cumulative_count[key],
+            "cumulative_count": cumulative_count,
             "group": key
-        }, signals[0])
-        return [enriched_signal]
+        }
+        if self._windowing:
+            attrs.update(self._window(key).add(count))
+        enriched_signal = self.get_output_signal(attrs, signals[0])
+        # a count is as old as the oldest signal it counted
+        return [carry_ingest_stamp(signals, enriched_signal)]
 
     def _get_count_from_signals(self, signals):
         """ Get the count we want given a list of signals.
@@ -197,18 +332,74 @@ class Counter(EnrichSignals, Persistence, GroupBy, Block):
         self.notify_signals(self.for_each_group(self.reset_group))
         self._last_reset = datetime.utcnow()
 
+    def latency(self):
+        """ Command that returns the latency of signals stamped at ingest """
+        return self._latency.to_dict()
+
+    def evictions(self):
+        """ Command that returns how many groups were evicted, by reason """
+        return dict(self._evictions, groups=len(self._groups))
+
+    def _evict_idle(self):
+        signals = self._evict_groups()
+        if signals:
+            self.notify_signals(signals)
+
+    def _evict_groups(self):
+        """ Evict the least recently counted groups past `max_groups` and
+        the groups idle for longer than `idle_ttl`.
+
+        Returns:
+            list(Signal): The final counts of the evicted groups to notify,
+                if notifying them.
+
+        """
+        max_groups = self.group_limits().max_groups()
+        idle_ttl = self.group_limits().idle_ttl().total_seconds()
+        if max_groups <= 0 and idle_ttl <= 0:
+            return []
+        now = monotonic()
+        evicted = []
+        with self._counters_lock:
+            while self._last_counted:
+                key, last_counted = next(iter(self._last_counted.items()))
+                if 0 < max_groups < len(self._last_counted):
+                    self._evictions["max_groups"] += 1
+                elif 0 < idle_ttl < now - last_counted:
+                    self._evictions["idle"] += 1
+                else:
+                    break
+                del self._last_counted[key]
+                evicted.append(key)
+
+        signals = []
+        for key in evicted:
+            self.logger.debug("Evicting group {}".format(key))
+            self._groups.discard(key)
+            signals.extend(self._evict_group(key))
+        return signals if self.group_limits().notify_evicted() else []
+
+    def _evict_group(self, key):
+        """ Forget a group, returning the signals with its final count """
+        with self._counters_lock:
+            counter = self._counters.pop(key, None)
+            self._windows.pop(key, None)
+        return [Signal({
+            "count": 0,
+            "cumulative_count": counter.value() if counter is not None else 0,
+            "group": key,
+            "evicted": True
+        })]
+
     def reset_group(self, key):
+        # set the cumulative count back to zero, taking its count at reset
+        cumulative_count = self._counter(key).reset()
         self.logger.debug(
-            "Resetting the Counter ({}:{})".format(
-                key, self._cumulative_count[key])
+            "Resetting the Counter ({}:{})".format(key, cumulative_count)
         )
-        signal = Signal({
+        # send the signal with the counts at reset time
+        return [Signal({
             "count": 0,
-            "cumulative_count": self._cumulative_count[key],
+            "cumulative_count": cumulative_count,
             "group": key
-        })
-
-        # set the cumulative count, last reset, and write both to disk
-        self._cumulative_count[key] = 0
-        # finally, send the signal with the counts at reset time
-        return [signal]
+        })]
@@ -1,4 +1,4 @@
-from copy import copy
+from math import ceil
 from time import time as _time
 from threading import Lock
 
@@ -6,9 +6,11 @@ from nio.block.base import Block
 from nio.command import command
 from nio.signal.base import Signal
 from nio.properties import BoolProperty, TimeDeltaProperty, \
-    PropertyHolder, ObjectProperty, VersionProperty
+    PropertyHolder, ObjectProperty, VersionProperty, ListProperty
 from nio.modules.scheduler import Job
 
+from .striped import LockedCounter, StripedCounter
+
 
 def total_seconds(interval):
     return (interval.days * 24 * 60 * 60 +
@@ -18,25 +20,44 @@ def total_seconds(interval):
 class FrequencyTracker(object):
     """ Helper class for tracking the frequency of incoming signals
 
+    Counts are added to a fixed ring of time buckets, each a tenth of the
+    shortest period wide, so recording is O(1) and a report only sums the
+    buckets, however many signals arrive. Frequencies are accurate to
+    within a bucket's width of each period.
+
     Args:
         period (int): The period (in seconds) over which to calculate
             signal frequencies.
+        windows (list(float)): Other periods (in seconds) to calculate
+            frequencies over along with `period`.
 
     """
     version = VersionProperty("0.1.1")
+    buckets_per_period = 10
 
-    def __init__(self, period=1):
-        self.signals = []
-        self._signals_lock = Lock()
+    def __init__(self, period=1, windows=()):
         self.period = period
+        self.windows = sorted(set([period] + list(windows)))
+        self._width = self.windows[0] / self.buckets_per_period
+        self._size = int(ceil(self.windows[-1] / self._width)) + 1
+        self._counts = [0] * self._size
+        # the bucket number each slot of the ring is counting
+        self._buckets = [None] * self._size
+        self._signals_lock = Lock()
         self._start_time = _time()
 
     def record(self, count):
         """ Record a signal count.
 
         """
+        bucket = int(_time() / self._width)
+        slot = bucket % self._size
         with self._signals_lock:
-            self.signals.append((_time(), count))
+            if self._buckets[slot] != bucket:
+                # the slot last counted a bucket that has left the ring
+                self._buckets[slot] = bucket
+                self._counts[slot] = 0
+            self._counts[slot] += count
 
     def get_frequency(self):
         """ Calculate and return the signal frequency.
@@ -45,22 +66,39 @@ class FrequencyTracker(object):
         and find the frequency.
 
         """
-        ctime = None
-        # update signals to only include ones that are inside of the
-        # current period
-        with self._signals_lock:
-            ctime = _time()
-            self.signals = [(ct, c) for (ct, c) in self.signals
-                            if ctime - ct < self.period]
-            signals = copy(self.signals)
+        return self.get_frequencies()[self.period]
+
+    def get_frequencies(self):
+        """ Calculate the signal frequency over each period at once.
 
-        total_count = sum([grp[1] for grp in signals])
+        Returns:
+            dict: Signals per second keyed by period in seconds.
+
+        """
+        ctime = _time()
+        current = int(ctime / self._width)
+        with self._signals_lock:
+            # each count with how many buckets ago it was recorded
+            counts = [(current - bucket, count) for bucket, count
+                      in zip(self._buckets, self._counts)
+                      if bucket is not None and
+                      0 <= current - bucket < self._size]
         uptime = ctime - self._start_time
 
-        if uptime < self.period:
-            return total_count / uptime
+        frequencies = {}
+        for window in self.windows:
+            n_buckets = round(window / self._width)
+            total_count = sum(count for age, count in counts
+                              if age < n_buckets)
+            if uptime < window:
+                frequencies[window] = total_count / uptime
+            else:
+                frequencies[window] = total_count / window
+        return frequencies
+
 
-        return total_count / self.period
+class FrequencyWindow(PropertyHolder):
+    interval = TimeDeltaProperty(default={"seconds": 60}, title="Interval")
 
 
 class Frequency(PropertyHolder):
@@ -72,6 +110,8 @@ class Frequency(PropertyHolder):
             report the frequency.
         averaging_interval (timedelta): The period over which
             frequencies are calculated.
+        windows (list(FrequencyWindow)): Other periods to calculate
+            frequencies over in the same report.
 
     """
     enabled = BoolProperty(default=False, title="Report Frequency?")
@@ -79,24 +119,30 @@ class Frequency(PropertyHolder):
                                         title="Report Interval")
     averaging_interval = TimeDeltaProperty(default={"seconds": 5},
                                            title="Averaging Interval")
+    windows = ListProperty(FrequencyWindow, default=[],
+                           title="Additional Averaging Intervals")
 
 
 @command("value")
 @command("reset")
 class CounterFast(Block):
 
-    version = VersionProperty("0.1.1")
+    version = VersionProperty("0.2.0")
     frequency = ObjectProperty(
         Frequency, title="Report Freqency", default=Frequency())
+    striped = BoolProperty(default=False, title="Per-Thread Counts",
+                           advanced=True)
 
     def configure(self, context):
         super().configure(context)
-        self._cumulative_count = 0
-        self._cumulative_count_lock = Lock()
+        self._counter = StripedCounter() if self.striped() \
+            else LockedCounter()
 
         if self.frequency().enabled():
             self._tracker = FrequencyTracker(
-                total_seconds(self.frequency().averaging_interval()))
+                total_seconds(self.frequency().averaging_interval()),
+                [total_seconds(window.interval())
+                 for window in self.frequency().windows()])
 
     def start(self):
         if self.frequency().enabled():
@@ -107,11 +153,10 @@ class CounterFast(Block):
         count = len(signals)
         self.logger.debug("Ready to process {} signals".format(count))
 
-        with self._cumulative_count_lock:
-            if self.frequency().enabled():
-                self._tracker.record(count)
-            self._cumulative_count += count
-            cumulative_count = self._cumulative_count
+        if self.frequency().enabled():
+            self._tracker.record(count)
+        self._counter.add(count)
+        cumulative_count = self._counter.value()
         signal = Signal({
             "count": count,
             "cumulative_count": cumulative_count,
@@ -120,7 +165,15 @@ class CounterFast(Block):
 
     def report_frequency(self):
         self.logger.debug("Reporting signal frequency")
-        signal = Signal({"count_frequency": self._tracker.get_frequency()})
+        frequencies = self._tracker.get_frequencies()
+        signal = Signal({
+            "count_frequency": frequencies[self._tracker.period]
+        })
+        if self.frequency().windows():
+            signal.count_frequencies = {
+                "{:g}s".format(window): frequency
+                for window, frequency in frequencies.items()
+            }
         self.notify_signals([signal])
 
     def stop(self):
@@ -130,10 +183,13 @@ class CounterFast(Block):
             pass
         super().stop()
 
+    @property
+    def _cumulative_count(self):
+        return self._counter.value()
+
     def reset(self):
-        with self._cumulative_count_lock:
-            self._cumulative_count = 0
+        self._counter.reset()
         return True
 
     def value(self):
-        return self._cumulative_count
+        return self._counter.value()
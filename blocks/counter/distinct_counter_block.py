@@ -0,0 +1,146 @@
+from threading import Lock
+
+from nio.command import command
+from nio.command.params.base import Parameter
+from nio.properties import IntProperty, Property, VersionProperty
+from nio.signal.base import Signal
+from nio.types.base import Type
+
+from .counter_block import Counter
+from .hyperloglog import HyperLogLog
+from .latency import carry_ingest_stamp
+
+
+@command("distinct_count", Parameter(Type, "group", allow_none=True))
+class DistinctCounter(Counter):
+
+    """ A block that estimates how many distinct values it has seen.
+
+    Each group keeps a HyperLogLog sketch of the values, so memory stays
+    at `2 ** precision` bytes per group however many values there are.
+    Resetting and persistence work as they do for the Counter, with the
+    sketch registers persisted in place of the counts.
+
+    Properties:
+        value_expr (Property): The value of each signal to count.
+        precision (int): From 4 to 16, each group's sketch uses
+            2 ** precision bytes and estimates within about
+            1.04 / sqrt(2 ** precision).
+
+    """
+    version = VersionProperty("0.1.0")
+    value_expr = Property(
+        title='Value', default='{{ $value }}', allow_none=True)
+    precision = IntProperty(title='Precision', default=14, advanced=True)
+
+    def __init__(self):
+        super().__init__()
+        self._sketches = {}
+        self._sketches_lock = Lock()
+
+    def configure(self, context):
+        super().configure(context)
+        # fail on a precision out of range before any signals are counted
+        HyperLogLog(self.precision())
+        for key, sketch in list(self._sketches.items()):
+            if sketch.precision != self.precision():
+                self.logger.warning(
+                    "Dropping the persisted sketch of group {}, it was made "
+                    "at precision {}".format(key, sketch.precision))
+                del self._sketches[key]
+
+    @property
+    def _registers(self):
+        """ The sketch registers of each group """
+        with self._sketches_lock:
+            return {key: sketch.to_bytes()
+                    for key, sketch in self._sketches.items()}
+
+    @_registers.setter
+    def _registers(self, registers):
+        # sketches are as long as their precision needs
+        self._sketches = {
+            key: HyperLogLog(len(value).bit_length() - 1, value)
+            for key, value in registers.items()}
+
+    def persisted_values(self):
+        """Persist values with block mixin"""
+        return ["_registers", "_last_reset", "_groups"]
+
+    def process_group(self, signals, key):
+        """ Add the value of each signal to the group's sketch and notify
+        the group's distinct count.
+
+        """
+        values = []
+        for signal in signals:
+            try:
+                value = self.value_expr(signal)
+            except Exception:
+                self.logger.warning(
+                    "Unable to determine value for {}".format(signal))
+                continue
+            if value is not None:
+                values.append(value)
+
+        with self._sketches_lock:
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = HyperLogLog(self.precision())
+            for value in values:
+                sketch.add(value)
+            distinct_count = round(sketch.count())
+
+        enriched_signal = self.get_output_signal({
+            "count": len(values),
+            "distinct_count": distinct_count,
+            "group": key
+        }, signals[0])
+        # a count is as old as the oldest signal it counted
+        return [carry_ingest_stamp(signals, enriched_signal)]
+
+    def reset_group(self, key):
+        with self._sketches_lock:
+            sketch = self._sketches.pop(key, None)
+        distinct_count = round(sketch.count()) if sketch is not None else 0
+        self.logger.debug(
+            "Resetting the DistinctCounter ({}:{})".format(key, distinct_count)
+        )
+        # send the signal with the distinct count at reset time
+        return [Signal({
+            "count": 0,
+            "distinct_count": distinct_count,
+            "group": key
+        })]
+
+    def _evict_group(self, key):
+        with self._sketches_lock:
+            sketch = self._sketches.pop(key, None)
+        return [Signal({
+            "count": 0,
+            "distinct_count":
+                round(sketch.count()) if sketch is not None else 0,
+            "group": key,
+            "evicted": True
+        })]
+
+    def distinct_count(self, group=None):
+        """ Command that returns the distinct count of a group, or of the
+        values of every group together when no group is given.
+
+        """
+        with self._sketches_lock:
+            if group is not None:
+                sketch = self._sketches.get(group)
+                return {
+                    "group": group,
+                    "distinct_count":
+                        round(sketch.count()) if sketch is not None else 0
+                }
+            merged = HyperLogLog(self.precision())
+            for sketch in self._sketches.values():
+                merged.merge(sketch)
+            return {
+                "groups": len(self._sketches),
+                "distinct_count": round(merged.count())
+            }
@@ -0,0 +1,112 @@
+import heapq
+from array import array
+from hashlib import blake2b
+from itertools import count as _sequence
+
+
+class CountMinSketch(object):
+    """ Estimates how often each item was added in `width * depth`
+    counters, however many distinct items there are.
+
+    Each row hashes an item to one of its counters, and the estimate is
+    the smallest of an item's counters, which never undercounts. Adding
+    only raises an item's counters as far as its new estimate
+    (conservative update), which keeps overcounts from collisions down.
+    An estimate overcounts by at most `e / width` of the total added with
+    probability `1 - exp(-depth)`.
+
+    Args:
+        width (int): Counters in each row.
+        depth (int): Rows, each with its own hash.
+
+    """
+
+    def __init__(self, width=2048, depth=4):
+        self.width = max(1, width)
+        self.depth = max(1, depth)
+        self._rows = [array('q', [0]) * self.width for _ in range(self.depth)]
+
+    def add(self, item, count=1):
+        """ Add a count of an item and return its estimate after adding """
+        indexes = self._indexes(item)
+        estimate = min(row[i] for row, i in zip(self._rows, indexes)) + count
+        for row, i in zip(self._rows, indexes):
+            if row[i] < estimate:
+                row[i] = estimate
+        return estimate
+
+    def estimate(self, item):
+        return min(row[i] for row, i in zip(self._rows, self._indexes(item)))
+
+    def _indexes(self, item):
+        # two hashes combined give each row its own
+        digest = blake2b(str(item).encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big')
+        return [(first + row * second) % self.width
+                for row in range(self.depth)]
+
+
+class SpaceSaving(object):
+    """ Keeps the `capacity` most frequent items of a stream, using a
+    count-min sketch to count the items it is not keeping.
+
+    Items kept are counted exactly from when they were taken in. When a
+    new item arrives and every place is taken, the least counted item is
+    evicted and the new one takes its place, counted from the lower of
+    its count-min estimate and the evicted count plus its own count. The
+    difference from its true count is bounded by its `error`, and any
+    item added more than `total / capacity` times is always kept.
+
+    Args:
+        capacity (int): The most items kept.
+        sketch (CountMinSketch): Counts every item added.
+
+    """
+
+    def __init__(self, capacity=100, sketch=None):
+        self.capacity = max(1, capacity)
+        self.sketch = sketch if sketch is not None else CountMinSketch()
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        # (count, sequence, item) as each item was last known to be
+        # counted, the sequence breaks ties between items that can't be
+        # compared
+        self._heap = []
+        self._sequence = _sequence()
+
+    def add(self, item, count=1):
+        self.total += count
+        estimate = self.sketch.add(item, count)
+        if item in self._counts:
+            self._counts[item] += count
+            return
+        if len(self._counts) < self.capacity:
+            self._keep(item, estimate, estimate - count)
+            return
+        evicted = self._evict()
+        admitted = min(estimate, evicted + count)
+        self._keep(item, admitted, admitted - count)
+
+    def top(self, k):
+        """ The `k` most counted items, as (item, count, error) tuples """
+        return [(item, count, self._errors[item]) for item, count in
+                heapq.nlargest(k, self._counts.items(), key=lambda i: i[1])]
+
+    def _keep(self, item, count, error):
+        self._counts[item] = count
+        self._errors[item] = error
+        heapq.heappush(self._heap, (count, next(self._sequence), item))
+
+    def _evict(self):
+        """ Evict the least counted item and return its count """
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            current = self._counts[item]
+            if current == count:
+                del self._counts[item]
+                del self._errors[item]
+                return count
+            # counted since it was pushed, push it back as it is now
+            heapq.heappush(self._heap, (current, next(self._sequence), item))
@@ -0,0 +1,92 @@
+from hashlib import blake2b
+from math import log
+
+# 2 ** -rank for every rank a register can hold
+_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+class HyperLogLog(object):
+    """ Estimates how many distinct values were added in a fixed amount of
+    memory, one byte for each of `2 ** precision` registers.
+
+    Each value is hashed to 64 bits. The first `precision` bits pick a
+    register, which keeps the most leading zeros plus one seen in the
+    rest. The standard error of the estimate is about
+    `1.04 / sqrt(2 ** precision)`, so 0.8% at the default precision of 14
+    in 16KB. The sum the estimate is made from is kept up to date as
+    registers change, so adding and counting are both O(1).
+
+    Hashes are stable across processes, so sketches can be persisted, and
+    sketches of the same precision merged to estimate the distinct values
+    of their union.
+
+    Args:
+        precision (int): From 4 to 16, the bits of each hash used to pick
+            a register.
+        registers (bytes): Registers to start from, as returned by
+            `to_bytes`.
+
+    """
+    min_precision = 4
+    max_precision = 16
+
+    def __init__(self, precision=14, registers=None):
+        if not self.min_precision <= precision <= self.max_precision:
+            raise ValueError(
+                "HyperLogLog precision must be from {} to {}, not {}".format(
+                    self.min_precision, self.max_precision, precision))
+        self.precision = precision
+        self._m = 1 << precision
+        self._rest = 64 - precision
+        self._rest_mask = (1 << self._rest) - 1
+        self._alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(
+            self._m, 0.7213 / (1 + 1.079 / self._m))
+        if registers is None:
+            self._registers = bytearray(self._m)
+        elif len(registers) != self._m:
+            raise ValueError(
+                "Expected {} registers for precision {}, not {}".format(
+                    self._m, precision, len(registers)))
+        else:
+            self._registers = bytearray(registers)
+        self._sum_registers()
+
+    def add(self, value):
+        """ Add a value, hashed by its string """
+        h = int.from_bytes(
+            blake2b(str(value).encode('utf-8'), digest_size=8).digest(),
+            'big')
+        index = h >> self._rest
+        rank = self._rest - (h & self._rest_mask).bit_length() + 1
+        register = self._registers[index]
+        if rank > register:
+            self._registers[index] = rank
+            self._sum += _POWERS[rank] - _POWERS[register]
+            if not register:
+                self._zeros -= 1
+
+    def count(self):
+        """ Estimate the number of distinct values added """
+        m = self._m
+        estimate = self._alpha * m * m / self._sum
+        if estimate <= 2.5 * m and self._zeros:
+            # few registers are set yet, linear counting is more accurate
+            return m * log(m / self._zeros)
+        return estimate
+
+    def merge(self, other):
+        """ Add every value added to another sketch of the same precision """
+        if other.precision != self.precision:
+            raise ValueError(
+                "Cannot merge a sketch of precision {} into one of {}".format(
+                    other.precision, self.precision))
+        self._registers = bytearray(
+            map(max, self._registers, other._registers))
+        self._sum_registers()
+
+    def to_bytes(self):
+        return bytes(self._registers)
+
+    def _sum_registers(self):
+        self._sum = sum(map(_POWERS.__getitem__, self._registers))
+        self._zeros = self._registers.count(0)
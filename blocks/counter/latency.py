@@ -0,0 +1,95 @@
+from threading import Lock
+from time import monotonic
+
+
+# the hidden attribute the Twitter blocks stamp signals with when they are
+# read off the stream, as a monotonic time
+INGEST_ATTR = '_ingest_ts'
+
+
+class LatencyHistogram(object):
+
+    """ Latencies counted in power of two millisecond buckets.
+
+    Bucket `i` counts latencies under 2**i ms, the last bucket counts
+    everything longer.
+
+    """
+
+    n_buckets = 24
+
+    def __init__(self):
+        self.buckets = [0] * self.n_buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = Lock()
+
+    def record(self, seconds):
+        idx = min(int(seconds * 1000).bit_length(), self.n_buckets - 1)
+        with self._lock:
+            self.buckets[idx] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0,
+            'max_ms': self.max * 1000,
+            'buckets': {
+                '<{}ms'.format(2 ** idx): count
+                for idx, count in enumerate(self.buckets) if count
+            }
+        }
+
+
+class BlockLatency(object):
+
+    """ Latency of the signals passing through a block that were stamped
+    at ingest: the time each batch spent in the block, and the time since
+    ingest of each signal as it left.
+
+    Signals without a stamp are not recorded, so this costs an attribute
+    lookup per signal unless stamping is turned on upstream.
+
+    """
+
+    def __init__(self):
+        self.in_block = LatencyHistogram()
+        self.since_ingest = LatencyHistogram()
+
+    def record(self, signals, entered):
+        """ Record signals leaving the block that they entered at the
+        monotonic time `entered`.
+
+        """
+        now = monotonic()
+        stamped = False
+        for signal in signals:
+            stamp = getattr(signal, INGEST_ATTR, None)
+            if stamp is not None:
+                self.since_ingest.record(now - stamp)
+                stamped = True
+        if stamped:
+            self.in_block.record(now - entered)
+
+    def to_dict(self):
+        return {
+            'in_block': self.in_block.to_dict(),
+            'since_ingest': self.since_ingest.to_dict()
+        }
+
+
+def carry_ingest_stamp(sources, signal):
+    """ Stamp a new signal with the earliest ingest time of the signals it
+    was made from.
+
+    """
+    stamps = [getattr(source, INGEST_ATTR) for source in sources
+              if hasattr(source, INGEST_ATTR)]
+    if stamps:
+        setattr(signal, INGEST_ATTR, min(stamps))
+    return signal
@@ -0,0 +1,87 @@
+from operator import itemgetter
+from threading import Lock, local
+
+_first = itemgetter(0)
+
+
+class LockedCounter(object):
+    """ A count behind a single lock, which every adding thread takes.
+
+    Args:
+        initial (int): The count to start from.
+
+    """
+
+    def __init__(self, initial=0):
+        self._count = initial
+        self._lock = Lock()
+
+    def add(self, count):
+        with self._lock:
+            self._count += count
+
+    def value(self):
+        return self._count
+
+    def reset(self):
+        """ Set the count back to zero and return what it was """
+        with self._lock:
+            value = self._count
+            self._count = 0
+        return value
+
+
+class StripedCounter(object):
+    """ A count that many threads add to without contending on a lock.
+
+    Each thread adds to its own stripe, which only that thread writes to,
+    so adding is an uncontended increment. The stripes are only summed
+    when the count is read, which a block does once for each batch it
+    notifies rather than for each add. The lock is only taken the first
+    time a thread adds, to register its stripe, and to reset. Stripes only
+    grow, so a thread never reads a count lower than one it read before,
+    and once adding stops the count is exact.
+
+    A stripe is kept for each thread that ever added, which suits the
+    pooled threads blocks are called from.
+
+    Args:
+        initial (int): The count to start from.
+
+    """
+
+    def __init__(self, initial=0):
+        self._local = local()
+        self._stripes = []
+        self._lock = Lock()
+        # subtracted from the stripes, which are never zeroed
+        self._offset = -initial
+
+    def add(self, count):
+        try:
+            self._local.stripe[0] += count
+        except AttributeError:
+            self._register()[0] += count
+
+    def value(self):
+        offset = self._offset
+        return sum(map(_first, self._stripes)) - offset
+
+    def _register(self):
+        """ Give the calling thread its own stripe """
+        stripe = self._local.stripe = [0]
+        with self._lock:
+            # copied so reads never see the list being grown
+            self._stripes = self._stripes + [stripe]
+        return stripe
+
+    def reset(self):
+        """ Set the count back to zero and return what it was. Counts added
+        while resetting go to one side of the reset or the other.
+
+        """
+        with self._lock:
+            total = sum(map(_first, self._stripes))
+            value = total - self._offset
+            self._offset = total
+        return value
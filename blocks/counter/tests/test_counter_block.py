@@ -1,4 +1,4 @@
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import time
 from datetime import datetime, timedelta
 from threading import Event
@@ -6,9 +6,12 @@ from threading import Event
 from nio.util.threading.spawn import spawn
 from nio.util.discovery import not_discoverable
 from nio.testing.block_test_case import NIOBlockTestCase
+from nio.block.terminals import DEFAULT_TERMINAL
 from nio.signal.base import Signal
 
+from .. import windows
 from ..counter_block import Counter
+from ..latency import INGEST_ATTR
 
 
 @not_discoverable
@@ -205,3 +208,109 @@ class TestCounter(NIOBlockTestCase):
         self.assertTrue(
             "_groups" in call_args_list[0][0].keys())
         self.assertEqual(blk._persistence.save.call_count, 1)
+
+    def test_striped(self):
+        """ Per-thread counts carry over persisted counts and reset """
+        blk = Counter()
+        blk._cumulative_count = {"a": 40}
+        self.configure_block(blk, {"striped": True, "group_by": "{{$foo}}"})
+        blk.start()
+        blk.process_signals([Signal({'foo': 'a'}), Signal({'foo': 'b'})])
+        blk.process_signals([Signal({'foo': 'a'})])
+        self.assertEqual(blk._cumulative_count, {"a": 42, "b": 1})
+        blk.reset_group("a")
+        blk.stop()
+        self.assertEqual(blk._cumulative_count, {"a": 0, "b": 1})
+        notified = [s.to_dict() for s in self.last_notified[DEFAULT_TERMINAL]]
+        self.assertEqual([s['cumulative_count'] for s in notified],
+                         [41, 1, 42])
+
+    def test_latency(self):
+        """ Counts carry the oldest ingest stamp of the signals counted """
+        blk = Counter()
+        self.configure_block(blk, {})
+        first, second = Signal(), Signal()
+        setattr(first, INGEST_ATTR, 5.0)
+        setattr(second, INGEST_ATTR, 4.0)
+        blk.start()
+        blk.process_signals([first, second, Signal()])
+        blk.stop()
+        notified = self.last_notified[DEFAULT_TERMINAL][0]
+        self.assertEqual(getattr(notified, INGEST_ATTR), 4.0)
+        self.assertNotIn(INGEST_ATTR, notified.to_dict())
+        self.assertEqual(blk.latency()['since_ingest']['count'], 1)
+
+    def test_windows(self):
+        """ Counts include a windowed count and rates per group """
+        now = [1000.0]
+        blk = Counter()
+        self.configure_block(blk, {
+            "window_info": {
+                "windowing": True,
+                "mode": "SLIDING",
+                "length": {"seconds": 60},
+                "rates": True,
+            },
+            "group_by": "{{$foo}}"
+        })
+        blk.start()
+        with patch.object(windows, '_time', lambda: now[0]):
+            blk.process_signals([Signal({'foo': 'a'})] * 3)
+            now[0] = 1030.0
+            blk.process_signals([Signal({'foo': 'a'}), Signal({'foo': 'b'})])
+            now[0] = 1070.0
+            blk.process_signals([Signal({'foo': 'a'})])
+        blk.stop()
+        notified = [s.to_dict() for s in self.last_notified[DEFAULT_TERMINAL]]
+        self.assertEqual([(s['group'], s['window_count']) for s in notified],
+                         [('a', 3), ('a', 4), ('b', 1), ('a', 2)])
+        # the first tick set the rates to the 3 counted in it over 5 seconds
+        self.assertGreater(notified[1]['rate_1m'], 0)
+        self.assertLess(notified[1]['rate_1m'], 0.6)
+        self.assertEqual(notified[2]['rate_15m'], 0.0)
+
+    def test_max_groups(self):
+        """ The least recently counted groups past the max are evicted """
+        blk = Counter()
+        self.configure_block(blk, {
+            "group_limits": {"max_groups": 2, "notify_evicted": True},
+            "group_by": "{{$foo}}"
+        })
+        blk.start()
+        blk.process_signals([Signal({'foo': 'a'}), Signal({'foo': 'b'})])
+        blk.process_signals([Signal({'foo': 'a'})])
+        blk.process_signals([Signal({'foo': 'c'})])
+        blk.stop()
+        # b was counted least recently
+        evicted = self.last_notified[DEFAULT_TERMINAL][-1].to_dict()
+        self.assertEqual(evicted, {"count": 0, "cumulative_count": 1,
+                                   "group": "b", "evicted": True})
+        self.assertEqual(blk._groups, {"a", "c"})
+        self.assertEqual(blk._cumulative_count, {"a": 2, "c": 1})
+        self.assertEqual(blk.evictions(),
+                         {"max_groups": 1, "idle": 0, "groups": 2})
+
+    def test_idle_groups(self):
+        """ Groups not counted for the idle TTL are evicted """
+        now = [100.0]
+        blk = Counter()
+        self.configure_block(blk, {
+            "group_limits": {"idle_ttl": {"seconds": 60}},
+            "group_by": "{{$foo}}"
+        })
+        with patch(Counter.__module__ + '.Job') as job, \
+                patch(Counter.__module__ + '.monotonic', lambda: now[0]):
+            blk.start()
+            job.assert_called_once_with(
+                blk._evict_idle, timedelta(seconds=6), True)
+            blk.process_signals([Signal({'foo': 'a'}), Signal({'foo': 'b'})])
+            now[0] = 130.0
+            blk.process_signals([Signal({'foo': 'a'})])
+            now[0] = 161.0
+            blk._evict_idle()
+        blk.stop()
+        self.assertEqual(blk._groups, {"a"})
+        self.assertEqual(blk._cumulative_count, {"a": 2})
+        self.assertEqual(blk.evictions()["idle"], 1)
+        # evicted groups are not notified unless asked to be
+        self.assert_num_signals_notified(3)
@@ -1,8 +1,11 @@
 from time import sleep
+from unittest.mock import patch
 
+from nio.block.terminals import DEFAULT_TERMINAL
 from nio.signal.base import Signal
 from nio.testing.block_test_case import NIOBlockTestCase
 
+from .. import counter_fast_block
 from ..counter_fast_block import CounterFast, FrequencyTracker
 
 
@@ -20,6 +23,18 @@ class TestCounterFast(NIOBlockTestCase):
         self.assert_num_signals_notified(4)
         blk.stop()
 
+    def test_striped_count(self):
+        blk = CounterFast()
+        self.configure_block(blk, {"striped": True})
+        blk.start()
+        blk.process_signals([Signal()])
+        blk.process_signals([Signal(), Signal()])
+        self.assertEqual(blk.value(), 3)
+        blk.reset()
+        blk.process_signals([Signal()])
+        self.assertEqual(blk._cumulative_count, 1)
+        blk.stop()
+
     def test_tracker(self):
         """ Test the accuracy of the frequency tracker """
         tracker = FrequencyTracker()
@@ -37,3 +52,46 @@ class TestCounterFast(NIOBlockTestCase):
         tracker.record(4)
         # Should be 3+4 in the 3rd second = ~7
         self.assertAlmostEqual(tracker.get_frequency(), 7, 1)
+
+    def test_tracker_windows(self):
+        """ Several periods are reported at once from the same buckets """
+        now = [1000.0]
+        with patch.object(counter_fast_block, '_time', lambda: now[0]):
+            tracker = FrequencyTracker(1, [10, 60])
+            for _ in range(120):
+                now[0] += 0.5
+                tracker.record(5)
+            frequencies = tracker.get_frequencies()
+            self.assertEqual(frequencies, {1: 10, 10: 10, 60: 10})
+            self.assertEqual(tracker.get_frequency(), 10)
+
+            # counts leave the shorter periods first
+            now[0] += 5
+            frequencies = tracker.get_frequencies()
+            self.assertEqual(frequencies[1], 0)
+            self.assertEqual(frequencies[10], 5)
+            self.assertAlmostEqual(frequencies[60], 55 / 6)
+
+            # and the ring forgets them once they are older than all
+            now[0] += 60
+            tracker.record(3)
+            self.assertEqual(tracker.get_frequencies(),
+                             {1: 3, 10: 0.3, 60: 0.05})
+
+    def test_report_windows(self):
+        blk = CounterFast()
+        self.configure_block(blk, {
+            "frequency": {
+                "enabled": True,
+                "averaging_interval": {"seconds": 1},
+                "windows": [{"interval": {"seconds": 10}},
+                            {"interval": {"seconds": 60}}]
+            }
+        })
+        blk._tracker._start_time -= 60
+        blk.process_signals([Signal(), Signal()])
+        blk.report_frequency()
+        report = self.last_notified[DEFAULT_TERMINAL][-1]
+        self.assertEqual(report.count_frequency, 2)
+        self.assertEqual(report.count_frequencies,
+                         {"1s": 2, "10s": 0.2, "60s": 2 / 60})
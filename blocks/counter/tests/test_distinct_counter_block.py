@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock
+
+from nio.block.terminals import DEFAULT_TERMINAL
+from nio.signal.base import Signal
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..distinct_counter_block import DistinctCounter
+from ..hyperloglog import HyperLogLog
+
+
+class TestDistinctCounter(NIOBlockTestCase):
+
+    def test_distinct_count(self):
+        """ Each group counts its distinct values """
+        blk = DistinctCounter()
+        self.configure_block(blk, {
+            "value_expr": "{{ $user }}",
+            "group_by": "{{ $region }}"
+        })
+        blk.start()
+        blk.process_signals([
+            Signal({"region": "north", "user": "a"}),
+            Signal({"region": "north", "user": "b"}),
+            Signal({"region": "north", "user": "a"}),
+            Signal({"region": "south", "user": "a"}),
+            Signal({"region": "south"}),
+        ])
+        blk.process_signals([Signal({"region": "north", "user": "c"})])
+        blk.stop()
+        notified = [(s.group, s.count, s.distinct_count)
+                    for s in self.last_notified[DEFAULT_TERMINAL]]
+        self.assertEqual(notified, [
+            ("north", 3, 2), ("south", 1, 1), ("north", 1, 3)])
+        self.assertEqual(blk.distinct_count("north"),
+                         {"group": "north", "distinct_count": 3})
+        # the union of every group's values
+        self.assertEqual(blk.distinct_count(),
+                         {"groups": 2, "distinct_count": 3})
+
+    def test_reset(self):
+        """ Resetting notifies the distinct count and starts over """
+        blk = DistinctCounter()
+        self.configure_block(blk, {"value_expr": "{{ $user }}"})
+        blk.start()
+        blk.process_signals([Signal({"user": "a"}), Signal({"user": "b"})])
+        blk.reset()
+        blk.process_signals([Signal({"user": "a"})])
+        blk.stop()
+        notified = self.last_notified[DEFAULT_TERMINAL]
+        self.assertEqual(notified[1].to_dict(),
+                         {"count": 0, "distinct_count": 2, "group": None})
+        self.assertEqual(notified[2].distinct_count, 1)
+
+    def test_persistence(self):
+        """ Sketch registers are persisted and loaded """
+        sketch = HyperLogLog(10)
+        for n in range(100):
+            sketch.add(n)
+        blk = DistinctCounter()
+        blk._registers = {"key": sketch.to_bytes(),
+                          "old": HyperLogLog(12).to_bytes()}
+        self.configure_block(blk, {"precision": 10})
+        blk._persistence.save = MagicMock()
+        # the sketch made at another precision is dropped
+        self.assertEqual(blk._registers, {"key": sketch.to_bytes()})
+        blk.start()
+        blk.stop()
+        saved = blk._persistence.save.call_args_list[0][0][0]
+        self.assertEqual(saved["_registers"], {"key": sketch.to_bytes()})
+
+    def test_evict(self):
+        """ Evicted groups drop their sketch and notify a final count """
+        blk = DistinctCounter()
+        self.configure_block(blk, {
+            "value_expr": "{{ $user }}",
+            "group_by": "{{ $region }}",
+            "group_limits": {"max_groups": 1, "notify_evicted": True}
+        })
+        blk.start()
+        blk.process_signals([Signal({"region": "north", "user": "a"}),
+                             Signal({"region": "north", "user": "b"})])
+        blk.process_signals([Signal({"region": "south", "user": "a"})])
+        blk.stop()
+        self.assertEqual(self.last_notified[DEFAULT_TERMINAL][-1].to_dict(), {
+            "count": 0, "distinct_count": 2, "group": "north",
+            "evicted": True})
+        self.assertEqual(list(blk._registers), ["south"])
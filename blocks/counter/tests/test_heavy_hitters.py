@@ -0,0 +1,51 @@
+from collections import Counter as _Counter
+from random import Random
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..heavy_hitters import CountMinSketch, SpaceSaving
+
+
+class TestHeavyHitters(NIOBlockTestCase):
+
+    def test_count_min(self):
+        """ Estimates never undercount """
+        sketch = CountMinSketch(width=64, depth=4)
+        counts = _Counter()
+        for n in range(5000):
+            item = n % 300
+            counts[item] += 1
+            sketch.add(item)
+        for item, count in counts.items():
+            self.assertGreaterEqual(sketch.estimate(item), count)
+        self.assertEqual(len(sketch._rows), 4)
+        self.assertEqual(len(sketch._rows[0]), 64)
+
+    def test_top(self):
+        """ Frequent items of a skewed stream are found and counted """
+        random = Random(1)
+        items = [int(random.paretovariate(1.1)) for _ in range(50000)]
+        summary = SpaceSaving(capacity=50)
+        for item in items:
+            summary.add(item)
+        expected = _Counter(items).most_common(5)
+        self.assertEqual(
+            [(item, count) for item, count, _ in summary.top(5)], expected)
+        self.assertEqual(summary.total, 50000)
+        self.assertLessEqual(len(summary._counts), 50)
+
+    def test_eviction(self):
+        """ New items take the place of the least counted one """
+        summary = SpaceSaving(capacity=2)
+        summary.add('a', 5)
+        summary.add('b', 2)
+        summary.add('c')
+        # c is counted from its estimate rather than from b's count
+        self.assertEqual(summary.top(3), [('a', 5, 0), ('c', 1, 0)])
+        # with every item on one counter, b is overcounted past a, and c
+        # is counted from a's count as that is below its estimate of 8
+        summary = SpaceSaving(capacity=2, sketch=CountMinSketch(1, 1))
+        summary.add('a', 5)
+        summary.add('b', 2)
+        summary.add('c')
+        self.assertEqual(summary.top(3), [('b', 7, 5), ('c', 6, 5)])
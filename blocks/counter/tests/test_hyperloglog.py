@@ -0,0 +1,46 @@
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..hyperloglog import HyperLogLog
+
+
+class TestHyperLogLog(NIOBlockTestCase):
+
+    def test_count(self):
+        """ Estimates are within a few standard errors """
+        sketch = HyperLogLog(precision=12)
+        self.assertEqual(sketch.count(), 0)
+        for n in range(100000):
+            sketch.add("user{}".format(n % 20000))
+        # 1.6% standard error at precision 12
+        self.assertAlmostEqual(sketch.count() / 20000, 1, delta=0.05)
+        self.assertEqual(len(sketch.to_bytes()), 4096)
+
+    def test_small_counts(self):
+        """ Small counts are close to exact """
+        sketch = HyperLogLog()
+        for value in [1, 2, 3, 3, '3', None]:
+            sketch.add(value)
+        self.assertEqual(round(sketch.count()), 4)
+
+    def test_merge(self):
+        """ A merged sketch estimates the union """
+        first, second = HyperLogLog(12), HyperLogLog(12)
+        for n in range(10000):
+            first.add(n)
+            second.add(n + 5000)
+        first.merge(second)
+        self.assertAlmostEqual(first.count() / 15000, 1, delta=0.05)
+        with self.assertRaises(ValueError):
+            first.merge(HyperLogLog(10))
+
+    def test_registers(self):
+        """ A sketch picks up from its registers """
+        sketch = HyperLogLog(10)
+        for n in range(1000):
+            sketch.add(n)
+        copied = HyperLogLog(10, sketch.to_bytes())
+        self.assertEqual(copied.count(), sketch.count())
+        with self.assertRaises(ValueError):
+            HyperLogLog(12, sketch.to_bytes())
+        with self.assertRaises(ValueError):
+            HyperLogLog(20)
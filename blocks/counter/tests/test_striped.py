@@ -0,0 +1,42 @@
+from threading import Thread
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..striped import LockedCounter, StripedCounter
+
+
+class TestStripedCounter(NIOBlockTestCase):
+
+    def test_threads(self):
+        """ Counts added by many threads are all counted """
+        counter = StripedCounter()
+        seen = {}
+
+        def add(thread):
+            counts = []
+            for _ in range(1000):
+                counter.add(1)
+                counts.append(counter.value())
+            seen[thread] = counts
+
+        threads = [Thread(target=add, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.value(), 8000)
+        self.assertEqual(len(counter._stripes), 8)
+        # each thread only ever saw the count go up
+        for counts in seen.values():
+            self.assertEqual(counts, sorted(set(counts)))
+
+    def test_reset(self):
+        """ Resetting returns the count and counts on from zero """
+        for counter in (StripedCounter(5), LockedCounter(5)):
+            counter.add(2)
+            self.assertEqual(counter.value(), 7)
+            self.assertEqual(counter.reset(), 7)
+            self.assertEqual(counter.value(), 0)
+            counter.add(3)
+            self.assertEqual(counter.reset(), 3)
+            self.assertEqual(counter.reset(), 0)
@@ -0,0 +1,81 @@
+from unittest.mock import patch
+
+from nio.block.terminals import DEFAULT_TERMINAL
+from nio.signal.base import Signal
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..top_k_block import TopK
+
+
+class TestTopK(NIOBlockTestCase):
+
+    def test_top(self):
+        """ Each item in a list of items is counted """
+        blk = TopK()
+        self.configure_block(blk, {
+            "key_expr": "{{ $hashtags }}",
+            "k": 2,
+            "report_interval": {"seconds": 0}
+        })
+        blk.start()
+        blk.process_signals([
+            Signal({"hashtags": ["christmas", "snow"]}),
+            Signal({"hashtags": ["christmas"]}),
+            Signal({"hashtags": []}),
+            Signal({"hashtags": ["snow", "christmas", "pi"]}),
+        ])
+        self.assertEqual(blk.top(), {
+            "top": [
+                {"item": "christmas", "count": 3, "error": 0},
+                {"item": "snow", "count": 2, "error": 0}
+            ],
+            "total": 6
+        })
+        # nothing is notified until reported
+        self.assert_num_signals_notified(0)
+        blk.report()
+        self.assert_num_signals_notified(1)
+        self.assertEqual(
+            self.last_notified[DEFAULT_TERMINAL][0].top[0]["count"], 3)
+        blk.reset()
+        self.assertEqual(blk.top(), {"top": [], "total": 0})
+        blk.stop()
+
+    def test_unhashable_items(self):
+        """ Items that can't be hashed are counted by their JSON """
+        blk = TopK()
+        self.configure_block(blk, {
+            "key_expr": "{{ $place }}",
+            "report_interval": {"seconds": 0}
+        })
+        blk.start()
+        blk.process_signals([
+            Signal({"place": {"city": "Oslo", "country": "NO"}}),
+            Signal({"place": {"country": "NO", "city": "Oslo"}}),
+            Signal({"place": [["a"], "b"]}),
+        ])
+        blk.stop()
+        self.assertEqual(blk.top()["top"], [
+            {"item": '{"city": "Oslo", "country": "NO"}', "count": 2,
+             "error": 0},
+            {"item": '["a"]', "count": 1, "error": 0},
+            {"item": "b", "count": 1, "error": 0}
+        ])
+
+    def test_reset_on_report(self):
+        """ Each report counts from scratch when resetting on report """
+        blk = TopK()
+        self.configure_block(blk, {
+            "key_expr": "{{ $user }}",
+            "reset_on_report": True
+        })
+        with patch(TopK.__module__ + '.Job') as job:
+            blk.start()
+            job.assert_called_once_with(blk.report, blk.report_interval(),
+                                        True)
+        blk.process_signals([Signal({"user": "a"}), Signal({"user": "b"}),
+                             Signal({"user": "a"}), Signal()])
+        self.assertEqual(blk.report()["top"][0],
+                         {"item": "a", "count": 2, "error": 0})
+        self.assertEqual(blk.report()["total"], 0)
+        blk.stop()
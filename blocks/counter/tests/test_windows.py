@@ -0,0 +1,58 @@
+from unittest.mock import patch
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from .. import windows
+from ..windows import EWMARates, GroupWindow, SlidingWindow, \
+    TumblingWindow
+
+
+class TestWindows(NIOBlockTestCase):
+
+    def test_sliding(self):
+        """ A sliding window counts the last length seconds """
+        window = SlidingWindow(60)
+        for second in range(120):
+            window.add(1, second + 0.5)
+        self.assertEqual(window.count(119.5), 60)
+        # a bucket leaves the window every 6 seconds
+        self.assertEqual(window.count(125), 54)
+        self.assertEqual(window.count(200), 0)
+        self.assertEqual(len(window._counts), 10)
+
+    def test_tumbling(self):
+        """ A tumbling window counts from the start of its window """
+        window = TumblingWindow(60)
+        for second in range(90):
+            window.add(1, 1000020 + second)
+        # the window started at 1000020 - 1000020 % 60
+        self.assertEqual(window.count(1000109), 30)
+        self.assertEqual(window.count(1000140), 0)
+
+    def test_ewma(self):
+        """ Rates move towards the rate of each tick and decay """
+        rates = EWMARates(tick=5)
+        self.assertEqual(rates.rates(0)["rate_1m"], 0.0)
+        for second in range(5):
+            rates.add(10, second)
+        # the first tick sets the rates
+        self.assertEqual(rates.rates(5), {
+            "rate_1m": 10.0, "rate_5m": 10.0, "rate_15m": 10.0})
+        # an hour without counts
+        decayed = rates.rates(3605)
+        self.assertLess(decayed["rate_1m"], 0.001)
+        self.assertLess(decayed["rate_1m"], decayed["rate_5m"])
+        self.assertLess(decayed["rate_5m"], decayed["rate_15m"])
+        self.assertAlmostEqual(decayed["rate_15m"], 10 / 54.6, 1)
+
+    def test_group_window(self):
+        """ A group window only reports what it was asked to keep """
+        now = [60.0]
+        with patch.object(windows, '_time', lambda: now[0]):
+            self.assertEqual(GroupWindow().add(1), {})
+            group = GroupWindow(60, sliding=False, rates=True)
+            self.assertEqual(group.add(2), {
+                "window_count": 2,
+                "rate_1m": 0.0, "rate_5m": 0.0, "rate_15m": 0.0})
+            now[0] = 65.0
+            self.assertEqual(group.add(3)["window_count"], 5)
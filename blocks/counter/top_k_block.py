@@ -0,0 +1,136 @@
+import json
+from threading import Lock
+
+from nio.block.base import Block
+from nio.command import command
+from nio.signal.base import Signal
+from nio.properties import BoolProperty, IntProperty, ObjectProperty, \
+    Property, PropertyHolder, TimeDeltaProperty, VersionProperty
+from nio.modules.scheduler import Job
+
+from .heavy_hitters import CountMinSketch, SpaceSaving
+
+
+class SketchInfo(PropertyHolder):
+    capacity = IntProperty(title='Items Kept', default=100)
+    width = IntProperty(title='Sketch Width', default=2048)
+    depth = IntProperty(title='Sketch Depth', default=4)
+
+
+@command("report")
+@command("reset")
+@command("top")
+class TopK(Block):
+
+    """ A block that keeps the most frequent items of its signals in a
+    fixed amount of memory, and notifies the top k on an interval.
+
+    Properties:
+        key_expr (Property): The item of each signal to count, or a list
+            of items to count each of. Items that can't be hashed, like
+            dicts, are counted by their JSON.
+        k (int): How many items to report.
+        report_interval (timedelta): The interval at which to notify the
+            top k, or zero to only notify on command.
+        reset_on_report (bool): Does each report count from scratch?
+        sketch (SketchInfo):
+            capacity (int): The most items counted at once.
+            width (int): Counters in each row of the count-min sketch.
+            depth (int): Rows of the count-min sketch.
+
+    """
+    version = VersionProperty("0.1.0")
+    key_expr = Property(title='Item', default='{{ $item }}', allow_none=True)
+    k = IntProperty(title='Top K', default=10)
+    report_interval = TimeDeltaProperty(title='Report Interval',
+                                        default={"seconds": 10})
+    reset_on_report = BoolProperty(title='Reset on Report', default=False)
+    sketch = ObjectProperty(SketchInfo, title='Sketch', default=SketchInfo(),
+                            advanced=True)
+
+    def __init__(self):
+        super().__init__()
+        self._summary = None
+        self._summary_lock = Lock()
+        self._job = None
+        self._warned_unhashable = False
+
+    def configure(self, context):
+        super().configure(context)
+        self._summary = self._new_summary()
+
+    def start(self):
+        if self.report_interval().total_seconds() > 0:
+            self._job = Job(self.report, self.report_interval(), True)
+
+    def stop(self):
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        super().stop()
+
+    def process_signals(self, signals):
+        items = []
+        for signal in signals:
+            try:
+                item = self.key_expr(signal)
+            except Exception:
+                self.logger.warning(
+                    "Unable to determine item for {}".format(signal))
+                continue
+            if isinstance(item, (list, tuple, set)):
+                items.extend(self._hashable(i) for i in item if i is not None)
+            elif item is not None:
+                items.append(self._hashable(item))
+        with self._summary_lock:
+            for item in items:
+                self._summary.add(item)
+
+    def _hashable(self, item):
+        """ An item as it is counted, its JSON if it can't be hashed """
+        try:
+            hash(item)
+            return item
+        except TypeError:
+            if not self._warned_unhashable:
+                self._warned_unhashable = True
+                self.logger.warning(
+                    "Counting items that can't be hashed, such as {}, by "
+                    "their JSON".format(item))
+            return json.dumps(item, sort_keys=True, default=str)
+
+    def top(self):
+        """ Command that returns the top k without notifying it """
+        return self._top_k().to_dict()
+
+    def report(self):
+        """ Notify the top k, and start counting over if resetting on each
+        report.
+
+        """
+        signal = self._top_k(reset=self.reset_on_report())
+        self.notify_signals([signal])
+        return signal.to_dict()
+
+    def reset(self):
+        with self._summary_lock:
+            self._summary = self._new_summary()
+        return True
+
+    def _top_k(self, reset=False):
+        with self._summary_lock:
+            top = self._summary.top(self.k())
+            total = self._summary.total
+            if reset:
+                self._summary = self._new_summary()
+        return Signal({
+            "top": [{"item": item, "count": count, "error": error}
+                    for item, count, error in top],
+            "total": total
+        })
+
+    def _new_summary(self):
+        sketch = self.sketch()
+        return SpaceSaving(
+            max(sketch.capacity(), self.k()),
+            CountMinSketch(sketch.width(), sketch.depth()))
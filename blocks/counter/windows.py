@@ -0,0 +1,154 @@
+from math import exp
+from threading import Lock
+from time import time as _time
+
+
+class SlidingWindow(object):
+    """ Counts over the last `length` seconds.
+
+    Counts are added to a fixed ring of time buckets, each a tenth of the
+    window wide, so adding is O(1), reading sums ten buckets and memory
+    does not grow with the count. The count is accurate to within a
+    bucket's width of the window.
+
+    Args:
+        length (float): The window length in seconds.
+
+    """
+    buckets_per_window = 10
+
+    def __init__(self, length):
+        self._width = length / self.buckets_per_window
+        self._size = self.buckets_per_window
+        self._counts = [0] * self._size
+        # the bucket number each slot of the ring is counting
+        self._buckets = [None] * self._size
+
+    def add(self, count, now):
+        bucket = int(now / self._width)
+        slot = bucket % self._size
+        if self._buckets[slot] != bucket:
+            # the slot last counted a bucket that has left the window
+            self._buckets[slot] = bucket
+            self._counts[slot] = 0
+        self._counts[slot] += count
+
+    def count(self, now):
+        current = int(now / self._width)
+        return sum(count for bucket, count in zip(self._buckets, self._counts)
+                   if bucket is not None and
+                   0 <= current - bucket < self._size)
+
+
+class TumblingWindow(object):
+    """ Counts since the start of the current window, where windows are
+    back to back `length` seconds long and start on multiples of `length`
+    since the epoch, so one minute windows start on the minute.
+
+    Args:
+        length (float): The window length in seconds.
+
+    """
+
+    def __init__(self, length):
+        self._length = length
+        self._window = None
+        self._count = 0
+
+    def add(self, count, now):
+        self._roll(now)
+        self._count += count
+
+    def count(self, now):
+        self._roll(now)
+        return self._count
+
+    def _roll(self, now):
+        window = int(now / self._length)
+        if window != self._window:
+            self._window = window
+            self._count = 0
+
+
+class EWMARates(object):
+    """ 1, 5 and 15 minute exponentially weighted moving average rates, in
+    counts per second, like the load averages of a unix system.
+
+    Counts are gathered over ticks of `tick` seconds and each rate moves
+    towards the rate of a tick once it is over, decaying for ticks with
+    nothing counted, so the rates lag by up to a tick. The first tick sets
+    the rates outright.
+
+    Args:
+        tick (float): Seconds between updates of the rates.
+
+    """
+    minutes = (1, 5, 15)
+
+    def __init__(self, tick=5):
+        self._tick_length = tick
+        self._alphas = [1 - exp(-tick / (60 * m)) for m in self.minutes]
+        self._rates = None
+        self._tick = None
+        self._uncounted = 0
+
+    def add(self, count, now):
+        self._advance(now)
+        self._uncounted += count
+
+    def rates(self, now):
+        self._advance(now)
+        return {"rate_{}m".format(m): rate for m, rate in
+                zip(self.minutes, self._rates or [0.0] * len(self.minutes))}
+
+    def _advance(self, now):
+        tick = int(now / self._tick_length)
+        if self._tick is None:
+            self._tick = tick
+        elapsed = tick - self._tick
+        if elapsed <= 0:
+            return
+        instant = self._uncounted / self._tick_length
+        self._uncounted = 0
+        self._tick = tick
+        if self._rates is None:
+            self._rates = [instant] * len(self._alphas)
+        else:
+            self._rates = [rate + alpha * (instant - rate) for rate, alpha
+                           in zip(self._rates, self._alphas)]
+        # nothing was counted in the ticks after the first
+        self._rates = [rate * (1 - alpha) ** (elapsed - 1) for rate, alpha
+                       in zip(self._rates, self._alphas)]
+
+
+class GroupWindow(object):
+    """ The windowed count and moving average rates of one group.
+
+    Args:
+        length (float): The window length in seconds, or None to not
+            count in a window.
+        sliding (bool): Whether the window slides or tumbles.
+        rates (bool): Whether to keep moving average rates.
+
+    """
+
+    def __init__(self, length=None, sliding=True, rates=False):
+        self._window = None
+        if length:
+            self._window = SlidingWindow(length) if sliding \
+                else TumblingWindow(length)
+        self._rates = EWMARates() if rates else None
+        self._lock = Lock()
+
+    def add(self, count):
+        """ Add a count and return the group's window attributes """
+        now = _time()
+        attrs = {}
+        with self._lock:
+            if self._window is not None:
+                self._window.add(count, now)
+                attrs["window_count"] = self._window.count(now)
+            if self._rates is not None:
+                self._rates.add(count, now)
+                attrs.update(self._rates.rates(now))
+        return attrs
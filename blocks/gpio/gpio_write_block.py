@@ -1,7 +1,11 @@
+from time import monotonic
+
 from nio.block.base import Block
+from nio.command import command
 from nio.properties import IntProperty, VersionProperty, Property
 
 from .gpio_device import GPIODevice
+from .latency import BlockLatency
 
 try:
     import RPi.GPIO as GPIO
@@ -10,15 +14,17 @@ except:
     pass
 
 
+@command("latency")
 class GPIOWrite(Block):
 
     pin = IntProperty(default=0, title="Pin Number")
     value = Property(title='Write Value', default="{{ False }}")
-    version = VersionProperty("0.1.1")
+    version = VersionProperty("0.2.0")
 
     def __init__(self):
         super().__init__()
         self._gpio = None
+        self._latency = BlockLatency()
 
     def configure(self, context):
         super().configure(context)
@@ -29,10 +35,17 @@ class GPIOWrite(Block):
         super().stop()
 
     def process_signals(self, signals):
+        entered = monotonic()
         for signal in signals:
             self._write_gpio_pin(self.pin(signal), self.value(signal))
+        # the pins are written, so this is where stamped signals end up
+        self._latency.record(signals, entered)
         self.notify_signals(signals)
 
+    def latency(self):
+        """ Command that returns the latency of signals stamped at ingest """
+        return self._latency.to_dict()
+
     def _write_gpio_pin(self, pin, value):
         try:
             return self._gpio.write(pin, value)
@@ -1,3 +1,4 @@
+from time import monotonic
 from unittest import skip
 from unittest.mock import MagicMock, patch
 from nio.block.terminals import DEFAULT_TERMINAL
@@ -5,6 +6,7 @@ from nio.signal.base import Signal
 from nio.testing.block_test_case import NIOBlockTestCase
 from ..gpio_write_block import GPIOWrite
 from ..gpio_device import GPIODevice
+from ..latency import INGEST_ATTR
 
 
 class TestGPIOWrite(NIOBlockTestCase):
@@ -23,3 +25,22 @@ class TestGPIOWrite(NIOBlockTestCase):
         self.assertDictEqual(
             self.last_notified[DEFAULT_TERMINAL][0].to_dict(),
             {"my": "signal"})
+
+    @patch(GPIOWrite.__module__ + ".GPIODevice", spec=GPIODevice)
+    def test_latency(self, mock_gpio):
+        """Signals stamped at ingest are recorded once their pin is written"""
+        stamped = Signal({"my": "signal"})
+        setattr(stamped, INGEST_ATTR, monotonic() - 0.01)
+        blk = GPIOWrite()
+        self.configure_block(blk, {})
+        blk.start()
+        blk.process_signals([stamped, Signal({"my": "unstamped"})])
+        blk.stop()
+        self.assertEqual(blk._gpio.write.call_count, 2)
+        notified = self.last_notified[DEFAULT_TERMINAL]
+        self.assertEqual(getattr(notified[0], INGEST_ATTR),
+                         getattr(stamped, INGEST_ATTR))
+        latency = blk.latency()
+        self.assertEqual(latency['in_block']['count'], 1)
+        self.assertEqual(latency['since_ingest']['count'], 1)
+        self.assertGreaterEqual(latency['since_ingest']['max_ms'], 10)
@@ -1,8 +1,13 @@
+from time import monotonic
+
 from nio.block.base import Block
+from nio.command import command
 from nio.signal.base import Signal
 from nio.properties import Property, VersionProperty, ListProperty, \
     BoolProperty, PropertyHolder
 
+from .latency import BlockLatency, carry_ingest_stamp
+
 
 class SignalField(PropertyHolder):
     title = Property(default='', title='Attribute Name', order=0)
@@ -10,6 +15,7 @@ class SignalField(PropertyHolder):
                 order=1)
 
 
+@command("latency")
 class Modifier(Block):
 
     """ A nio block for enriching signals.
@@ -29,16 +35,22 @@ class Modifier(Block):
     exclude = BoolProperty(default=False, title='Exclude existing fields?',
                 order=0)
     fields = ListProperty(SignalField, title='Fields', default=[], order=1)
-    version = VersionProperty("1.1.0")
+    version = VersionProperty("1.2.0")
+
+    def __init__(self):
+        super().__init__()
+        self._latency = BlockLatency()
 
     def process_signals(self, signals):
+        entered = monotonic()
         fresh_signals = []
 
         for signal in signals:
 
             # if we are including only the specified fields, create
             # a new, empty signal object
-            tmp = Signal() if self.exclude() else signal
+            tmp = carry_ingest_stamp([signal], Signal()) \
+                if self.exclude() else signal
 
             # iterate over the specified fields, evaluating the formula
             # in the context of the original signal
@@ -54,4 +66,9 @@ class Modifier(Block):
         if self.exclude():
             signals = fresh_signals
 
+        self._latency.record(signals, entered)
         self.notify_signals(signals)
+
+    def latency(self):
+        """ Command that returns the latency of signals stamped at ingest """
+        return self._latency.to_dict()
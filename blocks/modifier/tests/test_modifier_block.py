@@ -1,7 +1,9 @@
+from time import monotonic
 from unittest import skip
 from nio.block.terminals import DEFAULT_TERMINAL
 from nio.signal.base import Signal
 from nio.testing.block_test_case import NIOBlockTestCase
+from ..latency import INGEST_ATTR
 from ..modifier_block import Modifier
 
 
@@ -151,3 +153,24 @@ class TestModifier(NIOBlockTestCase):
             blk.process_signals(signals)
         blk.stop()
         self.assertFalse(self.last_notified)
+
+    def test_latency(self):
+        """Ingest stamps survive exclude and are recorded on the way out"""
+        stamped = DummySignal('a banana!')
+        setattr(stamped, INGEST_ATTR, monotonic() - 0.01)
+        blk = Modifier()
+        self.configure_block(blk, {
+            "exclude": True,
+            "fields": [{"title": "greeting", "formula": "hi"}]
+        })
+        blk.start()
+        blk.process_signals([stamped, DummySignal('unstamped')])
+        blk.stop()
+        notified = self.last_notified[DEFAULT_TERMINAL]
+        self.assertEqual(notified[0].to_dict(), {"greeting": "hi"})
+        self.assertEqual(getattr(notified[0], INGEST_ATTR),
+                         getattr(stamped, INGEST_ATTR))
+        latency = blk.latency()
+        self.assertEqual(latency['in_block']['count'], 1)
+        self.assertEqual(latency['since_ingest']['count'], 1)
+        self.assertGreaterEqual(latency['since_ingest']['max_ms'], 10)
@@ -0,0 +1,225 @@
+import asyncio
+import ssl
+from enum import Enum
+from threading import Lock, Thread
+from urllib.parse import urlsplit
+
+from .framing import FrameParser
+
+
+class StreamEngine(Enum):
+    threaded = 0
+    asyncio = 1
+
+
+class SharedEventLoop(object):
+
+    """ One asyncio event loop, running in a background thread, shared by
+    every block streaming with the asyncio engine.
+
+    The loop is started by the first block to acquire it and stopped when
+    the last one releases it.
+
+    """
+
+    _lock = Lock()
+    _loop = None
+    _thread = None
+    _users = 0
+
+    @classmethod
+    def acquire(cls):
+        with cls._lock:
+            if cls._loop is None:
+                cls._loop = asyncio.new_event_loop()
+                cls._thread = Thread(target=cls._loop.run_forever,
+                                     name='TwitterEventLoop', daemon=True)
+                cls._thread.start()
+            cls._users += 1
+            return cls._loop
+
+    @classmethod
+    def release(cls):
+        with cls._lock:
+            cls._users -= 1
+            if cls._users > 0:
+                return
+            loop, thread = cls._loop, cls._thread
+            cls._loop = cls._thread = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+class AsyncStream(object):
+
+    """ Streams from Twitter on the shared event loop.
+
+    Connecting, reading, the heartbeat timeout and reconnecting with
+    backoff all run as one task, so a block streaming this way needs no
+    reader thread or monitor and reconnect jobs. Frames are handed to the
+    block's `_record_line` from the loop thread.
+
+    Args:
+        block (TwitterStreamBlock): The block to stream for.
+
+    """
+
+    connect_timeout = 45
+    read_size = 64 * 1024
+
+    def __init__(self, block):
+        self._block = block
+        self._loop = None
+        self._task = None
+
+    def start(self):
+        self._loop = SharedEventLoop.acquire()
+        asyncio.run_coroutine_threadsafe(
+            self._start_task(), self._loop).result()
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(
+            self._stop_task(), self._loop).result()
+        self._loop = None
+        SharedEventLoop.release()
+
+    async def _start_task(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _stop_task(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        block = self._block
+        while True:
+            try:
+                await self._stream()
+            except asyncio.TimeoutError:
+                block.logger.warning(
+                    "No data received, we might be disconnected")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                block.logger.error("While streaming: %s" % str(e))
+            delay = block._next_rc_delay()
+            block.logger.debug("Reconnecting in {} seconds".format(
+                delay.total_seconds()))
+            await asyncio.sleep(delay.total_seconds())
+
+    async def _stream(self):
+        """ Make one connection and read from it until it fails """
+        block = self._block
+        # This is a new stream so reset the limit count
+        block._limit_counts[None] = 0
+
+        reader, writer = await asyncio.wait_for(
+            self._connect(), self.connect_timeout)
+        try:
+            status, headers = await asyncio.wait_for(
+                self._read_headers(reader), self.connect_timeout)
+            if status != 200:
+                block.logger.warning(
+                    'Status: {} returned from twitter: {}'.format(
+                        status, await reader.read(self.read_size)))
+                return
+            block.logger.debug('Connected to Streaming API Successfully')
+            block._on_connected()
+
+            chunked = headers.get('transfer-encoding', '') == 'chunked'
+            inflater = None
+            if block._is_compressed(headers.get('content-encoding')):
+                inflater = block._create_inflater()
+            timeout = block.rc_interval().total_seconds()
+            parser = FrameParser()
+            while True:
+                data = await asyncio.wait_for(
+                    self._read_body(reader, chunked), timeout)
+                if inflater is not None:
+                    data = inflater.decompress(data)
+                    if not data:
+                        continue
+                else:
+                    block._bytes.add_wire(len(data))
+                block._tee(data)
+                for frame in parser.feed(data):
+                    if frame is None:
+                        block._on_keep_alive()
+                    else:
+                        block._record_line(frame)
+        finally:
+            writer.close()
+
+    async def _connect(self):
+        """ Open the connection and send the signed streaming request """
+        block = self._block
+        conn_url = '{0}://{1}/{2}'.format(block.streaming_scheme,
+                                          block.streaming_host,
+                                          block.streaming_endpoint)
+        req = block._get_oauth_request(conn_url, block.get_params())
+        method = block.get_request_method()
+        if method == "POST":
+            body = req.to_postdata().encode('utf-8')
+            url = urlsplit(conn_url)
+        else:
+            body = b''
+            url = urlsplit(req.to_url())
+        target = url.path + ('?' + url.query if url.query else '')
+
+        block.logger.debug("Connecting to {0}".format(conn_url))
+        secure = url.scheme == 'https'
+        reader, writer = await asyncio.open_connection(
+            url.hostname, url.port or (443 if secure else 80),
+            ssl=ssl.create_default_context() if secure else None)
+
+        request = [
+            '{} {} HTTP/1.1'.format(method, target),
+            'Host: {}'.format(url.netloc),
+            'Content-Type: application/x-www-form-urlencoded',
+            'Accept: */*',
+            'Content-Length: {}'.format(len(body))
+        ]
+        if block.gzip():
+            request.append('Accept-Encoding: deflate, gzip')
+        request.extend(['', ''])
+        writer.write('\r\n'.join(request).encode('latin-1') + body)
+        await writer.drain()
+        return reader, writer
+
+    @staticmethod
+    async def _read_headers(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise Exception("Connection closed before a response")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip().lower()
+        return status, headers
+
+    async def _read_body(self, reader, chunked):
+        """ Read the next piece of the response body """
+        if not chunked:
+            data = await reader.read(self.read_size)
+        else:
+            line = await reader.readline()
+            if not line:
+                raise Exception("No bytes read from stream")
+            size = int(line.split(b';')[0], 16)
+            data = await reader.readexactly(size + 2)
+            data = data[:-2]
+            if not size:
+                data = b''
+        if not data:
+            raise Exception("No bytes read from stream")
+        return data
@@ -0,0 +1,59 @@
+import random
+from time import monotonic
+
+from .metrics import Timer
+
+
+class Backoff(object):
+
+    """ Capped exponential backoff with jitter between reconnect attempts.
+
+    The delay doubles with every consecutive failure up to `maximum`. A
+    random part of each delay, up to the `jitter` fraction of it, is taken
+    off so that many clients dropped at once do not all reconnect at the
+    same instant.
+
+    Attempts and the time from the first failure to the next successful
+    connection are recorded.
+
+    Args:
+        initial (float): Seconds to wait after the first failure.
+        maximum (float): The most seconds to wait between attempts.
+        jitter (float): The fraction of each delay that is randomized,
+            between 0 and 1.
+
+    """
+
+    def __init__(self, initial=1, maximum=320, jitter=0.5):
+        self._initial = initial
+        self._maximum = maximum
+        self._jitter = min(max(jitter, 0), 1)
+        self._down_since = None
+        self.failures = 0
+        self.attempts = 0
+        self.reconnect_timer = Timer()
+
+    def next_delay(self):
+        """ Return the seconds to wait before the next attempt """
+        if self._down_since is None:
+            self._down_since = monotonic()
+        # cap the exponent too, the delay stops growing long before then
+        delay = min(self._initial * 2 ** min(self.failures, 32),
+                    self._maximum)
+        self.failures += 1
+        self.attempts += 1
+        return delay * (1 - self._jitter * random.random())
+
+    def reset(self):
+        """ Start over once connected, recording how long it took """
+        if self._down_since is not None:
+            self.reconnect_timer.record(monotonic() - self._down_since)
+            self._down_since = None
+        self.failures = 0
+
+    def to_dict(self):
+        return {
+            'attempts': self.attempts,
+            'failures': self.failures,
+            'time_to_reconnect': self.reconnect_timer.to_dict()
+        }
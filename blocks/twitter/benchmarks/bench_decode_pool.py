@@ -0,0 +1,105 @@
+""" Compare decoding a recorded stream on the reading thread with decoding
+it on a pool of 1, 2 and 4 worker processes.
+
+Frames are read out of a recording made with the block's `recording`
+property, or out of a canned one when none is given. For each setup this
+reports the frames/sec decoded and the CPU time per frame spent in this
+process, which is what the GIL limits. Workers only help with spare
+cores, so the core count is printed too. Run from the project root with:
+
+    python -m blocks.twitter.benchmarks.bench_decode_pool [DIR PREFIX]
+
+"""
+import os
+import sys
+import tempfile
+import time
+from threading import Event
+
+from ..decoding import Decoder, JSONDecoder
+from ..framing import FrameParser
+from ..parallel import ParallelDecoder
+from ..recording import StreamRecorder, read_recordings, recordings
+from .bench_framing import canned_stream
+
+FIELDS = ['id_str', 'text', 'user.screen_name']
+
+
+def record_canned_stream(directory, prefix, chunk_size=16384):
+    data, _ = canned_stream()
+    recorder = StreamRecorder(directory, prefix, 64 * 1024 * 1024)
+    for start in range(0, len(data), chunk_size):
+        recorder.write(data[start:start + chunk_size])
+    recorder.close()
+
+
+def recorded_frames(directory, prefix):
+    parser = FrameParser()
+    frames = []
+    for _, data in read_recordings(recordings(directory, prefix)):
+        if not data:
+            parser = FrameParser()
+            continue
+        frames.extend(bytes(frame) for frame in parser.feed(data)
+                      if frame is not None)
+    return frames
+
+
+def inline(frames):
+    decoder = Decoder(JSONDecoder.stdlib, FIELDS)
+    for frame in frames:
+        decoder.decode(frame)
+
+
+def pooled(workers):
+    def decode(frames):
+        done = Event()
+        handled = [0]
+
+        def handle(data, error, context):
+            handled[0] += 1
+            if handled[0] == len(frames):
+                done.set()
+
+        decoder = ParallelDecoder(
+            handle, (JSONDecoder.stdlib, FIELDS, ()), workers)
+        decoder.start()
+        # let the workers spawn before timing
+        decoder.submit(frames[0])
+        time.sleep(1)
+        handled[0] = 0
+        start = time.perf_counter(), time.process_time()
+        for frame in frames:
+            decoder.submit(frame)
+        done.wait()
+        elapsed = time.perf_counter() - start[0], \
+            time.process_time() - start[1]
+        decoder.stop()
+        return elapsed
+    return decode
+
+
+def run(name, decode, frames):
+    start = time.perf_counter(), time.process_time()
+    elapsed = decode(frames)
+    if elapsed is None:
+        elapsed = time.perf_counter() - start[0], \
+            time.process_time() - start[1]
+    wall, cpu = elapsed
+    print("{:>10}: {:>8.0f} frames/sec, {:>6.1f} us CPU/frame in the "
+          "reading process".format(
+              name, len(frames) / wall, cpu / len(frames) * 1e6))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        frames = recorded_frames(*sys.argv[1:])
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            record_canned_stream(directory, 'bench')
+            frames = recorded_frames(directory, 'bench')
+    print("{} frames, decoding {} with the standard library on {} "
+          "cores".format(len(frames), ', '.join(FIELDS), os.cpu_count()))
+    run('inline', inline, frames)
+    for workers in (1, 2, 4):
+        run('{} workers'.format(workers), pooled(workers), frames)
@@ -0,0 +1,71 @@
+""" Compare frame throughput of the byte-at-a-time length reader with the
+buffered FrameReader against a canned `delimited=length` stream.
+
+Run from the project root:
+
+    python -m blocks.twitter.benchmarks.bench_framing
+
+"""
+import io
+import json
+import time
+
+from ..framing import FrameReader
+
+
+def canned_stream(n_frames=20000, keep_alive_every=50):
+    tweet = json.dumps({
+        'id_str': '1', 'text': '#Christmas ' + 'x' * 140,
+        'user': {'screen_name': 'santa', 'description': 'y' * 4500}
+    }).encode() + b'\r\n'
+    frame = str(len(tweet)).encode() + b'\r\n' + tweet
+    parts = []
+    for i in range(n_frames):
+        if i % keep_alive_every == 0:
+            parts.append(b'\r\n')
+        parts.append(frame)
+    return b''.join(parts), n_frames
+
+
+def bytewise_frames(stream):
+    """ The original `_read_line` loop: one read per length byte """
+    while True:
+        buf = bytes('', 'utf-8')
+        while not buf or buf[-1] != ord('\n'):
+            bytes_read = stream.read(1)
+            if not bytes_read:
+                return
+            buf += bytes_read
+        if len(buf) <= 2:
+            continue
+        yield stream.read(int(buf))
+
+
+def buffered_frames(stream):
+    reader = FrameReader(stream.readinto1)
+    while True:
+        try:
+            line = reader.read_frame()
+        except Exception:
+            return
+        if line is not None:
+            yield line
+
+
+def run(name, frames, data, n_frames):
+    stream = io.BufferedReader(io.BytesIO(data))
+    start = time.perf_counter()
+    count = sum(1 for _ in frames(stream))
+    elapsed = time.perf_counter() - start
+    assert count == n_frames
+    rate = count / elapsed
+    print("{:>10}: {:>10.0f} frames/sec".format(name, rate))
+    return rate
+
+
+if __name__ == '__main__':
+    data, n_frames = canned_stream()
+    print("{} frames, {} bytes".format(n_frames, len(data)))
+    before = run('bytewise', bytewise_frames, data, n_frames)
+    after = run('buffered', buffered_frames, data, n_frames)
+    print("{:>10}: {:>10.1f}x".format('speedup', after / before))
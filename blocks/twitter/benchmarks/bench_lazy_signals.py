@@ -0,0 +1,69 @@
+""" Compare the memory held by buffered tweet signals, and the CPU spent
+building them and reading one attribute of each, for decoded signals and
+LazySignals.
+
+Run from the project root:
+
+    python -m blocks.twitter.benchmarks.bench_lazy_signals
+
+"""
+import json
+import time
+import tracemalloc
+
+from nio.signal.base import Signal
+
+from ..lazy import LazySignal
+
+
+def canned_frames(n_frames=20000):
+    tweet = json.dumps({
+        'created_at': 'Wed Dec 25 00:00:00 +0000 2019',
+        'id': 1, 'id_str': '1', 'text': '#Christmas ' + 'x' * 140,
+        'entities': {'hashtags': [{'text': 'Christmas', 'indices': [0, 10]}],
+                     'urls': [], 'user_mentions': []},
+        'user': {'id': 2, 'id_str': '2', 'screen_name': 'santa',
+                 'description': 'y' * 160, 'followers_count': 100,
+                 'friends_count': 10, 'lang': 'en'},
+        'retweet_count': 0, 'favorite_count': 0, 'lang': 'en'
+    }).encode()
+    # frames are slices of the reader's buffer, as they are when streaming
+    buf = memoryview(tweet * n_frames)
+    return [buf[i:i + len(tweet)] for i in range(0, len(buf), len(tweet))]
+
+
+def decode(line):
+    return json.loads(str(line, 'utf-8'))
+
+
+def eager(frames):
+    return [Signal(decode(line)) for line in frames]
+
+
+def lazy(frames):
+    return [LazySignal(line, decode) for line in frames]
+
+
+def run(name, build, frames):
+    tracemalloc.start()
+    signals = build(frames)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    signals = build(frames)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    for signal in signals:
+        signal.text
+    read = time.perf_counter() - start
+    print("{:>6}: {:>8.0f} bytes/signal, build {:>6.2f} us/signal, "
+          "first read {:>6.2f} us/signal".format(
+              name, held / len(signals), built / len(signals) * 1e6,
+              read / len(signals) * 1e6))
+
+
+if __name__ == '__main__':
+    frames = canned_frames()
+    print("{} frames of {} bytes".format(len(frames), len(frames[0])))
+    run('eager', eager, frames)
+    run('lazy', lazy, frames)
@@ -0,0 +1,110 @@
+""" Sustained throughput of the Twitter block against the local stand-in
+streaming server, which runs in its own process so it does not share the
+block's CPU time or GIL.
+
+For each engine and offered message rate this reports the tweets/sec the
+block notified, the notify latency from when the stand-in sent a tweet to
+when the block notified it, and the block process' CPU time per tweet.
+Change BLOCK_CONFIG to evaluate other ingest settings. Run from the
+project root with:
+
+    python -m pytest blocks/twitter/benchmarks/bench_throughput.py -s
+
+"""
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from nio.testing.block_test_case import NIOBlockTestCase
+from nio.util.discovery import not_discoverable
+
+from ..tests.stream_server import VERIFY_PATH
+from ..twitter_block import Twitter
+
+
+# offered messages/sec, 0 is as fast as the stand-in can send
+RATES = [1000, 5000, 0]
+WARMUP = 2
+DURATION = 5
+BLOCK_CONFIG = {
+    'phrases': ['#Christmas'],
+    'notify_freq': {'seconds': 0.1}
+}
+
+
+@not_discoverable
+class BenchTwitter(Twitter):
+
+    streaming_scheme = 'http'
+
+    def __init__(self):
+        super().__init__()
+        self.tweets = 0
+        self.latencies = []
+
+    def notify_signals(self, signals, output_id=None):
+        if output_id == 'tweets':
+            now = time.time() * 1000
+            self.tweets += len(signals)
+            self.latencies.extend(
+                now - int(s.timestamp_ms) for s in signals)
+
+
+@contextmanager
+def stand_in(rate):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'blocks.twitter.tests.stream_server',
+         '--port', '0', '--rate', str(rate), '--count', str(10 ** 9),
+         '--batch', '16', '--stamp'],
+        stdout=subprocess.PIPE, universal_newlines=True)
+    try:
+        yield server.stdout.readline().split()[-1]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class BenchThroughput(NIOBlockTestCase):
+
+    def test_threaded(self):
+        for rate in RATES:
+            self._run('threaded', rate)
+
+    def test_asyncio(self):
+        for rate in RATES:
+            self._run('asyncio', rate)
+
+    def _run(self, engine, rate):
+        with stand_in(rate) as host:
+            block = BenchTwitter()
+            block.streaming_host = host
+            block.verify_url = 'http://{}{}'.format(host, VERIFY_PATH)
+            config = dict(BLOCK_CONFIG, engine=engine)
+            self.configure_block(block, config)
+            block.start()
+            time.sleep(WARMUP)
+
+            block.tweets = 0
+            block.latencies = []
+            cpu_start = time.process_time()
+            start = time.monotonic()
+            time.sleep(DURATION)
+            tweets = block.tweets
+            latencies = block.latencies
+            cpu = time.process_time() - cpu_start
+            elapsed = time.monotonic() - start
+            block.stop()
+
+        print("{:>8} offered {:>6}/s: {:>8.0f} tweets/s, latency p50 "
+              "{:>6.1f} ms p99 {:>6.1f} ms, {:>6.1f} us CPU/tweet".format(
+                  engine, rate or 'max', tweets / elapsed,
+                  percentile(latencies, 50), percentile(latencies, 99),
+                  cpu / tweets * 1e6 if tweets else 0))
@@ -0,0 +1,58 @@
+""" Compare the startup cost of resolving a large `follow` list with one
+`users/lookup` request after another, with concurrent requests, and from a
+warm cache file. The local stand-in answers each lookup after a delay
+similar to a round trip to Twitter.
+
+Run from the project root:
+
+    python -m blocks.twitter.benchmarks.bench_user_lookup
+
+"""
+import os
+import tempfile
+import time
+
+from ..tests.stream_server import USERS_PATH, StreamServer
+from ..users import UserIdCache, lookup_user_ids
+
+
+N_USERS = 5000
+LOOKUP_DELAY = 0.1
+CONCURRENCY = 8
+
+
+def resolve(endpoint, names, concurrency, cache):
+    """ What `Twitter._set_user_ids` does on start """
+    ids, missing = cache.get(names) if cache else ({}, names)
+    if missing:
+        found = lookup_user_ids(endpoint, None, missing, concurrency)
+        ids.update(found)
+        if cache is not None:
+            cache.update(found)
+    return ids
+
+
+def timed(name, *args):
+    start = time.perf_counter()
+    ids = resolve(*args)
+    elapsed = time.perf_counter() - start
+    print("{:>12}: {:>8.3f} sec, {} users".format(name, elapsed, len(ids)))
+    return elapsed
+
+
+if __name__ == '__main__':
+    server = StreamServer(lookup_delay=LOOKUP_DELAY)
+    server.start()
+    endpoint = 'http://{}{}'.format(server.host, USERS_PATH)
+    names = ['santa{}'.format(i) for i in range(N_USERS)]
+    print("{} users, {:.0f} ms per lookup".format(
+        N_USERS, LOOKUP_DELAY * 1000))
+    with tempfile.TemporaryDirectory() as directory:
+        cache = UserIdCache(os.path.join(directory, 'users.json'), 86400)
+        serial = timed('serial', endpoint, names, 1, None)
+        timed('concurrent', endpoint, names, CONCURRENCY, None)
+        timed('cold cache', endpoint, names, CONCURRENCY, cache)
+        cache = UserIdCache(os.path.join(directory, 'users.json'), 86400)
+        warm = timed('warm cache', endpoint, names, CONCURRENCY, cache)
+    print("{:>12}: {:>8.0f}x".format('speedup', serial / warm))
+    server.stop()
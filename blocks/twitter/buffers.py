@@ -0,0 +1,279 @@
+import json
+import os
+import random
+from collections import deque
+from enum import Enum
+from threading import Lock
+from time import perf_counter
+
+from nio.signal.base import Signal
+
+
+class OverflowPolicy(Enum):
+    drop_oldest = 0
+    drop_newest = 1
+    sample = 2
+    spill = 3
+
+
+class ResultBuffer(object):
+
+    """ A double-buffered list of signals waiting to be notified on one
+    output.
+
+    The stream reader appends to the front list while the notify job swaps
+    it out for an empty one. The lock is only held for the append or the
+    swap itself, never while signals are notified downstream. The swapped
+    out list is handed to downstream blocks, so a new list takes its place
+    instead of reusing it.
+
+    Args:
+        stall_timer (Timer): Records how long appends wait on the lock.
+
+    """
+
+    dropped = 0
+    spilled = 0
+
+    def __init__(self, stall_timer=None):
+        self._signals = []
+        self._lock = Lock()
+        self._stall_timer = stall_timer
+
+    def append(self, signal, size=0):
+        self._acquire()
+        self._signals.append(signal)
+        self._lock.release()
+
+    def swap(self):
+        """ Take every buffered signal, leaving the buffer empty """
+        with self._lock:
+            signals, self._signals = self._signals, []
+        return signals
+
+    def take_overflow(self):
+        """ Return the (dropped, spilled) counts since the last call """
+        return 0, 0
+
+    @property
+    def backlog(self):
+        """ Signals waiting beyond what the next swap returns """
+        return 0
+
+    def close(self):
+        pass
+
+    def _acquire(self):
+        # only time the append when the lock is actually contended
+        if not self._lock.acquire(False):
+            start = perf_counter()
+            self._lock.acquire()
+            if self._stall_timer is not None:
+                self._stall_timer.record(perf_counter() - start)
+
+    def __len__(self):
+        return len(self._signals)
+
+
+class BoundedResultBuffer(ResultBuffer):
+
+    """ A ResultBuffer capped by signal count and approximate bytes.
+
+    When an append would go over either cap the overflow policy decides
+    what is lost:
+
+    - drop_oldest: evict the oldest buffered signals to make room
+    - drop_newest: discard the incoming signal
+    - sample: keep a uniform sample of everything appended since the
+      last swap, replacing a random buffered signal
+    - spill: write the incoming signal to a disk spool. Once spilling
+      starts, new signals go to the spool until it has been drained so
+      they are still notified in order.
+
+    Args:
+        max_signals (int): Maximum buffered signals, 0 for no limit.
+        max_bytes (int): Maximum buffered bytes, 0 for no limit. Sizes are
+            those of the raw frames the signals were built from.
+        policy (OverflowPolicy): What to do when the buffer is full.
+        spool (Spool): Where to spill signals, required for `spill`.
+        stall_timer (Timer): Records how long appends wait on the lock.
+
+    """
+
+    def __init__(self, max_signals=0, max_bytes=0,
+                 policy=OverflowPolicy.drop_oldest, spool=None,
+                 stall_timer=None):
+        super().__init__(stall_timer)
+        if policy == OverflowPolicy.spill and spool is None:
+            raise ValueError("A spool is required to spill signals")
+        self._max_signals = max_signals
+        self._max_bytes = max_bytes
+        self._policy = policy
+        self._spool = spool
+        self._signals = deque()
+        self._sizes = deque()
+        self._bytes = 0
+        # signals offered since the last swap, used for sampling
+        self._seen = 0
+        self._reported = (0, 0)
+        self.dropped = 0
+        self.spilled = 0
+
+    def append(self, signal, size=0):
+        self._acquire()
+        try:
+            self._seen += 1
+            if self._spool is not None and self._spool.pending:
+                self._spill(signal)
+            elif not self._is_full(size):
+                self._push(signal, size)
+            else:
+                self._overflow(signal, size)
+        finally:
+            self._lock.release()
+
+    def swap(self):
+        """ Take every buffered signal, followed by up to a buffer's worth
+        of spooled signals.
+
+        """
+        with self._lock:
+            signals = self._signals
+            self._signals = deque()
+            self._sizes = deque()
+            self._bytes = 0
+            self._seen = 0
+        signals = list(signals)
+        if self._spool is not None and self._spool.pending:
+            signals.extend(self._spool.read(self._max_signals or None))
+        return signals
+
+    def take_overflow(self):
+        with self._lock:
+            dropped = self.dropped - self._reported[0]
+            spilled = self.spilled - self._reported[1]
+            self._reported = (self.dropped, self.spilled)
+        return dropped, spilled
+
+    @property
+    def backlog(self):
+        return self._spool.pending if self._spool is not None else 0
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+
+    def _is_full(self, size):
+        if self._max_signals and len(self._signals) >= self._max_signals:
+            return True
+        # a single frame bigger than the cap is still let through
+        return bool(self._max_bytes and self._signals and
+                    self._bytes + size > self._max_bytes)
+
+    def _push(self, signal, size):
+        self._signals.append(signal)
+        self._sizes.append(size)
+        self._bytes += size
+
+    def _overflow(self, signal, size):
+        if self._policy == OverflowPolicy.drop_newest:
+            self.dropped += 1
+        elif self._policy == OverflowPolicy.drop_oldest:
+            while self._signals and self._is_full(size):
+                self._signals.popleft()
+                self._bytes -= self._sizes.popleft()
+                self.dropped += 1
+            self._push(signal, size)
+        elif self._policy == OverflowPolicy.sample:
+            # reservoir sampling over everything seen since the last swap
+            idx = random.randrange(self._seen)
+            if idx < len(self._signals):
+                self._signals[idx] = signal
+                self._bytes += size - self._sizes[idx]
+                self._sizes[idx] = size
+            self.dropped += 1
+        else:
+            self._spill(signal)
+
+    def _spill(self, signal):
+        self._spool.write(signal)
+        self.spilled += 1
+
+
+class Spool(object):
+
+    """ An append-only file of signals that are read back in order.
+
+    The file is truncated whenever everything in it has been read back and
+    removed when the spool is closed.
+
+    Args:
+        path (str): The file to spool signals to.
+
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+        self._read_pos = 0
+        self._lock = Lock()
+        self.pending = 0
+
+    def write(self, signal):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._path, 'a+b')
+            self._file.write(json.dumps(
+                signal.to_dict(), default=str).encode('utf-8') + b'\n')
+            self.pending += 1
+
+    def read(self, max_signals=None):
+        """ Read up to `max_signals` of the oldest spooled signals """
+        with self._lock:
+            if not self.pending:
+                return []
+            self._file.flush()
+            self._file.seek(self._read_pos)
+            lines = []
+            while max_signals is None or len(lines) < max_signals:
+                line = self._file.readline()
+                if not line:
+                    break
+                lines.append(line)
+            self._read_pos = self._file.tell()
+            self.pending -= len(lines)
+            if not self.pending:
+                self._file.truncate(0)
+                self._read_pos = 0
+        return [Signal(json.loads(line.decode('utf-8'))) for line in lines]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self._path):
+                os.remove(self._path)
+            self.pending = 0
+            self._read_pos = 0
+
+
+class ResultBuffers(dict):
+
+    """ A ResultBuffer per output, created the first time it is used.
+
+    Args:
+        factory (callable): Builds the buffer for an output given its name.
+
+    """
+
+    def __init__(self, factory=None):
+        super().__init__()
+        self._lock = Lock()
+        self._factory = factory or (lambda output: ResultBuffer())
+
+    def __missing__(self, output):
+        with self._lock:
+            if output not in self:
+                self[output] = self._factory(output)
+            return self[output]
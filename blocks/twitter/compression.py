@@ -0,0 +1,55 @@
+import zlib
+from time import perf_counter
+
+
+class Inflater(object):
+
+    """ Incrementally decompresses a gzip (or zlib) encoded stream.
+
+    Compressed and decompressed byte counts, along with the time spent
+    decompressing, are recorded so the bandwidth saved can be weighed
+    against the CPU it costs.
+
+    Args:
+        counts (ByteCounts): Where compressed (wire) bytes are counted.
+        timer (Timer): Records the time spent decompressing.
+
+    """
+
+    def __init__(self, counts, timer):
+        # 32 + MAX_WBITS accepts both gzip and zlib headers
+        self._zlib = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        self._counts = counts
+        self._timer = timer
+
+    def decompress(self, data):
+        """ Decompress the next piece of the stream, which may not produce
+        any output until more of the stream arrives.
+
+        """
+        self._counts.add_wire(len(data))
+        start = perf_counter()
+        data = self._zlib.decompress(data)
+        self._timer.record(perf_counter() - start)
+        return data
+
+    def reader(self, read1, size=64 * 1024):
+        """ Return a readinto function that decompresses what `read1`
+        returns, for use with a FrameReader.
+
+        """
+        def readinto(buf):
+            while True:
+                data = self._zlib.unconsumed_tail
+                if not data:
+                    data = read1(size)
+                    if not data:
+                        return 0
+                    self._counts.add_wire(len(data))
+                start = perf_counter()
+                out = self._zlib.decompress(data, len(buf))
+                self._timer.record(perf_counter() - start)
+                if out:
+                    buf[:len(out)] = out
+                    return len(out)
+        return readinto
@@ -0,0 +1,171 @@
+import json
+from enum import Enum
+from threading import local
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+
+class JSONDecoder(Enum):
+    auto = 0
+    stdlib = 1
+    orjson = 2
+    simdjson = 3
+
+
+def available_decoders():
+    """ Return the installed decoder backends, slowest to fastest """
+    decoders = [JSONDecoder.stdlib]
+    if simdjson is not None:
+        decoders.append(JSONDecoder.simdjson)
+    if orjson is not None:
+        decoders.append(JSONDecoder.orjson)
+    return decoders
+
+
+def get_path(data, path):
+    """ Look up a dotted path such as `user.screen_name` in a dict.
+
+    Raises:
+        KeyError: if any part of the path is missing
+    """
+    for key in path.split('.'):
+        if not isinstance(data, dict):
+            raise KeyError(path)
+        data = data[key]
+    return data
+
+
+def json_pointer(path):
+    """ The JSON pointer (RFC 6901) to the same value as a dotted path,
+    with `~` and `/` in its keys escaped.
+
+    """
+    return ''.join('/' + key.replace('~', '~0').replace('/', '~1')
+                   for key in path.split('.'))
+
+
+def set_path(data, path, value):
+    """ Set a dotted path in a dict, creating nested dicts as needed """
+    keys = path.split('.')
+    for key in keys[:-1]:
+        data = data.setdefault(key, {})
+    data[keys[-1]] = value
+
+
+class Decoder(object):
+
+    """ Decodes raw Twitter frames into dicts.
+
+    Args:
+        backend (JSONDecoder): The JSON library to use. `auto` picks the
+            fastest one installed, falling back to the standard library.
+            With fields set that is simdjson, which only builds the fields
+            wanted, where orjson decodes the whole frame first.
+        fields (list(str)): When set, only these fields are materialized.
+            Fields may be dotted paths into nested objects, for example
+            `user.screen_name`, and are returned nested the same way.
+        passthrough (list(str)): Top level keys that mark a message which
+            is always decoded in full, such as stream notices.
+
+    Frames may be decoded from several threads at once.
+
+    """
+
+    def __init__(self, backend=JSONDecoder.auto, fields=None,
+                 passthrough=()):
+        if backend == JSONDecoder.auto:
+            backend = self._auto_backend(fields)
+        elif backend not in available_decoders():
+            raise ValueError(
+                "JSON decoder {} is not installed".format(backend.name))
+        self.backend = backend
+        self._fields = list(fields or [])
+        self._pointers = [(f, json_pointer(f)) for f in self._fields]
+        self._passthrough = list(passthrough)
+        self._lazy = False
+        # simdjson parsers reuse their document, so each thread has its own
+        self._local = local()
+
+        if backend == JSONDecoder.simdjson:
+            self._lazy = True
+            self._loads = simdjson.loads
+        elif backend == JSONDecoder.orjson:
+            self._loads = orjson.loads
+        else:
+            self._loads = self._stdlib_loads
+
+    def decode(self, line):
+        """ Decode a frame (bytes or memoryview) into a dict """
+        if not self._fields:
+            return self._loads(line)
+        if self._lazy:
+            return self._project_lazy(line)
+        return self.project(self._loads(line))
+
+    def project(self, data):
+        """ Keep only the configured fields of an already decoded dict """
+        if not isinstance(data, dict) or self._is_passthrough(data):
+            return data
+        result = {}
+        for field in self._fields:
+            try:
+                set_path(result, field, get_path(data, field))
+            except KeyError:
+                pass
+        return result
+
+    def _project_lazy(self, line):
+        """ Parse into a lazy document and only build the wanted fields.
+
+        The parser reuses its document, so everything returned has to be
+        materialized before the next frame is parsed.
+        """
+        parser = getattr(self._local, 'parser', None)
+        if parser is None:
+            parser = self._local.parser = simdjson.Parser()
+        doc = parser.parse(line)
+        if not isinstance(doc, simdjson.Object):
+            return _materialize(doc)
+        if self._is_passthrough(doc):
+            return doc.as_dict()
+        result = {}
+        for field, pointer in self._pointers:
+            try:
+                value = doc.at_pointer(pointer)
+            except (KeyError, ValueError):
+                continue
+            set_path(result, field, _materialize(value))
+        return result
+
+    @staticmethod
+    def _auto_backend(fields):
+        installed = available_decoders()
+        if fields and JSONDecoder.simdjson in installed:
+            return JSONDecoder.simdjson
+        return installed[-1]
+
+    def _is_passthrough(self, data):
+        for key in self._passthrough:
+            if key in data:
+                return True
+        return False
+
+    @staticmethod
+    def _stdlib_loads(line):
+        return json.loads(str(line, 'utf-8'))
+
+
+def _materialize(value):
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    if isinstance(value, simdjson.Array):
+        return value.as_list()
+    return value
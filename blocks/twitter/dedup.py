@@ -0,0 +1,74 @@
+from collections import deque
+from threading import Lock
+from time import monotonic
+
+
+class RecentIds(object):
+
+    """ Remembers the message ids seen within a time window.
+
+    Ids are kept in a ring of hash sets, each covering a slice of the
+    window. As time passes the oldest set is dropped whole, so there is no
+    per-id expiry to track. A set that fills up before its slice is over
+    is rotated out early, which bounds memory at `max_ids` however fast
+    messages arrive, at the cost of a shorter window during bursts. Ids
+    may be added from several threads.
+
+    Args:
+        window (float): Seconds an id is remembered for.
+        max_ids (int): The most ids remembered at once.
+        buckets (int): How many slices the window is divided into.
+
+    """
+
+    def __init__(self, window, max_ids, buckets=8):
+        if window <= 0 or buckets < 1:
+            raise ValueError(
+                "Ids must be remembered for a positive window in at least "
+                "one bucket, not {} seconds in {}".format(window, buckets))
+        self._span = window / buckets
+        self._bucket_size = max(1, max_ids // buckets)
+        self._buckets = deque([set()], maxlen=buckets)
+        self._started = monotonic()
+        self._lock = Lock()
+        self.checked = 0
+        self.duplicates = 0
+
+    def add(self, message_id):
+        """ Remember an id, returning False if it was already seen """
+        with self._lock:
+            self.checked += 1
+            # rotate first so ids past the window are already forgotten
+            current = self._current()
+            for bucket in self._buckets:
+                if message_id in bucket:
+                    self.duplicates += 1
+                    return False
+            current.add(message_id)
+            return True
+
+    def _current(self):
+        now = monotonic()
+        elapsed = int((now - self._started) / self._span)
+        if elapsed:
+            # start a fresh set for each slice that has passed, which also
+            # empties the ring after a long enough quiet spell
+            for _ in range(min(elapsed, self._buckets.maxlen)):
+                self._buckets.append(set())
+            self._started = now
+        elif len(self._buckets[-1]) >= self._bucket_size:
+            self._buckets.append(set())
+            self._started = now
+        return self._buckets[-1]
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._buckets)
+
+    def to_dict(self):
+        return {
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'duplicate_rate':
+                self.duplicates / self.checked if self.checked else None,
+            'size': len(self)
+        }
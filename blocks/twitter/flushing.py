@@ -0,0 +1,101 @@
+from threading import Condition, Thread
+from time import monotonic
+
+
+class FlushScheduler(object):
+
+    """ Decides when buffered signals are notified.
+
+    A batch is flushed once `max_signals` have been buffered or `max_delay`
+    after its first signal arrived, whichever comes first, but never
+    sooner than `min_interval` after the previous flush. The flushing
+    thread sleeps until a signal is buffered, so an idle stream costs
+    nothing between batches.
+
+    Args:
+        flush (callable): Notifies everything buffered and returns how many
+            signals are still waiting, such as ones spooled to disk.
+        max_delay (float): Seconds a signal may wait to be notified.
+        max_signals (int): Buffered signals that trigger a flush straight
+            away, 0 to only flush on time.
+        min_interval (float): Minimum seconds between two flushes.
+        logger: Where errors raised while flushing are logged.
+
+    """
+
+    def __init__(self, flush, max_delay, max_signals=0, min_interval=0,
+                 logger=None):
+        self._flush = flush
+        self._max_delay = max_delay
+        self._max_signals = max_signals
+        self._min_interval = min_interval
+        self._logger = logger
+        self._cond = Condition()
+        self._pending = 0
+        self._first = 0
+        self._last = 0
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._stopped = False
+        self._thread = Thread(target=self._run, name='TwitterFlush',
+                              daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def added(self):
+        """ Count a newly buffered signal, waking the flushing thread when
+        it starts a batch or fills one.
+
+        """
+        with self._cond:
+            self._pending += 1
+            if self._pending == 1:
+                self._first = monotonic()
+                self._cond.notify()
+            elif self._pending == self._max_signals:
+                self._cond.notify()
+
+    def _due(self):
+        if self._max_signals and self._pending >= self._max_signals:
+            due = 0
+        else:
+            due = self._first + self._max_delay
+        return max(due, self._last + self._min_interval)
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                now = monotonic()
+                due = self._due()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                self._pending = 0
+                self._last = now
+                # flush without the lock so the stream is never held up
+                self._cond.release()
+                try:
+                    waiting = self._flush()
+                except Exception:
+                    waiting = 0
+                    if self._logger is not None:
+                        self._logger.exception("Failed to notify signals")
+                finally:
+                    self._cond.acquire()
+                if waiting:
+                    # signals left behind start the next batch right away
+                    if not self._pending:
+                        self._first = now
+                    self._pending += waiting
@@ -0,0 +1,144 @@
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class FrameReader(object):
+
+    """ Splits a Twitter `delimited=length` stream into frames.
+
+    Each message on the stream is prefixed with its length in bytes
+    followed by `\\r\\n`. Keep-alives are sent as a bare `\\r\\n`.
+
+    Data is read in large chunks into a single reusable buffer and complete
+    frames are sliced out of it as memoryviews, so a frame is only valid
+    until the next call to `read_frame`. Partial frames are kept in the
+    buffer until the rest of their bytes arrive.
+
+    Args:
+        readinto (callable): Reads available bytes into the writable buffer
+            it is given and returns the number of bytes read. Returning 0
+            means the stream is closed.
+        chunk_size (int): The initial size of the read buffer. The buffer
+            grows if a single frame does not fit in it.
+
+    """
+
+    def __init__(self, readinto, chunk_size=DEFAULT_CHUNK_SIZE):
+        self._readinto = readinto
+        self._buf = bytearray(chunk_size)
+        self._view = memoryview(self._buf)
+        # unconsumed data lives in self._buf[self._start:self._end]
+        self._start = 0
+        self._end = 0
+
+    def read_frame(self):
+        """ Read the next frame off of the stream.
+
+        Returns:
+            frame (memoryview): The bytes of the next message, or None if
+                the frame was a keep-alive.
+
+        Raises:
+            Exception: if the stream was closed before a full frame was read
+        """
+        # find the end of the length prefix
+        idx = self._buf.find(b'\n', self._start, self._end)
+        while idx < 0:
+            # filling may shift the buffer, so only track the offset
+            searched = self._end - self._start
+            self._fill(searched + 1)
+            idx = self._buf.find(b'\n', self._start + searched, self._end)
+
+        prefix = self._buf[self._start:idx]
+        self._start = idx + 1
+
+        # only received \r\n so it is a keep-alive
+        if not prefix.strip():
+            return None
+
+        length = int(prefix)
+        if self._end - self._start < length:
+            self._fill(length)
+
+        frame = self._view[self._start:self._start + length]
+        self._start += length
+        return frame
+
+    def _fill(self, required):
+        """ Read from the stream until `required` unconsumed bytes are
+        buffered, making room in the buffer first if needed.
+
+        """
+        pending = self._end - self._start
+        if required > len(self._buf):
+            # allocate a new buffer rather than resizing, any frames handed
+            # out keep a view on the old one
+            buf = bytearray(max(required, 2 * len(self._buf)))
+            buf[:pending] = self._view[self._start:self._end]
+            self._buf = buf
+            self._view = memoryview(buf)
+            self._start, self._end = 0, pending
+        elif self._start + required > len(self._buf):
+            # shift the partial frame to the front of the buffer
+            self._buf[:pending] = self._buf[self._start:self._end]
+            self._start, self._end = 0, pending
+
+        while self._end - self._start < required:
+            n_bytes = self._readinto(self._view[self._end:])
+            if not n_bytes:
+                raise Exception("No bytes read from stream")
+            self._end += n_bytes
+
+
+class FrameParser(object):
+
+    """ A push based counterpart to FrameReader for callers that receive
+    data rather than read it, like the asyncio engine.
+
+    Chunks are fed in as they arrive and every frame they complete is
+    returned as a memoryview, with None for keep-alives. Chunks are only
+    joined once enough bytes have arrived to complete the next frame, so a
+    large frame spread over many chunks is copied once.
+
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._pending = 0
+        # bytes needed before it is worth looking for the next frame
+        self._needed = 1
+
+    def feed(self, data):
+        """ Add a chunk of the stream and return the frames it completes """
+        self._chunks.append(data)
+        self._pending += len(data)
+        if self._pending < self._needed:
+            return []
+
+        buf = self._chunks[0]
+        if len(self._chunks) > 1 or not isinstance(buf, bytes):
+            buf = b''.join(self._chunks)
+        view = memoryview(buf)
+        frames = []
+        start = 0
+        while True:
+            idx = buf.find(b'\n', start)
+            if idx < 0:
+                self._needed = len(buf) - start + 1
+                break
+            prefix = buf[start:idx]
+            if not prefix.strip():
+                # only received \r\n so it is a keep-alive
+                frames.append(None)
+                start = idx + 1
+                continue
+            end = idx + 1 + int(prefix)
+            if end > len(buf):
+                self._needed = end - start
+                break
+            frames.append(view[idx + 1:end])
+            start = end
+
+        rest = view[start:]
+        self._chunks = [rest] if len(rest) else []
+        self._pending = len(rest)
+        return frames
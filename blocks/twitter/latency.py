@@ -0,0 +1,54 @@
+from threading import Lock
+from time import monotonic
+
+
+# the hidden signal attribute holding the monotonic time a message was read
+# off the stream, hidden so it is left out when signals are serialized
+INGEST_ATTR = '_ingest_ts'
+
+
+class LatencyHistogram(object):
+
+    """ Latencies counted in power of two millisecond buckets.
+
+    Bucket `i` counts latencies under 2**i ms, the last bucket counts
+    everything longer.
+
+    """
+
+    n_buckets = 24
+
+    def __init__(self):
+        self.buckets = [0] * self.n_buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = Lock()
+
+    def record(self, seconds):
+        idx = min(int(seconds * 1000).bit_length(), self.n_buckets - 1)
+        with self._lock:
+            self.buckets[idx] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def record_signals(self, signals, now=None):
+        """ Record the time since each stamped signal was ingested """
+        now = monotonic() if now is None else now
+        for signal in signals:
+            stamp = getattr(signal, INGEST_ATTR, None)
+            if stamp is not None:
+                self.record(now - stamp)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0,
+            'max_ms': self.max * 1000,
+            'buckets': {
+                '<{}ms'.format(2 ** idx): count
+                for idx, count in enumerate(self.buckets) if count
+            }
+        }
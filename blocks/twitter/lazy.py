@@ -0,0 +1,84 @@
+import re
+
+from nio.signal.base import Signal
+
+
+# the first key of a JSON object frame
+_FIRST_KEY = re.compile(rb'\s*\{\s*"([^"\\]*)"')
+
+
+def frame_key(line):
+    """ Return the first key of a frame holding a JSON object, without
+    decoding it, or None if the frame does not start with one.
+
+    """
+    match = _FIRST_KEY.match(line)
+    return str(match.group(1), 'utf-8') if match else None
+
+
+class LazySignal(Signal):
+
+    """ A signal that holds the raw frame of a message and only decodes it
+    when one of its attributes is first read.
+
+    A raw frame takes a fraction of the memory of its decoded objects, and
+    signals that are notified but never read, or dropped on the way, are
+    never decoded at all. Once decoded the signal behaves like any other.
+    Attributes set before then are kept over the decoded ones, and hidden
+    attributes like the ingest stamp never trigger decoding.
+
+    A frame that fails to decode leaves the signal without attributes,
+    and its error is handed to `on_error` rather than raised in whichever
+    block first reads the signal.
+
+    Args:
+        line (bytes): The raw frame. It is copied, so it may be a view
+            into a reused read buffer.
+        decode (callable): Turns the frame into a dict of attributes.
+        on_error (callable): Called with the error of a frame that fails
+            to decode.
+
+    """
+
+    def __init__(self, line, decode, on_error=None):
+        super().__init__()
+        self._lazy = (bytes(line), decode, on_error)
+
+    def __getattr__(self, name):
+        # only called for attributes that are not set yet
+        if name.startswith('_') or not self._materialize():
+            raise AttributeError(name)
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def _materialize(self):
+        """ Decode the frame into attributes, returning False if it was
+        already decoded.
+
+        """
+        lazy = self.__dict__.get('_lazy')
+        if lazy is None:
+            return False
+        line, decode, on_error = lazy
+        attrs = self.__dict__
+        attrs.pop('_lazy', None)
+        try:
+            decoded = decode(line)
+        except Exception as e:
+            if on_error is not None:
+                on_error(e)
+            return True
+        for key, value in decoded.items():
+            attrs.setdefault(key, value)
+        return True
+
+    def to_dict(self, *args, **kwargs):
+        self._materialize()
+        return super().to_dict(*args, **kwargs)
+
+    def __getstate__(self):
+        # signals are copied and pickled decoded, without the decoder
+        self._materialize()
+        return self.__dict__
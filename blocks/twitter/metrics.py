@@ -0,0 +1,138 @@
+from threading import Lock
+from time import monotonic
+
+
+class Timer(object):
+
+    """ Accumulates the number, total and peak duration of timed events.
+
+    Durations are recorded in seconds and reported in microseconds, which
+    is the scale of per-tweet costs. Sharded streams record from a reader
+    thread per shard, so recording takes a lock.
+
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'mean_us': self.mean * 1e6,
+                'max_us': self.max * 1e6,
+                'total_s': self.total
+            }
+
+
+class ByteCounts(object):
+
+    """ Bytes received on the wire and after any decompression, counted
+    from every reader thread.
+
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.wire = 0
+        self.stream = 0
+
+    def add_wire(self, n_bytes):
+        with self._lock:
+            self.wire += n_bytes
+
+    def add_stream(self, n_bytes):
+        with self._lock:
+            self.stream += n_bytes
+
+    def to_dict(self):
+        return {
+            'wire': self.wire,
+            'stream': self.stream,
+            'compression_ratio':
+                self.stream / self.wire if self.wire else None
+        }
+
+
+class StreamRates(object):
+
+    """ Frames and bytes read over the last `window` seconds.
+
+    Counts are kept in a ring of one second slots. Recording a frame only
+    touches the current slot, so the cost per frame is constant however
+    long the window, and slots are cleared as the ring wraps around rather
+    than expiring counts one by one. Like Timer, it is recorded from every
+    reader thread and locks.
+
+    Args:
+        window (int): Seconds of history the rates are averaged over.
+
+    """
+
+    def __init__(self, window=60):
+        self._window = window
+        self._seconds = [None] * window
+        self._frames = [0] * window
+        self._bytes = [0] * window
+        self._started = monotonic()
+        self._lock = Lock()
+        self.frames = 0
+        self.bytes = 0
+
+    def record(self, n_bytes, now=None):
+        second = int(monotonic() if now is None else now)
+        slot = second % self._window
+        with self._lock:
+            if self._seconds[slot] != second:
+                self._seconds[slot] = second
+                self._frames[slot] = 0
+                self._bytes[slot] = 0
+            self._frames[slot] += 1
+            self._bytes[slot] += n_bytes
+            self.frames += 1
+            self.bytes += n_bytes
+
+    def rates(self, now=None):
+        """ Return the frames and bytes per second over the window, leaving
+        out the second still being counted.
+
+        """
+        second = int(monotonic() if now is None else now)
+        span = min(self._window - 1, second - int(self._started))
+        if span < 1:
+            return None, None
+        frames = n_bytes = 0
+        with self._lock:
+            for slot, slot_second in enumerate(self._seconds):
+                if slot_second is not None and \
+                        second - self._window < slot_second < second:
+                    frames += self._frames[slot]
+                    n_bytes += self._bytes[slot]
+        return frames / span, n_bytes / span
+
+    def to_dict(self):
+        frames_per_sec, bytes_per_sec = self.rates()
+        return {
+            'frames': self.frames,
+            'bytes': self.bytes,
+            'frames_per_sec': frames_per_sec,
+            'bytes_per_sec': bytes_per_sec
+        }
@@ -0,0 +1,163 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from threading import Condition, Thread
+from time import monotonic
+
+from .decoding import Decoder
+
+
+# each worker process' decoder, set up when the worker starts
+_decoder = None
+
+
+def _init_worker(backend, fields, passthrough):
+    global _decoder
+    _decoder = Decoder(backend, fields, passthrough)
+
+
+def _decode_batch(frames):
+    """ Decode a batch of frames in a worker process.
+
+    Returns:
+        list(tuple): `(data, None)` for each frame decoded and
+            `(None, error)` for each one that could not be.
+    """
+    results = []
+    for frame in frames:
+        try:
+            results.append((_decoder.decode(frame), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+
+class ParallelDecoder(object):
+
+    """ Decodes frames in batches on a pool of worker processes, so decoding
+    is not held to a single core by the GIL.
+
+    Frames are batched as they are submitted, and a batch is sent to the
+    pool once it is full or `max_delay` after its first frame. Decoded
+    messages are handed to `handle` on a single dispatch thread in the
+    order their frames were submitted. While `workers * 2` batches are
+    being decoded, submitting blocks, so a pool that cannot keep up slows
+    the reader down rather than queueing frames without bound.
+
+    Args:
+        handle (callable): Called with each decoded message, the error
+            decoding it raised or None, and the context its frame was
+            submitted with.
+        decoder_args (tuple): The backend, fields and passthrough keys of
+            each worker's Decoder.
+        workers (int): Worker processes in the pool.
+        batch_size (int): Frames sent to a worker at once.
+        max_delay (float): The most seconds a frame waits for its batch to
+            fill before being sent.
+        logger: Where batches that fail are logged.
+
+    """
+
+    def __init__(self, handle, decoder_args, workers=2, batch_size=100,
+                 max_delay=0.05, logger=None):
+        self._handle = handle
+        self._decoder_args = decoder_args
+        self._workers = workers
+        self._batch_size = max(1, batch_size)
+        self._max_delay = max_delay
+        self._max_inflight = workers * 2
+        self._logger = logger
+        self._cond = Condition()
+        self._frames = []
+        self._contexts = []
+        self._first = 0
+        self._inflight = deque()   # (future, contexts), oldest first
+        self._stopped = False
+        self._pool = None
+        self._thread = None
+
+    def start(self):
+        self._stopped = False
+        # spawn the workers, forking a process that runs other threads
+        # can leave locks held in the child
+        self._pool = ProcessPoolExecutor(
+            self._workers, multiprocessing.get_context('spawn'),
+            initializer=_init_worker, initargs=self._decoder_args)
+        self._thread = Thread(target=self._run, name='TwitterDecode',
+                              daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stop dispatching, dropping frames that were not handled yet """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._pool = None
+
+    def submit(self, frame, context=None):
+        """ Queue a frame to be decoded, along with a context to hand back
+        with the decoded message.
+
+        """
+        with self._cond:
+            while len(self._inflight) >= self._max_inflight and \
+                    not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return
+            if not self._frames:
+                # wake the dispatcher to time the new batch
+                self._first = monotonic()
+                self._cond.notify_all()
+            # frames may be views into a reused read buffer
+            self._frames.append(bytes(frame))
+            self._contexts.append(context)
+            if len(self._frames) >= self._batch_size:
+                self._send()
+
+    def _send(self):
+        """ Send the batched frames to the pool, with the lock held """
+        future = self._pool.submit(_decode_batch, self._frames)
+        self._inflight.append((future, self._contexts))
+        self._frames = []
+        self._contexts = []
+        self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    if self._frames and \
+                            monotonic() - self._first >= self._max_delay:
+                        self._send()
+                    if self._inflight:
+                        break
+                    self._cond.wait(
+                        self._first + self._max_delay - monotonic()
+                        if self._frames else None)
+                future, contexts = self._inflight[0]
+
+            try:
+                results = future.result()
+            except (Exception, CancelledError) as e:
+                if self._stopped:
+                    return
+                if self._logger is not None:
+                    self._logger.error(
+                        "Could not decode a batch of {} frames: {}".format(
+                            len(contexts), e))
+                results = [(None, str(e))] * len(contexts)
+
+            with self._cond:
+                self._inflight.popleft()
+                # a reader may be waiting for room in the pool
+                self._cond.notify_all()
+            for (data, error), context in zip(results, contexts):
+                self._handle(data, error, context)
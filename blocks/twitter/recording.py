@@ -0,0 +1,113 @@
+import glob
+import gzip
+import os
+import time
+import zlib
+from enum import Enum
+from threading import Lock
+
+
+class RecordingMode(Enum):
+    off = 0
+    record = 1
+    replay = 2
+
+
+class StreamRecorder(object):
+
+    """ Tees the raw bytes read off a stream to rotating gzip files.
+
+    Every read is stored as a record of its wall clock time and length
+    followed by the bytes exactly as they came off the stream, keep-alives
+    and partial frames included, so a replay can reproduce both the data
+    and its timing. An empty record marks the start of a new connection.
+
+    Args:
+        directory (str): Where recordings are written.
+        prefix (str): The start of every recording file name.
+        max_file_size (int): Uncompressed bytes written before rotating
+            to a new file.
+        max_files (int): Recordings kept, the oldest are deleted. 0 keeps
+            every file.
+
+    """
+
+    compresslevel = 1
+
+    def __init__(self, directory, prefix, max_file_size, max_files=0):
+        self._directory = directory
+        self._prefix = prefix
+        self._max_file_size = max_file_size
+        self._max_files = max_files
+        self._file = None
+        self._written = 0
+        self._index = 0
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, data):
+        with self._lock:
+            if self._file is None or self._written >= self._max_file_size:
+                self._rotate()
+            header = '{:.6f} {}\r\n'.format(time.time(), len(data))
+            self._file.write(header.encode('ascii'))
+            self._file.write(data)
+            self._written += len(data)
+
+    def new_connection(self):
+        """ Mark that the bytes that follow come from a new connection """
+        self.write(b'')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        # the index keeps names unique and sorted within the same second
+        name = '{}-{}-{:06d}.rec.gz'.format(
+            self._prefix, time.strftime('%Y%m%dT%H%M%S'), self._index)
+        self._index += 1
+        self._file = gzip.open(os.path.join(self._directory, name), 'wb',
+                               compresslevel=self.compresslevel)
+        self._written = 0
+        if self._max_files:
+            for path in recordings(
+                    self._directory, self._prefix)[:-self._max_files]:
+                os.remove(path)
+
+
+def recordings(directory, prefix):
+    """ Return the recording files for a prefix, oldest first """
+    return sorted(glob.glob(
+        os.path.join(directory, '{}-*.rec.gz'.format(prefix))))
+
+
+def read_recordings(paths, logger=None):
+    """ Yield the (timestamp, bytes) records of recording files in order.
+
+    The newest recording is usually cut short when the recording block
+    was stopped or crashed. The records of a file read before it ends
+    early are kept, and the rest of the file is skipped.
+
+    """
+    for path in paths:
+        try:
+            with gzip.open(path, 'rb') as recording:
+                while True:
+                    header = recording.readline()
+                    if not header:
+                        break
+                    timestamp, length = header.split()
+                    data = recording.read(int(length))
+                    if len(data) < int(length):
+                        raise EOFError("record cut short")
+                    yield float(timestamp), data
+        except (EOFError, zlib.error) as e:
+            if logger is not None:
+                logger.warning(
+                    "Recording {} ends early, skipping the rest of it: "
+                    "{}".format(path, e))
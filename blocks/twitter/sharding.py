@@ -0,0 +1,154 @@
+import socket
+from threading import Event, Thread
+from time import monotonic
+
+from .backoff import Backoff
+
+
+class StreamShard(object):
+
+    """ One of several connections that together carry a block's stream.
+
+    Each shard reads on its own thread and reconnects with its own
+    backoff. A connection that is silent for longer than the block's
+    `rc_interval` times out and is reconnected, so shards need no monitor
+    job. Frames are handed to the block's `_record_line` from the shard's
+    thread.
+
+    Args:
+        block (TwitterStreamBlock): The block to stream for.
+        index (int): The shard's position, used for its thread and stats.
+        params (dict): The request parameters for this shard's connection.
+
+    """
+
+    connect_timeout = 45
+
+    def __init__(self, block, index, params):
+        self._block = block
+        self.index = index
+        self.params = params
+        self._backoff = Backoff(block.backoff().initial().total_seconds(),
+                                block.backoff().maximum().total_seconds(),
+                                block.backoff().jitter())
+        self._stop_event = Event()
+        self._thread = None
+        self._conn = None
+        self._started = None
+        self.messages = 0
+        self.bytes = 0
+        self.connects = 0
+
+    def start(self):
+        self._started = monotonic()
+        self._thread = Thread(target=self._run, daemon=True,
+                              name='TwitterShard-{}'.format(self.index))
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        conn = self._conn
+        if conn is not None and conn.sock is not None:
+            # wake up a read blocked on the socket
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(self.connect_timeout)
+            self._thread = None
+
+    def _run(self):
+        block = self._block
+        block._reader.shard = self.index
+        while not self._stop_event.is_set():
+            try:
+                self._stream()
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                block.logger.error(
+                    "While streaming shard {}: {}".format(self.index, e))
+            finally:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+            delay = self._backoff.next_delay()
+            block.logger.debug("Reconnecting shard {} in {} seconds".format(
+                self.index, delay))
+            self._stop_event.wait(delay)
+
+    def _stream(self):
+        """ Make one connection and read from it until it fails """
+        block = self._block
+        # This is a new stream so reset the limit count
+        block._limit_counts[self.index] = 0
+
+        self._conn, response = block._open_connection(
+            self.params, self.connect_timeout)
+        if response.status != 200:
+            block.logger.warning(
+                'Status: {} returned from twitter to shard {}: {}'.format(
+                    response.status, self.index, response.read()))
+            return
+        block.logger.debug('Shard {} connected'.format(self.index))
+        self._backoff.reset()
+        self.connects += 1
+        # a silent connection times out and is reconnected
+        self._conn.sock.settimeout(block.rc_interval().total_seconds())
+
+        frames = block._frame_reader(response)
+        while not self._stop_event.is_set():
+            frame = frames.read_frame()
+            if frame is None:
+                block._on_keep_alive()
+                continue
+            self.messages += 1
+            self.bytes += len(frame)
+            block._record_line(frame)
+
+    @property
+    def reconnects(self):
+        return self._backoff.reconnect_timer.count
+
+    def to_dict(self):
+        elapsed = monotonic() - self._started if self._started else 0
+        return {
+            'connected': self._conn is not None,
+            'connects': self.connects,
+            'messages': self.messages,
+            'bytes': self.bytes,
+            'messages_per_sec': self.messages / elapsed if elapsed else None,
+            'reconnect': self._backoff.to_dict()
+        }
+
+
+class ShardedStream(object):
+
+    """ Streams over several connections at once, each carrying part of the
+    block's filter, and merges them into the block's outputs.
+
+    Args:
+        block (TwitterStreamBlock): The block to stream for.
+        shard_params (list(dict)): Request parameters for each connection.
+
+    """
+
+    def __init__(self, block, shard_params):
+        self.shards = [StreamShard(block, index, params)
+                       for index, params in enumerate(shard_params)]
+
+    def start(self):
+        for shard in self.shards:
+            shard.start()
+
+    def stop(self):
+        for shard in self.shards:
+            shard.stop()
+
+    @property
+    def reconnects(self):
+        return sum(shard.reconnects for shard in self.shards)
+
+    def to_dict(self):
+        return [shard.to_dict() for shard in self.shards]
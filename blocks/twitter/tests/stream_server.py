@@ -0,0 +1,321 @@
+""" A local stand-in for the Twitter APIs the Twitter blocks talk to.
+
+It serves the OAuth verify and user lookup endpoints and streams
+length-delimited frames with keep-alives, `limit`/`disconnect`/`warning`
+notices and a configurable message rate. Tests use it in-process,
+benchmarks run it on its own:
+
+    python -m blocks.twitter.tests.stream_server --port 8080 --rate 1000
+
+It also holds the fixtures shared by the tests that stream from it.
+
+"""
+import argparse
+import itertools
+import json
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+from urllib.parse import parse_qs
+
+from nio.util.discovery import not_discoverable
+
+from ..twitter_block import Twitter
+
+
+VERIFY_PATH = '/1.1/account/verify_credentials.json'
+USERS_PATH = '/1.1/users/lookup.json'
+
+TWEETS = [{'id_str': str(i), 'text': 'Merry #Christmas'} for i in range(3)]
+
+
+def frame(message):
+    """ Encode a message the way `delimited=length` streams do """
+    payload = json.dumps(message).encode('utf-8') + b'\r\n'
+    return str(len(payload)).encode('utf-8') + b'\r\n' + payload
+
+
+def sample_tweet(i):
+    """ A tweet about the size and shape of a real one """
+    return {
+        'created_at': 'Mon Dec 25 12:00:00 +0000 2017',
+        'id': i,
+        'id_str': str(i),
+        'text': 'Merry #Christmas to all and a good night! {}'.format(i),
+        'source': '<a href="http://twitter.com">Twitter Web Client</a>',
+        'truncated': False,
+        'user': {
+            'id': 1000 + i % 500,
+            'id_str': str(1000 + i % 500),
+            'name': 'Santa Claus',
+            'screen_name': 'santa{}'.format(i % 500),
+            'location': 'North Pole',
+            'description': 'Ho ho ho. ' * 16,
+            'followers_count': 1225,
+            'friends_count': 9,
+            'profile_image_url': 'http://pbs.twimg.com/profile_images/1.png'
+        },
+        'entities': {
+            'hashtags': [{'text': 'Christmas', 'indices': [6, 16]}],
+            'urls': [],
+            'user_mentions': [],
+            'symbols': []
+        },
+        'lang': 'en',
+        'filter_level': 'low',
+        'extended': 'x' * 3000
+    }
+
+
+def user_id(screen_name):
+    """ The id the stand-in gives a screen name """
+    return str(zlib.crc32(screen_name.lower().encode('utf-8')))
+
+
+def limit_notice(track):
+    return {'limit': {'track': track}}
+
+
+def disconnect_notice(code=5, reason='Normal'):
+    return {'disconnect': {'code': code, 'stream_name': 'standin',
+                           'reason': reason}}
+
+
+def warning_notice(percent_full=60):
+    return {'warning': {'code': 'FALLING_BEHIND',
+                        'message': 'Your connection is falling behind.',
+                        'percent_full': percent_full}}
+
+
+class StreamServer(object):
+
+    """ A local stand-in for the Twitter Streaming API.
+
+    Every streaming request is answered with a chunked stream of
+    length-delimited frames.
+
+    Args:
+        messages (list(dict)): Messages to send on each connection, cycled
+            through when `count` is larger. Defaults to sample tweets.
+        count (int): Messages to send per connection, None sends each of
+            `messages` once.
+        rate (float): Messages per second, 0 sends as fast as possible.
+        keep_alive_every (int): Send a keep-alive before every Nth message.
+        keep_alive_interval (float): Seconds between keep-alives once every
+            message has been sent and the connection is held open.
+        hold_open (bool): Keep the connection open once every message has
+            been sent, otherwise close it so the client reconnects.
+        batch (int): Messages written per chunk.
+        stamp (bool): Set `timestamp_ms` on messages as they are sent.
+        gzip (bool): Gzip the stream for clients that accept it.
+        lookup_delay (float): Seconds each user lookup takes to answer.
+
+    """
+
+    def __init__(self, messages=None, count=None, rate=0, keep_alive_every=0,
+                 keep_alive_interval=0, hold_open=True, batch=1, stamp=False,
+                 gzip=False, lookup_delay=0):
+        self.messages = messages or [sample_tweet(i) for i in range(100)]
+        self.count = len(self.messages) if count is None else count
+        self.rate = rate
+        self.keep_alive_every = keep_alive_every
+        self.keep_alive_interval = keep_alive_interval
+        self.hold_open = hold_open
+        self.batch = batch
+        self.stamp = stamp
+        self.gzip = gzip
+        self.lookup_delay = lookup_delay
+        self.connections = 0
+        self.verified = 0
+        self.lookups = 0
+        self.sent = 0
+        self._frames = None if stamp else [frame(m) for m in self.messages]
+        self._lock = Lock()
+        self._stopped = Event()
+        self._server = None
+
+    @property
+    def host(self):
+        return '{}:{}'.format(*self._server.server_address)
+
+    def start(self, port=0):
+        self._server = ThreadingHTTPServer(
+            ('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if self.path.split('?')[0] == VERIFY_PATH:
+                    server._verify(self)
+                else:
+                    server._stream(self)
+
+            def do_POST(self):
+                body = self.rfile.read(
+                    int(self.headers.get('Content-Length', 0)))
+                if self.path.split('?')[0] == USERS_PATH:
+                    server._lookup(self, body)
+                else:
+                    server._stream(self)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _verify(self, handler):
+        with self._lock:
+            self.verified += 1
+        body = json.dumps({'id_str': '1', 'screen_name': 'standin'})
+        self._respond(handler, 200, body.encode('utf-8'))
+
+    def _lookup(self, handler, body):
+        with self._lock:
+            self.lookups += 1
+        if self.lookup_delay:
+            time.sleep(self.lookup_delay)
+        names = parse_qs(body.decode('utf-8')).get('screen_name', [''])[0]
+        users = [{'id_str': user_id(name), 'screen_name': name}
+                 for name in names.split(',') if name]
+        self._respond(handler, 200, json.dumps(users).encode('utf-8'))
+
+    @staticmethod
+    def _respond(handler, status, body):
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _stream(self, handler):
+        with self._lock:
+            self.connections += 1
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Transfer-Encoding', 'chunked')
+        compressor = None
+        if self.gzip and 'gzip' in handler.headers.get('Accept-Encoding', ''):
+            handler.send_header('Content-Encoding', 'gzip')
+            compressor = zlib.compressobj(wbits=31)
+        handler.end_headers()
+
+        def write(data):
+            if compressor is not None:
+                data = compressor.compress(data) + \
+                    compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._write_chunk(handler, data)
+
+        try:
+            self._send_messages(write)
+            while self.hold_open and not self._stopped.wait(
+                    self.keep_alive_interval or None):
+                write(b'\r\n')
+            handler.wfile.write(b'0\r\n\r\n')
+        except OSError:
+            # the client went away
+            pass
+        handler.close_connection = True
+
+    def _send_messages(self, write):
+        start = time.monotonic()
+        chunk = []
+        for i in range(self.count):
+            if self._stopped.is_set():
+                return
+            if self.keep_alive_every and i % self.keep_alive_every == 0:
+                chunk.append(b'\r\n')
+            chunk.append(self._frame(i))
+            if len(chunk) >= self.batch or i == self.count - 1:
+                if self.rate:
+                    delay = (i + 1) / self.rate - (time.monotonic() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+                write(b''.join(chunk))
+                with self._lock:
+                    self.sent += sum(1 for c in chunk if c != b'\r\n')
+                chunk = []
+
+    def _frame(self, i):
+        if self._frames is not None:
+            return self._frames[i % len(self._frames)]
+        message = dict(self.messages[i % len(self.messages)])
+        message['timestamp_ms'] = str(int(time.time() * 1000))
+        return frame(message)
+
+    @staticmethod
+    def _write_chunk(handler, data):
+        handler.wfile.write('{:x}\r\n'.format(len(data)).encode() +
+                            data + b'\r\n')
+        handler.wfile.flush()
+
+
+@not_discoverable
+class LocalTwitter(Twitter):
+
+    """ A Twitter block that streams from a local stand-in over http """
+
+    streaming_scheme = 'http'
+
+
+def wait_for(condition, timeout=3, interval=0.05):
+    """ Poll a condition until it holds or `timeout` seconds pass """
+    for _ in range(int(timeout / interval)):
+        if condition():
+            return True
+        time.sleep(interval)
+    return condition()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--rate', type=float, default=0,
+                        help='messages per second, 0 for as fast as possible')
+    parser.add_argument('--count', type=int, default=None,
+                        help='messages per connection')
+    parser.add_argument('--keep-alive-interval', type=float, default=30)
+    parser.add_argument('--limit-every', type=int, default=0,
+                        help='send a limit notice every N messages')
+    parser.add_argument('--batch', type=int, default=1)
+    parser.add_argument('--stamp', action='store_true',
+                        help='set timestamp_ms as messages are sent')
+    parser.add_argument('--gzip', action='store_true',
+                        help='gzip the stream for clients that accept it')
+    args = parser.parse_args()
+
+    tweets = [sample_tweet(i) for i in range(100)]
+    if args.limit_every:
+        messages = []
+        track = itertools.count(1)
+        for i, tweet in enumerate(tweets, 1):
+            messages.append(tweet)
+            if i % args.limit_every == 0:
+                messages.append(limit_notice(next(track)))
+    else:
+        messages = tweets
+    server = StreamServer(messages, count=args.count, rate=args.rate,
+                          keep_alive_interval=args.keep_alive_interval,
+                          batch=args.batch, stamp=args.stamp, gzip=args.gzip)
+    server.start(args.port)
+    print('Serving on {}'.format(server.host), flush=True)
+    try:
+        Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
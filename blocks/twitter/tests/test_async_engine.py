@@ -0,0 +1,93 @@
+from time import sleep
+from unittest.mock import MagicMock
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..async_engine import SharedEventLoop
+from .stream_server import LocalTwitter, StreamServer, TWEETS, wait_for
+
+
+class TestAsyncEngine(NIOBlockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._blocks = []
+
+    def tearDown(self):
+        for block in self._blocks:
+            block.stop()
+        self._server.stop()
+        super().tearDown()
+
+    def _start_block(self, **config):
+        block = LocalTwitter()
+        block.streaming_host = self._server.host
+        block._authorize = MagicMock()
+        self.configure_block(block, dict({
+            'phrases': ['#Christmas'],
+            'engine': 'asyncio',
+            'notify_freq': {'milliseconds': 10}
+        }, **config))
+        block.start()
+        self._blocks.append(block)
+        return block
+
+    def test_stream(self):
+        """ Frames and keep-alives are read off a local stream """
+        self._server = StreamServer(TWEETS, keep_alive_every=1)
+        self._server.start()
+        self._start_block()
+        self.assertTrue(wait_for(
+            lambda: len(self.last_notified['tweets']) == len(TWEETS)))
+        self.assertEqual(
+            [s.id_str for s in self.last_notified['tweets']],
+            [t['id_str'] for t in TWEETS])
+
+    def test_gzip(self):
+        """ A gzip stream is decompressed as it arrives """
+        self._server = StreamServer(TWEETS, keep_alive_every=1, gzip=True)
+        self._server.start()
+        block = self._start_block(gzip=True)
+        self.assertTrue(wait_for(
+            lambda: len(self.last_notified['tweets']) == len(TWEETS)))
+        self.assertGreater(block._bytes.wire, 0)
+        self.assertGreater(block._bytes.stream, 0)
+        self.assertGreater(block._inflate_timer.count, 0)
+
+    def test_reconnect(self):
+        """ A closed stream is reconnected after the backoff delay """
+        self._server = StreamServer(TWEETS, hold_open=False)
+        self._server.start()
+        self._start_block()
+        self.assertTrue(wait_for(lambda: self._server.connections >= 2))
+        self.assertTrue(wait_for(
+            lambda: len(self.last_notified['tweets']) >= 2 * len(TWEETS)))
+
+    def test_dedup(self):
+        """ Tweets redelivered after a reconnect are dropped """
+        self._server = StreamServer(TWEETS, hold_open=False)
+        self._server.start()
+        block = self._start_block(dedup={'enabled': True})
+        self.assertTrue(wait_for(
+            lambda: block.stats()['dedup']['duplicates'] == len(TWEETS)))
+        sleep(0.05)
+        self.assertEqual(
+            [s.id_str for s in self.last_notified['tweets']],
+            [t['id_str'] for t in TWEETS])
+
+    def test_shared_loop(self):
+        """ Blocks share one event loop that stops with the last block """
+        self._server = StreamServer(TWEETS)
+        self._server.start()
+        first = self._start_block()
+        loop = SharedEventLoop._loop
+        self._start_block()
+        self.assertIs(SharedEventLoop._loop, loop)
+        self.assertEqual(SharedEventLoop._users, 2)
+        self.assertTrue(wait_for(lambda: self._server.connections == 2))
+
+        first.stop()
+        self._blocks.remove(first)
+        self.assertTrue(loop.is_running())
+        self._blocks.pop().stop()
+        self.assertIsNone(SharedEventLoop._loop)
@@ -0,0 +1,39 @@
+from unittest.mock import patch
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..backoff import Backoff
+
+
+class TestBackoff(NIOBlockTestCase):
+
+    def test_capped(self):
+        """ Delays double up to the maximum """
+        backoff = Backoff(1, 10, jitter=0)
+        self.assertEqual([backoff.next_delay() for _ in range(6)],
+                         [1, 2, 4, 8, 10, 10])
+        self.assertEqual(backoff.attempts, 6)
+
+    def test_jitter(self):
+        """ Up to the jitter fraction of each delay is randomized """
+        backoff = Backoff(4, 100, jitter=0.5)
+        with patch('random.random', side_effect=[0, 1, 0.5]):
+            self.assertEqual(backoff.next_delay(), 4)
+            self.assertEqual(backoff.next_delay(), 4)
+            self.assertEqual(backoff.next_delay(), 12)
+
+    def test_reset(self):
+        """ Connecting starts the delays over and records the time taken
+        """
+        backoff = Backoff(1, 10, jitter=0)
+        backoff.next_delay()
+        backoff.next_delay()
+        backoff.reset()
+        self.assertEqual(backoff.next_delay(), 1)
+        self.assertEqual(backoff.attempts, 3)
+        self.assertEqual(backoff.reconnect_timer.count, 1)
+        # connecting without a failure first is not a reconnect
+        backoff.reset()
+        backoff.reset()
+        self.assertEqual(backoff.reconnect_timer.count, 2)
+        self.assertEqual(backoff.to_dict()['failures'], 0)
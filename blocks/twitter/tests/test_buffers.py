@@ -0,0 +1,108 @@
+import os
+import tempfile
+from threading import Thread
+
+from nio.signal.base import Signal
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..buffers import BoundedResultBuffer, OverflowPolicy, ResultBuffer, \
+    ResultBuffers, Spool
+from ..metrics import Timer
+
+
+class TestResultBuffer(NIOBlockTestCase):
+
+    def test_swap(self):
+        """ Swapping takes the buffered signals and empties the buffer """
+        buffer = ResultBuffer()
+        buffer.append(1)
+        buffer.append(2)
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(buffer.swap(), [1, 2])
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.swap(), [])
+
+    def test_stall_timer(self):
+        """ Appends only record a stall when the lock is held """
+        timer = Timer()
+        buffer = ResultBuffer(timer)
+        buffer.append(1)
+        self.assertEqual(timer.count, 0)
+
+        buffer._lock.acquire()
+        appender = Thread(target=buffer.append, args=(2,))
+        appender.start()
+        appender.join(0.05)
+        buffer._lock.release()
+        appender.join()
+        self.assertEqual(timer.count, 1)
+        self.assertEqual(buffer.swap(), [1, 2])
+
+    def test_buffers_per_output(self):
+        """ A buffer is created for each output on first use """
+        buffers = ResultBuffers()
+        buffers['tweets'].append(1)
+        buffers['limit'].append(2)
+        self.assertCountEqual(buffers.keys(), ['tweets', 'limit'])
+        self.assertIs(buffers['tweets'], buffers['tweets'])
+
+
+class TestBoundedResultBuffer(NIOBlockTestCase):
+
+    def test_drop_oldest(self):
+        buffer = BoundedResultBuffer(max_signals=3)
+        for i in range(5):
+            buffer.append(i)
+        self.assertEqual(buffer.swap(), [2, 3, 4])
+        self.assertEqual(buffer.take_overflow(), (2, 0))
+        self.assertEqual(buffer.take_overflow(), (0, 0))
+
+    def test_drop_newest(self):
+        buffer = BoundedResultBuffer(
+            max_signals=3, policy=OverflowPolicy.drop_newest)
+        for i in range(5):
+            buffer.append(i)
+        self.assertEqual(buffer.swap(), [0, 1, 2])
+        self.assertEqual(buffer.dropped, 2)
+
+    def test_max_bytes(self):
+        buffer = BoundedResultBuffer(max_bytes=100)
+        buffer.append('a', 60)
+        buffer.append('b', 30)
+        buffer.append('c', 30)
+        self.assertEqual(buffer.swap(), ['b', 'c'])
+        # a frame bigger than the cap still gets through on its own
+        buffer.append('d', 500)
+        self.assertEqual(buffer.swap(), ['d'])
+
+    def test_sample(self):
+        buffer = BoundedResultBuffer(
+            max_signals=10, policy=OverflowPolicy.sample)
+        for i in range(1000):
+            buffer.append(i)
+        sample = buffer.swap()
+        self.assertEqual(len(sample), 10)
+        self.assertEqual(len(set(sample)), 10)
+        self.assertEqual(buffer.dropped, 990)
+
+    def test_spill(self):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            spool = Spool(os.path.join(spool_dir, 'tweets.spool'))
+            buffer = BoundedResultBuffer(
+                max_signals=2, policy=OverflowPolicy.spill, spool=spool)
+            for i in range(5):
+                buffer.append(Signal({'i': i}))
+            self.assertEqual(buffer.take_overflow(), (0, 3))
+
+            # memory first, then a buffer's worth from the spool, in order
+            self.assertEqual(
+                [s.i for s in buffer.swap()], [0, 1, 2, 3])
+            # the spool is not drained yet so new signals queue behind it
+            buffer.append(Signal({'i': 5}))
+            self.assertEqual([s.i for s in buffer.swap()], [4, 5])
+            self.assertEqual(spool.pending, 0)
+
+            buffer.append(Signal({'i': 6}))
+            self.assertEqual([s.i for s in buffer.swap()], [6])
+            buffer.close()
+            self.assertFalse(os.listdir(spool_dir))
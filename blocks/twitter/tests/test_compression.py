@@ -0,0 +1,56 @@
+import io
+import zlib
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..compression import Inflater
+from ..framing import FrameReader
+from ..metrics import ByteCounts, Timer
+from .stream_server import frame, sample_tweet
+
+
+def gzip_chunks(data, step):
+    """ Compress data the way a streaming server would, flushing after
+    every `step` bytes so each chunk can be decompressed on its own.
+
+    """
+    compressor = zlib.compressobj(wbits=31)
+    return [compressor.compress(data[i:i + step]) +
+            compressor.flush(zlib.Z_SYNC_FLUSH)
+            for i in range(0, len(data), step)]
+
+
+class TestInflater(NIOBlockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._frames = [frame(sample_tweet(i)) for i in range(20)]
+        self._data = b'\r\n'.join(self._frames)
+
+    def test_decompress(self):
+        """ Chunks decompress to the original stream as they arrive """
+        counts = ByteCounts()
+        timer = Timer()
+        inflater = Inflater(counts, timer)
+        chunks = gzip_chunks(self._data, 1000)
+        self.assertEqual(
+            b''.join(inflater.decompress(c) for c in chunks), self._data)
+        self.assertEqual(counts.wire, sum(len(c) for c in chunks))
+        self.assertLess(counts.wire, len(self._data))
+        self.assertEqual(timer.count, len(chunks))
+
+    def test_reader(self):
+        """ Frames are read straight off a compressed stream """
+        counts = ByteCounts()
+        stream = io.BytesIO(b''.join(gzip_chunks(self._data, 1000)))
+        reader = FrameReader(
+            Inflater(counts, Timer()).reader(stream.read1, 512),
+            chunk_size=256)
+        for data in self._frames:
+            self.assertEqual(bytes(reader.read_frame()),
+                             data.split(b'\r\n', 1)[1])
+            if data is not self._frames[-1]:
+                self.assertIsNone(reader.read_frame())
+        with self.assertRaises(Exception):
+            reader.read_frame()
+        self.assertEqual(counts.wire, len(stream.getvalue()))
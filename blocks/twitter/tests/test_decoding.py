@@ -0,0 +1,79 @@
+import json
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..decoding import Decoder, JSONDecoder, available_decoders, \
+    json_pointer
+
+
+TWEET = {
+    'id_str': '42',
+    'text': 'Merry #Christmas',
+    'user': {
+        'screen_name': 'santa',
+        'description': 'North Pole'
+    },
+    'entities': {
+        'hashtags': [{'text': 'Christmas'}]
+    }
+}
+
+LIMIT_MSG = {
+    'limit': {
+        'track': 1234
+    }
+}
+
+
+class TestDecoder(NIOBlockTestCase):
+
+    def test_backends(self):
+        """ Every installed backend decodes bytes and memoryviews """
+        line = json.dumps(TWEET).encode()
+        for backend in available_decoders():
+            decoder = Decoder(backend)
+            self.assertEqual(decoder.decode(line), TWEET)
+            self.assertEqual(decoder.decode(memoryview(line)), TWEET)
+
+    def test_auto_falls_back(self):
+        """ Auto always resolves to an installed backend """
+        decoder = Decoder(JSONDecoder.auto)
+        self.assertEqual(decoder.backend, available_decoders()[-1])
+
+    def test_auto_projects_lazily(self):
+        """ Auto prefers simdjson when projecting, if it is installed """
+        decoder = Decoder(JSONDecoder.auto, ['text'])
+        if JSONDecoder.simdjson in available_decoders():
+            self.assertEqual(decoder.backend, JSONDecoder.simdjson)
+        else:
+            self.assertEqual(decoder.backend, available_decoders()[-1])
+
+    def test_projection(self):
+        """ Only the configured fields, including nested ones, are kept """
+        line = json.dumps(TWEET).encode()
+        fields = ['text', 'user.screen_name', 'entities.hashtags', 'bogus']
+        for backend in available_decoders():
+            decoder = Decoder(backend, fields, ['limit'])
+            self.assertEqual(decoder.decode(memoryview(line)), {
+                'text': 'Merry #Christmas',
+                'user': {'screen_name': 'santa'},
+                'entities': {'hashtags': [{'text': 'Christmas'}]}
+            })
+
+    def test_escaped_keys(self):
+        """ Keys with `~` and `/` are projected alike by every backend """
+        data = {'a/b': {'c~d': 1, 'c': 2}, 'a': {'b': 3}, 'e~1': 4}
+        line = json.dumps(data).encode()
+        fields = ['a/b.c~d', 'e~1']
+        self.assertEqual(json_pointer('a/b.c~d'), '/a~1b/c~0d')
+        for backend in available_decoders():
+            decoder = Decoder(backend, fields)
+            self.assertEqual(decoder.decode(line),
+                             {'a/b': {'c~d': 1}, 'e~1': 4}, backend)
+
+    def test_passthrough(self):
+        """ Notices are never projected """
+        line = json.dumps(LIMIT_MSG).encode()
+        for backend in available_decoders():
+            decoder = Decoder(backend, ['text'], ['limit'])
+            self.assertEqual(decoder.decode(line), LIMIT_MSG)
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..dedup import RecentIds
+
+
+class TestRecentIds(NIOBlockTestCase):
+
+    def test_duplicates(self):
+        """ Ids seen within the window are duplicates """
+        ids = RecentIds(60, 1000)
+        self.assertTrue(ids.add('1'))
+        self.assertTrue(ids.add('2'))
+        self.assertFalse(ids.add('1'))
+        self.assertEqual(ids.to_dict(), {
+            'checked': 3, 'duplicates': 1, 'duplicate_rate': 1 / 3,
+            'size': 2})
+
+    @patch('blocks.twitter.dedup.monotonic')
+    def test_window(self, monotonic):
+        """ Ids are forgotten once the window has passed """
+        monotonic.return_value = 0
+        ids = RecentIds(80, 1000, buckets=8)
+        ids.add('1')
+        monotonic.return_value = 45
+        ids.add('2')
+        self.assertFalse(ids.add('1'))
+        monotonic.return_value = 85
+        self.assertFalse(ids.add('2'))
+        self.assertTrue(ids.add('1'))
+        monotonic.return_value = 1000
+        self.assertTrue(ids.add('2'))
+        self.assertEqual(len(ids), 1)
+
+    def test_bounded(self):
+        """ Memory stays bounded however fast ids arrive """
+        ids = RecentIds(3600, 800, buckets=8)
+        for i in range(10000):
+            ids.add(str(i))
+        self.assertLessEqual(len(ids), 800)
+        self.assertFalse(ids.add('9999'))
+        self.assertTrue(ids.add('0'))
+
+    def test_invalid(self):
+        """ A window that could never hold an id is refused """
+        for window, buckets in ((0, 8), (-1, 8), (60, 0)):
+            with self.assertRaises(ValueError):
+                RecentIds(window, 1000, buckets)
@@ -0,0 +1,77 @@
+from threading import Event
+from time import monotonic, sleep
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..flushing import FlushScheduler
+from .stream_server import wait_for
+
+
+class TestFlushScheduler(NIOBlockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._flushes = []
+        self._flushed = Event()
+        self._waiting = 0
+        self._scheduler = None
+
+    def tearDown(self):
+        self._scheduler.stop()
+        super().tearDown()
+
+    def _flush(self):
+        self._flushes.append(monotonic())
+        self._flushed.set()
+        waiting, self._waiting = self._waiting, 0
+        return waiting
+
+    def _start(self, *args):
+        self._scheduler = FlushScheduler(self._flush, *args)
+        self._scheduler.start()
+
+    def test_idle(self):
+        """ Nothing is flushed while no signals are buffered """
+        self._start(0.01)
+        sleep(0.1)
+        self.assertEqual(self._flushes, [])
+
+    def test_max_delay(self):
+        """ A batch is flushed once its first signal has waited long enough
+        """
+        self._start(0.1)
+        added = monotonic()
+        self._scheduler.added()
+        self._scheduler.added()
+        self.assertTrue(self._flushed.wait(1))
+        self.assertEqual(len(self._flushes), 1)
+        self.assertGreaterEqual(self._flushes[0] - added, 0.1)
+
+    def test_max_signals(self):
+        """ A full batch is flushed without waiting for the delay """
+        self._start(10, 3)
+        self._scheduler.added()
+        self._scheduler.added()
+        self.assertFalse(self._flushed.wait(0.1))
+        self._scheduler.added()
+        self.assertTrue(self._flushed.wait(1))
+
+    def test_min_interval(self):
+        """ Full batches are not flushed more often than the min interval
+        """
+        self._start(10, 1, 0.1)
+        self._scheduler.added()
+        self.assertTrue(self._flushed.wait(1))
+        self._flushed.clear()
+        self._scheduler.added()
+        self.assertTrue(self._flushed.wait(1))
+        self.assertGreaterEqual(self._flushes[1] - self._flushes[0], 0.1)
+
+    def test_backlog(self):
+        """ Signals held back by a flush are flushed in a later batch """
+        self._start(0.05)
+        self._waiting = 5
+        self._scheduler.added()
+        self.assertTrue(wait_for(lambda: len(self._flushes) == 2, 1, 0.01))
+        sleep(0.1)
+        self.assertEqual(len(self._flushes), 2)
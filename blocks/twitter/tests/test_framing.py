@@ -0,0 +1,71 @@
+import io
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..framing import FrameParser, FrameReader
+
+
+def frame(payload):
+    return str(len(payload)).encode() + b'\r\n' + payload
+
+
+class TrickleStream(object):
+
+    """ A stream that hands out at most `step` bytes per read """
+
+    def __init__(self, data, step):
+        self._data = io.BytesIO(data)
+        self._step = step
+
+    def readinto(self, buf):
+        chunk = self._data.read(min(len(buf), self._step))
+        buf[:len(chunk)] = chunk
+        return len(chunk)
+
+
+class TestFrameReader(NIOBlockTestCase):
+
+    def test_frames(self):
+        """ Frames and keep-alives are split out of a single read """
+        data = frame(b'{"a": 1}\r\n') + b'\r\n' + frame(b'{"b": 2}\r\n')
+        reader = FrameReader(TrickleStream(data, len(data)).readinto)
+        self.assertEqual(bytes(reader.read_frame()), b'{"a": 1}\r\n')
+        self.assertIsNone(reader.read_frame())
+        self.assertEqual(bytes(reader.read_frame()), b'{"b": 2}\r\n')
+        with self.assertRaises(Exception):
+            reader.read_frame()
+
+    def test_partial_frames(self):
+        """ Frames split across many small reads are reassembled """
+        payloads = [b'x' * n for n in (1, 10, 100, 1000)]
+        data = b'\r\n'.join(frame(p) for p in payloads)
+        reader = FrameReader(TrickleStream(data, 3).readinto, chunk_size=16)
+        for payload in payloads:
+            self.assertEqual(bytes(reader.read_frame()), payload)
+            if payload is not payloads[-1]:
+                self.assertIsNone(reader.read_frame())
+
+    def test_frame_larger_than_buffer(self):
+        """ The buffer grows to fit a frame bigger than the chunk size """
+        payload = bytes(range(256)) * 64
+        reader = FrameReader(
+            TrickleStream(frame(payload), 1000).readinto, chunk_size=128)
+        self.assertEqual(bytes(reader.read_frame()), payload)
+
+
+class TestFrameParser(NIOBlockTestCase):
+
+    def test_feed(self):
+        """ Frames are returned once all of their chunks arrive """
+        payloads = [b'x' * n for n in (1, 10, 100, 1000)]
+        data = b'\r\n'.join(frame(p) for p in payloads)
+        for step in (1, 7, 64, len(data)):
+            parser = FrameParser()
+            frames = []
+            for i in range(0, len(data), step):
+                frames.extend(
+                    None if f is None else bytes(f)
+                    for f in parser.feed(data[i:i + step]))
+            self.assertEqual(
+                [f for f in frames if f is not None], payloads)
+            self.assertEqual(frames.count(None), len(payloads) - 1)
@@ -0,0 +1,29 @@
+from nio.signal.base import Signal
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..latency import INGEST_ATTR, LatencyHistogram
+
+
+class TestLatencyHistogram(NIOBlockTestCase):
+
+    def test_buckets(self):
+        """ Latencies are counted in power of two millisecond buckets """
+        histogram = LatencyHistogram()
+        for seconds in (0.0005, 0.0015, 0.003, 0.003, 1e6):
+            histogram.record(seconds)
+        stats = histogram.to_dict()
+        self.assertEqual(stats['count'], 5)
+        self.assertEqual(stats['max_ms'], 1e9)
+        self.assertEqual(stats['buckets'], {
+            '<1ms': 1, '<2ms': 1, '<4ms': 2, '<8388608ms': 1})
+
+    def test_record_signals(self):
+        """ Only signals stamped at ingest are recorded """
+        stamped = Signal({'text': 'Merry #Christmas'})
+        setattr(stamped, INGEST_ATTR, 10.0)
+        histogram = LatencyHistogram()
+        histogram.record_signals([stamped, Signal()], now=10.25)
+        self.assertEqual(histogram.count, 1)
+        self.assertEqual(histogram.to_dict()['mean_ms'], 250)
+        # the stamp is hidden from serialized signals
+        self.assertEqual(stamped.to_dict(), {'text': 'Merry #Christmas'})
@@ -0,0 +1,93 @@
+import copy
+import json
+import pickle
+
+from nio.signal.base import Signal
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..latency import INGEST_ATTR
+from ..lazy import LazySignal, frame_key
+
+
+TWEET = {'id_str': '42', 'text': 'Merry #Christmas', 'user': {'id': 1}}
+
+
+class CountingDecoder(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, line):
+        self.calls += 1
+        return json.loads(str(line, 'utf-8'))
+
+
+class TestLazySignal(NIOBlockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.decode = CountingDecoder()
+        self.line = bytearray(json.dumps(TWEET), 'utf-8')
+        self.signal = LazySignal(memoryview(self.line), self.decode)
+
+    def test_decodes_on_first_access(self):
+        """ The frame is decoded once, when an attribute is first read """
+        self.assertEqual(self.decode.calls, 0)
+        self.assertEqual(self.signal.text, TWEET['text'])
+        self.assertEqual(self.signal.user, {'id': 1})
+        self.assertEqual(self.decode.calls, 1)
+        with self.assertRaises(AttributeError):
+            self.signal.bogus
+        self.assertIsNone(getattr(self.signal, 'bogus', None))
+
+    def test_frame_is_copied(self):
+        """ Reusing the read buffer does not change the signal """
+        self.line[:] = b' ' * len(self.line)
+        self.assertEqual(self.signal.id_str, '42')
+
+    def test_to_dict(self):
+        self.assertEqual(self.signal.to_dict(), TWEET)
+        self.assertEqual(self.decode.calls, 1)
+
+    def test_hidden_attributes(self):
+        """ Hidden attributes are set and read without decoding """
+        setattr(self.signal, INGEST_ATTR, 1.5)
+        self.assertEqual(getattr(self.signal, INGEST_ATTR), 1.5)
+        self.assertIsNone(getattr(self.signal, '_missing', None))
+        self.assertEqual(self.decode.calls, 0)
+        self.assertNotIn(INGEST_ATTR, self.signal.to_dict())
+
+    def test_attributes_set_before_decoding(self):
+        """ Attributes set on the signal win over decoded ones """
+        self.signal.text = 'Happy New Year'
+        self.signal.greeting = 'hi'
+        self.assertEqual(self.signal.text, 'Happy New Year')
+        self.assertEqual(self.signal.id_str, '42')
+        self.assertEqual(self.signal.to_dict(), dict(
+            TWEET, text='Happy New Year', greeting='hi'))
+
+    def test_copy_and_pickle(self):
+        """ Copies are decoded and do not carry the decoder along """
+        for other in (copy.copy(self.signal), copy.deepcopy(self.signal),
+                      pickle.loads(pickle.dumps(self.signal))):
+            self.assertIsInstance(other, Signal)
+            self.assertEqual(other.to_dict(), TWEET)
+            self.assertNotIn('_lazy', other.__dict__)
+
+    def test_decode_error(self):
+        """ A frame that fails to decode is reported, not raised """
+        errors = []
+        signal = LazySignal(b'{"text": ', self.decode, errors.append)
+        self.assertIsNone(getattr(signal, 'text', None))
+        self.assertEqual(signal.to_dict(), {})
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], ValueError)
+        self.assertEqual(self.decode.calls, 1)
+
+    def test_frame_key(self):
+        self.assertEqual(frame_key(b'{"limit":{"track":5}}'), 'limit')
+        self.assertEqual(frame_key(memoryview(b' { "delete" : {}}')),
+                         'delete')
+        self.assertEqual(frame_key(self.line), 'id_str')
+        self.assertIsNone(frame_key(b'[1, 2]'))
+        self.assertIsNone(frame_key(b''))
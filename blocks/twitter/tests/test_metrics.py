@@ -0,0 +1,36 @@
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..metrics import StreamRates
+
+
+class TestStreamRates(NIOBlockTestCase):
+
+    def test_rates(self):
+        """ Rates average the complete seconds within the window """
+        rates = StreamRates(window=10)
+        rates._started = 100.2
+        for second in range(100, 105):
+            rates.record(1000, now=second + 0.5)
+            rates.record(3000, now=second + 0.7)
+        # the second still being counted is left out
+        self.assertEqual(rates.rates(now=104.9), (2, 4000))
+        self.assertEqual(rates.frames, 10)
+        self.assertEqual(rates.bytes, 20000)
+
+    def test_window(self):
+        """ Counts older than the window are forgotten as the ring wraps """
+        rates = StreamRates(window=10)
+        rates._started = 0
+        rates.record(500, now=100.5)
+        self.assertEqual(rates.rates(now=105), (1 / 9, 500 / 9))
+        self.assertEqual(rates.rates(now=111), (0, 0))
+        # the slot is reused for a later second
+        rates.record(100, now=110.5)
+        self.assertEqual(rates.rates(now=111), (1 / 9, 100 / 9))
+        self.assertEqual(rates.frames, 2)
+
+    def test_no_rate_yet(self):
+        """ No rate is reported before a whole second has been counted """
+        rates = StreamRates()
+        rates.record(100)
+        self.assertEqual(rates.to_dict()['frames_per_sec'], None)
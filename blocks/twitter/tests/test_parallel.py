@@ -0,0 +1,69 @@
+import json
+from threading import Event
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..decoding import JSONDecoder
+from ..parallel import ParallelDecoder
+
+
+class TestParallelDecoder(NIOBlockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.handled = []
+        self.done = Event()
+        self.expected = 0
+
+    def tearDown(self):
+        self.decoder.stop()
+        super().tearDown()
+
+    def handle(self, data, error, context):
+        self.handled.append((data, error, context))
+        if len(self.handled) == self.expected:
+            self.done.set()
+
+    def start(self, fields=None, **kwargs):
+        self.decoder = ParallelDecoder(
+            self.handle, (JSONDecoder.stdlib, fields, ('limit',)), **kwargs)
+        self.decoder.start()
+
+    def test_order(self):
+        """ Messages are handled in the order their frames were submitted,
+        across batches decoded on different workers """
+        self.start(workers=2, batch_size=7)
+        self.expected = 100
+        for i in range(self.expected):
+            line = bytearray(json.dumps({'id_str': str(i)}), 'utf-8')
+            self.decoder.submit(memoryview(line), i)
+            # the frame was copied, the buffer can be reused
+            line[:] = b' ' * len(line)
+        self.assertTrue(self.done.wait(30))
+        self.assertEqual([context for _, _, context in self.handled],
+                         list(range(self.expected)))
+        self.assertEqual([data for data, _, _ in self.handled],
+                         [{'id_str': str(i)} for i in range(self.expected)])
+
+    def test_partial_batch(self):
+        """ A batch that does not fill is sent after the max delay """
+        self.start(workers=1, batch_size=100, max_delay=0.05)
+        self.expected = 1
+        self.decoder.submit(b'{"text": "Merry #Christmas"}')
+        self.assertTrue(self.done.wait(30))
+        self.assertEqual(self.handled, [({'text': 'Merry #Christmas'},
+                                         None, None)])
+
+    def test_fields_and_errors(self):
+        """ Workers project fields and report frames they cannot decode """
+        self.start(['text'], workers=1, batch_size=3)
+        self.expected = 3
+        self.decoder.submit(b'{"text": "hi", "lang": "en"}', 'tweet')
+        self.decoder.submit(b'{"text": ', 'bad')
+        self.decoder.submit(b'{"limit": {"track": 5}}', 'limit')
+        self.assertTrue(self.done.wait(30))
+        tweet, bad, limit = self.handled
+        self.assertEqual(tweet, ({'text': 'hi'}, None, 'tweet'))
+        self.assertIsNone(bad[0])
+        self.assertIsNotNone(bad[1])
+        self.assertEqual(limit, ({'limit': {'track': 5}}, None, 'limit'))
@@ -0,0 +1,97 @@
+import tempfile
+from time import sleep
+from unittest.mock import MagicMock
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..recording import StreamRecorder, read_recordings, recordings
+from ..twitter_block import Twitter
+from .stream_server import frame
+
+
+TWEETS = [{'id_str': str(i), 'text': 'Merry #Christmas'} for i in range(5)]
+
+
+class TestRecording(NIOBlockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._dir.cleanup()
+        super().tearDown()
+
+    def test_round_trip(self):
+        """ Reads are replayed byte for byte and in order """
+        recorder = StreamRecorder(self._dir.name, 'test', 1024 * 1024)
+        recorder.new_connection()
+        recorder.write(b'12\r\n')
+        recorder.write(b'{"a": 1}\r\n')
+        recorder.close()
+
+        records = list(read_recordings(recordings(self._dir.name, 'test')))
+        self.assertEqual([data for _, data in records],
+                         [b'', b'12\r\n', b'{"a": 1}\r\n'])
+        timestamps = [timestamp for timestamp, _ in records]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_truncated(self):
+        """ A recording cut short is read up to where it ends """
+        recorder = StreamRecorder(self._dir.name, 'test', 10)
+        for i in range(3):
+            recorder.write(str(i).encode() * 10)
+        recorder.close()
+        paths = recordings(self._dir.name, 'test')
+        with open(paths[1], 'rb') as recording:
+            data = recording.read()
+        with open(paths[1], 'wb') as recording:
+            recording.write(data[:len(data) // 2])
+        logger = MagicMock()
+
+        self.assertEqual(
+            [data for _, data in read_recordings(paths, logger)],
+            [b'0' * 10, b'2' * 10])
+        self.assertEqual(logger.warning.call_count, 1)
+
+    def test_rotation(self):
+        """ Files rotate by size and only the newest are kept """
+        recorder = StreamRecorder(self._dir.name, 'test', 10, max_files=3)
+        for i in range(10):
+            recorder.write(str(i).encode() * 10)
+        recorder.close()
+
+        paths = recordings(self._dir.name, 'test')
+        self.assertEqual(len(paths), 3)
+        self.assertEqual([data for _, data in read_recordings(paths)],
+                         [str(i).encode() * 10 for i in range(7, 10)])
+
+    def test_replay(self):
+        """ A replaying block notifies the recorded tweets """
+        recorder = StreamRecorder(self._dir.name, 'replay', 1024 * 1024)
+        recorder.new_connection()
+        data = b'\r\n'.join(frame(tweet) for tweet in TWEETS)
+        # split a frame across reads and drop a partial one on reconnect
+        recorder.write(data[:7])
+        recorder.write(data[7:])
+        recorder.write(b'999\r\n{"id_str"')
+        recorder.new_connection()
+        recorder.write(frame(TWEETS[0]))
+        recorder.close()
+
+        block = Twitter()
+        self.configure_block(block, {
+            'name': 'replay',
+            'recording': {
+                'mode': 'replay',
+                'directory': self._dir.name,
+                'replay_speed': 0
+            },
+            'notify_freq': {'milliseconds': 10}
+        })
+        block.start()
+        sleep(0.2)
+        block.stop()
+        self.assertEqual(
+            [s.id_str for s in self.last_notified['tweets']],
+            [t['id_str'] for t in TWEETS] + [TWEETS[0]['id_str']])
@@ -0,0 +1,61 @@
+from time import sleep
+from unittest.mock import MagicMock
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from .stream_server import LocalTwitter, StreamServer, TWEETS, \
+    limit_notice, wait_for
+
+
+class TestSharding(NIOBlockTestCase):
+
+    def tearDown(self):
+        self._block.stop()
+        self._server.stop()
+        super().tearDown()
+
+    def _start_block(self, shards):
+        self._block = LocalTwitter()
+        self._block.streaming_host = self._server.host
+        self._block._authorize = MagicMock()
+        self.configure_block(self._block, {
+            'phrases': ['#Christmas', '#Santa', '#Rudolph'],
+            'shards': shards,
+            'notify_freq': {'milliseconds': 10}
+        })
+        self._block.start()
+
+    def test_shards(self):
+        """ Each shard streams on its own connection into the same outputs,
+        without the tweets they share being notified twice
+
+        """
+        self._server = StreamServer(TWEETS)
+        self._server.start()
+        self._start_block(3)
+        self.assertTrue(wait_for(lambda: self._server.connections == 3))
+        shards = lambda: self._block.stats()['shards']
+        self.assertTrue(wait_for(
+            lambda: sum(s['messages'] for s in shards()) == 3 * len(TWEETS)))
+        sleep(0.05)
+        self.assertEqual(
+            sorted(s.id_str for s in self.last_notified['tweets']),
+            [t['id_str'] for t in TWEETS])
+        self.assertEqual(self._block.stats()['dedup']['duplicates'],
+                         2 * len(TWEETS))
+        for shard in shards():
+            self.assertTrue(shard['connected'])
+            self.assertEqual(shard['messages'], len(TWEETS))
+
+    def test_limit_counts(self):
+        """ Limit notices are counted per connection """
+        self._server = StreamServer([limit_notice(10)])
+        self._server.start()
+        self._start_block(2)
+        self.assertTrue(wait_for(
+            lambda: len(self.last_notified['limit']) == 2))
+        self.assertEqual(
+            [s.count for s in self.last_notified['limit']], [10, 10])
+        self.assertEqual(
+            [s.cumulative_count for s in self.last_notified['limit']],
+            [10, 20])
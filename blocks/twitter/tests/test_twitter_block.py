@@ -1,9 +1,14 @@
+from ..latency import INGEST_ATTR
+from ..lazy import LazySignal
 from ..twitter_block import Twitter
+from ..twitter_stream_block import TwitterStreamBlock
 import json
-from unittest.mock import MagicMock
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
 from nio.testing.block_test_case import NIOBlockTestCase
 from nio.util.discovery import not_discoverable
-from threading import Event
+from threading import Event, Thread
 
 
 SOME_TWEET = {
@@ -182,6 +187,7 @@ class TestTwitter(NIOBlockTestCase):
             self.assertEqual(notified.limit,
                              LIMIT_MSGS[i]['limit'])
             self.assertEqual(getattr(notified, 'count'), limit_counts[i])
+        self.assertEqual(self._block.stats()['limit_cumulative_count'], 2000)
 
     def test_diagnostic_message(self):
         self._block = DiagnosticTwitter(self.e)
@@ -200,3 +206,220 @@ class TestTwitter(NIOBlockTestCase):
         notified = self.last_notified['other'][0]
         for key in DIAG_MSG:
             self.assertEqual(getattr(notified, key), DIAG_MSG[key])
+
+    def test_project_fields(self):
+        self.configure_block(self._block, {
+            'name': 'TestTwitterBlock',
+            'phrases': ['neutralio'],
+            'fields': ['text', 'user.name'],
+            'project_fields': True,
+            'notify_freq': {'milliseconds': 10}
+        })
+        self._block.start()
+        self.e.wait(1)
+        self._block._notify_results()
+
+        notified = self.last_notified['tweets'][0]
+        self.assertEqual(notified.text, SOME_TWEET['text'])
+        self.assertEqual(notified.user, {'name': 'societalin'})
+        self.assertCountEqual(notified.__dict__.keys(), ['text', 'user'])
+        self.assertEqual(self._block.stats()['decode']['count'], 1)
+
+    def test_stats(self):
+        self.configure_block(self._block, {
+            'name': 'TestTwitterBlock',
+            'phrases': ['neutralio'],
+            'notify_freq': {'milliseconds': 10}
+        })
+        self._block.start()
+        self.e.wait(1)
+        self._block._record_line(b'{"text": ')
+        self._block._on_keep_alive()
+        self._block._on_keep_alive()
+
+        stats = self._block.stats()
+        self.assertEqual(stats['stream']['frames'], 2)
+        self.assertEqual(stats['stream']['bytes'],
+                         len(json.dumps(SOME_TWEET)) + 9)
+        self.assertEqual(stats['parse_errors'], 1)
+        self.assertEqual(stats['keep_alive_gaps']['count'], 2)
+        self.assertEqual(stats['reconnects'], 0)
+        self.assertEqual(stats['limit_cumulative_count'], 0)
+        self.assertEqual(stats['buffers']['tweets']['depth'], 0)
+
+    def test_frames_per_thread(self):
+        """ Frames handled at once by shard threads keep their own stamp """
+        self.configure_block(self._block, {
+            'name': 'TestTwitterBlock',
+            'phrases': ['neutralio'],
+            'latency_stamps': True,
+            'notify_freq': {'milliseconds': 10}
+        })
+        self._block.start()
+        self.e.wait(1)
+        first = bytes(json.dumps(dict(SOME_TWEET, text='first')), 'utf-8')
+        second = bytes(json.dumps(dict(SOME_TWEET, text='second')), 'utf-8')
+        second_done = Event()
+        decode = self._block._decoder.decode
+
+        def decode_after_second(line):
+            if line == first:
+                second_done.wait(5)
+            return decode(line)
+
+        self._block._decoder.decode = decode_after_second
+        reader = Thread(target=self._block._record_line, args=(first,))
+        reader.start()
+        time.sleep(0.1)
+        self._block._record_line(second)
+        second_done.set()
+        reader.join()
+        self._block._notify_results()
+
+        stamps = {signal.text: getattr(signal, INGEST_ATTR)
+                  for signal in self.last_notified['tweets']}
+        self.assertLess(stamps['first'], stamps['second'])
+        self.assertGreaterEqual(self._block.stats()['latency']['count'], 2)
+
+    def test_lazy_signals(self):
+        self.configure_block(self._block, {
+            'name': 'TestTwitterBlock',
+            'phrases': ['neutralio'],
+            'fields': ['text', 'user.name'],
+            'lazy_signals': True,
+            'notify_freq': {'milliseconds': 10}
+        })
+        self._block.start()
+        self.e.wait(1)
+        # notices are still decoded as they are read
+        self._block._record_line(bytes(json.dumps(LIMIT_MSG), 'utf-8'))
+        self._block._notify_results()
+
+        notified = self.last_notified['tweets'][0]
+        self.assertIsInstance(notified, LazySignal)
+        self.assertEqual(notified.to_dict(), {
+            'text': SOME_TWEET['text'], 'user': {'name': 'societalin'}})
+        self.assertEqual(self.last_notified['limit'][0].cumulative_count,
+                         1234)
+
+    def test_lazy_parse_errors(self):
+        """ Malformed tweets are counted on the block when first read """
+        self.configure_block(self._block, {
+            'name': 'TestTwitterBlock',
+            'phrases': ['neutralio'],
+            'lazy_signals': True,
+            'notify_freq': {'hours': 1}
+        })
+        self._block.start()
+        self.e.wait(1)
+        self._block._record_line(b'{"text": ')
+        self._block._notify_results()
+
+        self.assertEqual(self._block.stats()['parse_errors'], 0)
+        self.assertEqual(self.last_notified['tweets'][-1].to_dict(), {})
+        self.assertEqual(self._block.stats()['parse_errors'], 1)
+
+    def test_decode_pool(self):
+        self.configure_block(self._block, {
+            'name': 'TestTwitterBlock',
+            'phrases': ['neutralio'],
+            'fields': ['text', 'user.name'],
+            'decode_pool': {'workers': 1,
+                            'max_delay': {'milliseconds': 10}},
+            'notify_freq': {'milliseconds': 10}
+        })
+        self._block.start()
+        self.assertTrue(self.e.wait(30))
+        self._block._notify_results()
+
+        notified = self.last_notified['tweets'][0]
+        self.assertEqual(notified.to_dict(), {
+            'text': SOME_TWEET['text'], 'user': {'name': 'societalin'}})
+
+    @patch(TwitterStreamBlock.__module__ + '.AsyncStream')
+    def test_decode_pool_on_event_loop(self, async_stream):
+        """ The pool is not used when it would block the shared loop """
+        self.configure_block(self._block, {
+            'name': 'TestTwitterBlock',
+            'phrases': ['neutralio'],
+            'engine': 'asyncio',
+            'decode_pool': {'workers': 1}
+        })
+        self._block.start()
+        self.assertIsNone(self._block._parallel)
+        async_stream.return_value.start.assert_called_once_with()
+
+    def test_wal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config = {
+                'name': 'TestTwitterBlock',
+                'phrases': ['neutralio'],
+                'wal': {'enabled': True, 'directory': directory},
+                'notify_freq': {'hours': 1}
+            }
+            self.configure_block(self._block, config)
+            self._block.start()
+            deadline = time.monotonic() + 1
+            while not len(self._block._result_signals['tweets']) and \
+                    time.monotonic() < deadline:
+                time.sleep(0.01)
+            # stopped before the buffered tweet was notified
+            self._block.stop()
+            self.assertFalse(self.last_notified['tweets'])
+
+            self._block = TweetTwitter(self.e)
+            self._block._connect_to_streaming = MagicMock()
+            self._block._authorize = MagicMock()
+            self.configure_block(self._block, config)
+            self._block.start()
+            self._block._notify_results()
+            self.assertEqual(self.last_notified['tweets'][0].to_dict(),
+                             SOME_TWEET)
+
+    def test_cached_oauth_signing(self):
+        self.configure_block(self._block, {
+            'name': 'TestTwitterBlock',
+            'phrases': ['neutralio'],
+            'notify_freq': {'milliseconds': 10}
+        })
+        self._block.start()
+        url = 'https://stream.twitter.com/1.1/statuses/filter.json'
+        first = self._block._get_oauth_request(url, {'track': 'neutralio'})
+        signing = self._block._oauth_signing()
+        second = self._block._get_oauth_request(url, {'track': 'neutralio'})
+        self.assertIs(self._block._oauth_signing(), signing)
+        self.assertNotEqual(first['oauth_signature'],
+                            second['oauth_signature'])
+
+    def test_shard_params(self):
+        self.configure_block(self._block, {
+            'phrases': ['a', 'b', 'c'],
+            'locations': [{
+                'southwest': {'latitude': -1.00, 'longitude': -2.00},
+                'northeast': {'latitude': 1.00, 'longitude': 2.00}
+            }],
+            'shards': 2
+        })
+        self._block.start()
+        shard_params = self._block.shard_params()
+        self.assertEqual([p['track'] for p in shard_params], ['a,c', 'b'])
+        self.assertEqual([p.get('locations') for p in shard_params],
+                         [None, '-2.0,-1.0,2.0,1.0'])
+        for params in shard_params:
+            self.assertEqual(params['language'], 'en')
+
+    def test_notice_type(self):
+        self.assertEqual(Twitter._notice_type(LIMIT_MSG), 'limit')
+        self.assertEqual(Twitter._notice_type(DIAG_MSG), 'disconnect')
+        self.assertIsNone(Twitter._notice_type(SOME_TWEET))
+        # a tweet projected down to one field is still a tweet
+        self.assertIsNone(Twitter._notice_type({'text': 'Hello!'}))
+        self.assertIsNone(Twitter._notice_type({}))
+        self.assertIsNone(Twitter._notice_type(None))
+
+    def test_warning_report(self):
+        report = Twitter._notice_report('warning', {'warning': {
+            'code': 'FALLING_BEHIND',
+            'message': 'Your connection is falling behind.'}})
+        self.assertEqual(
+            report, 'Stall Warning notice: Your connection is falling behind.')
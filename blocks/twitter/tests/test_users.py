@@ -0,0 +1,94 @@
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..users import UserIdCache, lookup_user_ids
+from .stream_server import USERS_PATH, StreamServer, user_id
+
+
+NAMES = ['santa{}'.format(i) for i in range(250)]
+
+
+class TestUserIdCache(NIOBlockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._dir.name, 'users.json')
+
+    def tearDown(self):
+        self._dir.cleanup()
+        super().tearDown()
+
+    def test_persisted(self):
+        """ Cached ids are read back by a new cache on the same file """
+        UserIdCache(self._path, 60).update({'Santa': '1', 'rudolph': '2'})
+        found, missing = UserIdCache(self._path, 60).get(
+            ['santa', 'Rudolph', 'dasher'])
+        self.assertEqual(found, {'santa': '1', 'Rudolph': '2'})
+        self.assertEqual(missing, ['dasher'])
+
+    def test_expired(self):
+        """ Entries older than the TTL are looked up again """
+        cache = UserIdCache(self._path, 60)
+        with patch('time.time', return_value=1000):
+            cache.update({'santa': '1'})
+        with patch('time.time', return_value=1061):
+            self.assertEqual(cache.get(['santa']), ({}, ['santa']))
+
+    def test_corrupt(self):
+        """ An unreadable cache file starts an empty cache """
+        with open(self._path, 'w') as cache:
+            cache.write('{"santa"')
+        self.assertEqual(UserIdCache(self._path, 60).get(['santa']),
+                         ({}, ['santa']))
+
+
+class TestLookupUserIds(NIOBlockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._server = StreamServer()
+        self._server.start()
+        self._endpoint = 'http://{}{}'.format(self._server.host, USERS_PATH)
+
+    def tearDown(self):
+        self._server.stop()
+        super().tearDown()
+
+    def test_lookup(self):
+        """ Names are looked up 100 at a time """
+        ids = lookup_user_ids(self._endpoint, None, NAMES, concurrency=4)
+        self.assertEqual(ids, {name: user_id(name) for name in NAMES})
+        self.assertEqual(self._server.lookups, 3)
+
+    def test_concurrent(self):
+        """ Batches are looked up at the same time """
+        self._server.lookup_delay = 0.2
+        start = time.monotonic()
+        ids = lookup_user_ids(self._endpoint, None, NAMES, concurrency=3)
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(len(ids), len(NAMES))
+
+    def test_failed_lookup(self):
+        """ A batch that fails is skipped """
+        ids = lookup_user_ids('http://127.0.0.1:1' + USERS_PATH, None, NAMES)
+        self.assertEqual(ids, {})
+
+    def test_unreadable_lookup(self):
+        """ A batch answered with something other than users is skipped """
+        resp = MagicMock(status_code=200)
+        resp.json.side_effect = [ValueError('not JSON'), {'errors': []},
+                                 [{'screen_name': 'santa200',
+                                   'id_str': '200'}]]
+        logger = MagicMock()
+        with patch.object(requests.Session, 'post', return_value=resp):
+            ids = lookup_user_ids(self._endpoint, None, NAMES,
+                                  concurrency=1, logger=logger)
+        self.assertEqual(ids, {'santa200': '200'})
+        self.assertEqual(logger.warning.call_count, 2)
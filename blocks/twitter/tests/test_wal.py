@@ -0,0 +1,114 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from nio.signal.base import Signal
+from nio.testing.block_test_case import NIOBlockTestCase
+
+from ..wal import WriteAheadLog
+
+
+class TestWriteAheadLog(NIOBlockTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def open(self):
+        # a long interval so only stopping writes to disk
+        wal = WriteAheadLog(self.directory, 'block', sync_interval=60)
+        wal.start()
+        return wal
+
+    def replayed(self):
+        wal = WriteAheadLog(self.directory, 'block')
+        return [(output, signal.to_dict()) for output, signal in wal.replay()]
+
+    def test_replay(self):
+        """ Signals that were not released are replayed in order """
+        wal = self.open()
+        wal.append('tweets', Signal({'text': 'one'}))
+        wal.append('limit', Signal({'count': 2}))
+        wal.append('tweets', Signal({'text': 'three'}))
+        wal.stop()
+        self.assertEqual(self.replayed(), [
+            ('tweets', {'text': 'one'}),
+            ('limit', {'count': 2}),
+            ('tweets', {'text': 'three'})])
+
+    def test_release(self):
+        """ Releasing a mark forgets what was logged before it """
+        wal = self.open()
+        wal.append('tweets', Signal({'text': 'notified'}))
+        mark = wal.mark()
+        wal.append('tweets', Signal({'text': 'buffered'}))
+        wal.release(mark)
+        wal.stop()
+        self.assertEqual(self.replayed(), [('tweets', {'text': 'buffered'})])
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_release_written_segments(self):
+        """ Segments already on disk are deleted once released """
+        wal = self.open()
+        wal.append('tweets', Signal({'text': 'notified'}))
+        mark = wal.mark()
+        wal._write()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        wal.release(mark)
+        wal.stop()
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(wal.records, 1)
+
+    def test_restart(self):
+        """ Replayed segments are released by the next run's first mark,
+        and new segments are numbered after them """
+        wal = self.open()
+        wal.append('tweets', Signal({'text': 'left over'}))
+        wal.stop()
+        wal = self.open()
+        self.assertEqual(len(list(wal.replay())), 1)
+        wal.append('tweets', Signal({'text': 'new'}))
+        wal.release(wal.mark())
+        wal.append('tweets', Signal({'text': 'newer'}))
+        wal.stop()
+        self.assertEqual(self.replayed(), [('tweets', {'text': 'newer'})])
+
+    def test_torn_record(self):
+        """ A record cut short by a crash is skipped """
+        wal = self.open()
+        wal.append('tweets', Signal({'text': 'whole'}))
+        wal.stop()
+        path = os.path.join(self.directory, os.listdir(self.directory)[0])
+        with open(path, 'ab') as log:
+            log.write(b'["tweets", {"te')
+        self.assertEqual(self.replayed(), [('tweets', {'text': 'whole'})])
+
+    def test_logged_as_appended(self):
+        """ Changes to a signal after it is appended are not logged """
+        wal = self.open()
+        signal = Signal({'text': 'original'})
+        wal.append('tweets', signal)
+        signal.text = 'modified downstream'
+        wal.stop()
+        self.assertEqual(self.replayed(), [('tweets', {'text': 'original'})])
+
+    def test_write_error(self):
+        """ Records that fail to write are kept and written next time """
+        wal = self.open()
+        wal.append('tweets', Signal({'text': 'one'}))
+        wal.mark()
+        wal.append('tweets', Signal({'text': 'two'}))
+        with patch.object(WriteAheadLog, '_append_records',
+                          side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                wal._write()
+        self.assertEqual(wal.to_dict()['queued'], 2)
+        wal.stop()
+        self.assertEqual(self.replayed(), [
+            ('tweets', {'text': 'one'}),
+            ('tweets', {'text': 'two'})])
@@ -1,14 +1,19 @@
-import requests
+import logging
 from enum import Enum
+from threading import Lock
 from requests_oauthlib import OAuth1
 
 from nio.signal.base import Signal
 from nio.block.terminals import output
 from nio.properties import ListProperty, SelectProperty,\
-    ObjectProperty, PropertyHolder, FloatProperty, VersionProperty
+    ObjectProperty, PropertyHolder, FloatProperty, VersionProperty, \
+    IntProperty, StringProperty, TimeDeltaProperty, BoolProperty
 from nio.types.string import StringType
 
+from .decoding import get_path, set_path
+from .lazy import LazySignal, frame_key
 from .twitter_stream_block import TwitterStreamBlock
+from .users import UserIdCache, lookup_user_ids
 
 
 PUB_STREAM_MSGS = {
@@ -38,6 +43,11 @@ DISCONNECT_REASONS = [
 ]
 
 
+# the output each kind of notice is notified on, anything else is a tweet
+NOTICE_OUTPUTS = {msg: 'limit' if msg == 'limit' else 'other'
+                  for msg in PUB_STREAM_MSGS}
+
+
 class FilterLevel(Enum):
     none = 0
     low = 1
@@ -58,6 +68,12 @@ class Location(PropertyHolder):
                                title='Northeast')
 
 
+class UserLookup(PropertyHolder):
+    concurrency = IntProperty(title='Concurrent Requests', default=4)
+    cache_file = StringProperty(title='Cache File', default='')
+    cache_ttl = TimeDeltaProperty(title='Cache TTL', default={"days": 1})
+
+
 @output("other")
 @output("limit")
 @output("tweets")
@@ -72,21 +88,29 @@ class Twitter(TwitterStreamBlock):
         follow (list(str)): The list of users to track.
         fields (list(str)): Outgoing signals will pull these fields
             from incoming tweets. When empty/unset, all fields are
-            included.
+            included. Nested fields can be selected with dotted paths,
+            for example `user.screen_name`.
         language (list(str)): Only get tweets of the specifed language.
         filter_level (FilterLevel): Minimum value of the filter_level Tweet
             attribute.
         locations (list(Location)): A comma-separated list of longitude,
             latitude pairs specifying a set of bounding boxes to filter
             Tweets by.
-        notify_freq (timedelta): The interval between signal notifications.
+        notify_freq (timedelta): The longest a signal is buffered before
+            it is notified.
         creds: Twitter app credentials, see above. Defaults to global settings.
         rc_interval (timedelta): Time to wait between receipts (either tweets
             or hearbeats) before attempting to reconnect to Twitter Streaming.
+        user_lookup: How `follow` screen names are resolved to user ids
+            and cached between starts, see above.
+        shards (int): Split the phrases, users and locations across this
+            many connections, each read on its own thread.
+        lazy_signals (bool): Notify tweets as signals that keep the raw
+            message and only decode it when an attribute is first read.
 
     """
 
-    version = VersionProperty("2.0.0")
+    version = VersionProperty("2.1.0")
     phrases = ListProperty(StringType, default=[], title='Query Phrases')
     follow = ListProperty(StringType, default=[], title='Follow Users')
     fields = ListProperty(StringType, default=[], title='Included Fields')
@@ -95,35 +119,55 @@ class Twitter(TwitterStreamBlock):
                                   default=FilterLevel.none,
                                   title='Filter Level')
     locations = ListProperty(Location, default=[], title='Locations')
+    user_lookup = ObjectProperty(UserLookup, title='User Lookup',
+                                 default=UserLookup(), advanced=True)
+    shards = IntProperty(title='Connections', default=1, advanced=True)
+    lazy_signals = BoolProperty(title='Lazy Signals', default=False,
+                                advanced=True)
 
     streaming_host = 'stream.twitter.com'
     streaming_endpoint = '1.1/statuses/filter.json'
     users_endpoint = 'https://api.twitter.com/1.1/users/lookup.json'
+    notice_keys = tuple(PUB_STREAM_MSGS)
 
     def __init__(self):
         super().__init__()
         self._user_ids = []
+        self._limit_lock = Lock()
 
     def _start(self):
         self._set_user_ids()
 
     def _set_user_ids(self):
+        """ Resolve the followed screen names to user ids, from the cache
+        file where possible and with concurrent lookups otherwise.
+
+        """
+        self._user_ids = []
         if len(self.follow()) == 0:
             return
-        auth = OAuth1(self.creds().consumer_key(),
-                      self.creds().app_secret(),
-                      self.creds().oauth_token(),
-                      self.creds().oauth_token_secret())
-        # user ids can be grabbed 100 at a time.
-        for i in range(0, len(self.follow()), 100):
-            data = {"screen_name": ','.join(self.follow()[i:i+100])}
-            resp = requests.post(self.users_endpoint, data=data, auth=auth)
-            if resp.status_code == 200:
-                for user in resp.json():
-                    id = user.get('id_str')
-                    if id is not None:
-                        self._user_ids.append(id)
-        self.logger.debug("Following {} users".format(len(self._user_ids)))
+        lookup = self.user_lookup()
+        cache = None
+        ids = {}
+        missing = self.follow()
+        if lookup.cache_file():
+            cache = UserIdCache(lookup.cache_file(),
+                                lookup.cache_ttl().total_seconds())
+            ids, missing = cache.get(missing)
+        cached = len(ids)
+        if missing:
+            auth = OAuth1(self.creds().consumer_key(),
+                          self.creds().app_secret(),
+                          self.creds().oauth_token(),
+                          self.creds().oauth_token_secret())
+            found = lookup_user_ids(self.users_endpoint, auth, missing,
+                                    lookup.concurrency(), self.logger)
+            ids.update(found)
+            if cache is not None and found:
+                cache.update(found)
+        self._user_ids = [ids[name] for name in self.follow() if name in ids]
+        self.logger.debug("Following {} users, {} of them cached".format(
+            len(self._user_ids), cached))
 
     def get_params(self):
         params = {
@@ -136,18 +180,47 @@ class Twitter(TwitterStreamBlock):
         if self.language():
             params['language'] = ','.join(self.language())
         if self.locations():
-            locations = []
-            for location in self.locations():
-                locations.append(str(location.southwest().longitude()))
-                locations.append(str(location.southwest().latitude()))
-                locations.append(str(location.northeast().longitude()))
-                locations.append(str(location.northeast().latitude()))
-            params['locations'] = ','.join(locations)
+            params['locations'] = ','.join(self._location_boxes())
         return params
 
+    def _location_boxes(self):
+        """ Each location as a `sw_lon,sw_lat,ne_lon,ne_lat` bounding box """
+        return [','.join(str(coordinate) for coordinate in (
+            location.southwest().longitude(),
+            location.southwest().latitude(),
+            location.northeast().longitude(),
+            location.northeast().latitude()))
+            for location in self.locations()]
+
+    def shard_params(self):
+        """ Deal the phrases, users and locations out across the configured
+        number of connections, round robin so each gets a similar share.
+
+        """
+        terms = [('track', phrase) for phrase in self.phrases()] + \
+            [('follow', user_id) for user_id in self._user_ids] + \
+            [('locations', box) for box in self._location_boxes()]
+        shards = max(1, min(self.shards(), len(terms)))
+        if shards == 1:
+            return [self.get_params()]
+        shard_params = []
+        for shard in range(shards):
+            params = self.get_params()
+            for key in ('track', 'follow', 'locations'):
+                params[key] = ','.join(
+                    value for term, value in terms[shard::shards]
+                    if term == key)
+            if not params['locations']:
+                del params['locations']
+            shard_params.append(params)
+        return shard_params
+
     def get_request_method(self):
         return "POST"
 
+    def projected_fields(self):
+        return self.fields()
+
     def filter_results(self, data):
         """ Filters incoming tweet objects to include only the configured
         fields (or all of them, if self.fields is empty).
@@ -160,55 +233,79 @@ class Twitter(TwitterStreamBlock):
         result = {}
         for f in self.fields():
             try:
-                result[f] = data[f]
+                set_path(result, f, get_path(data, f))
             except:
                 self.logger.error("Invalid Twitter field: %s" % f)
 
         return result
 
+    def _lazy_signals(self):
+        return self.lazy_signals()
+
+    def create_lazy_signal(self, line):
+        # notices are objects with a single key naming their kind, so a
+        # frame whose first key is not one is a tweet
+        if frame_key(line) in NOTICE_OUTPUTS:
+            return False
+        self._enqueue('tweets', LazySignal(line, self._decode_tweet,
+                                           self._parse_error))
+        return True
+
+    def _decode_tweet(self, line):
+        return self.filter_results(self._decoder.decode(line))
+
     def create_signal(self, data):
-        for msg in PUB_STREAM_MSGS:
-            if data and msg in data:
-
-                # Log something about the message
-                report = "{} notice".format(PUB_STREAM_MSGS[msg])
-                if msg == "disconnect":
-                    error_idx = int(data['disconnect']['code']) - 1
-                    report += ": {}".format(DISCONNECT_REASONS[error_idx])
-                elif msg == "warning":
-                    report += ": {}".format(data['message'])
-                self.logger.debug(report)
-
-                # Calculate total limit for limit signals
-                if msg == "limit":
-                    # lock when calculating limit
-                    with self._get_result_lock('limit'):
-                        self._calculate_limit(data)
-
-                # Anything that is not 'limit' or 'tweet' is considered 'other'
-                if msg != "limit":
-                    msg = "other"
-
-                # Add a signal to the appropriate list
-                with self._get_result_lock(msg):
-                    self._result_signals[msg].append(Signal(data))
-
-                return
-
-        # If we didn't return yet, the message is a regular tweet.
-        self.logger.debug("It's a tweet!")
-        data = self.filter_results(data)
-        if data:
-            with self._get_result_lock('tweets'):
-                self._result_signals['tweets'].append(Signal(data))
+        msg = self._notice_type(data)
+        if msg is None:
+            data = self.filter_results(data)
+            if data:
+                self._enqueue('tweets', Signal(data))
+            return
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(self._notice_report(msg, data))
+
+        # Calculate total limit for limit signals
+        if msg == "limit":
+            self._calculate_limit(data)
+
+        # Add a signal to the appropriate list
+        self._enqueue(NOTICE_OUTPUTS[msg], Signal(data))
+
+    @staticmethod
+    def _notice_type(data):
+        """ Return the kind of notice a message is, or None for a tweet.
+
+        Notices are objects with a single key naming their kind, so
+        tweets are told apart by size without probing for every kind.
+        """
+        if isinstance(data, dict) and len(data) == 1:
+            msg = next(iter(data))
+            if msg in NOTICE_OUTPUTS:
+                return msg
+        return None
+
+    @staticmethod
+    def _notice_report(msg, data):
+        """ Describe a notice for the debug log """
+        report = "{} notice".format(PUB_STREAM_MSGS[msg])
+        if msg == "disconnect":
+            error_idx = int(data['disconnect']['code']) - 1
+            report += ": {}".format(DISCONNECT_REASONS[error_idx])
+        elif msg == "warning":
+            report += ": {}".format(data['warning'].get('message'))
+        return report
 
     def _calculate_limit(self, data):
         """ Calculate total limit count for limit signals """
+        # track counts are per connection, so are kept for each shard
+        shard = getattr(self._reader, 'shard', None)
         track = data.get('limit', {}).get('track', 0)
-        if track > self._limit_count:
-            limit = track - self._limit_count
-            self._limit_count = track
-        else:
-            limit = 0
-        data['count'] = limit
-        data['cumulative_count'] = track
+        with self._limit_lock:
+            previous = self._limit_counts.get(shard, 0)
+            if track > previous:
+                self._limit_counts[shard] = track
+            others = sum(count for key, count in self._limit_counts.items()
+                         if key != shard)
+        data['count'] = max(track - previous, 0)
+        data['cumulative_count'] = track + others
@@ -1,21 +1,41 @@
 import http.client
-import json
+import os
+import re
+import tempfile
 import time
 import requests
 import oauth2 as oauth
-from collections import defaultdict
 from datetime import timedelta, datetime
-from threading import Lock, Event
+from threading import Event, Lock, local
 from requests_oauthlib import OAuth1
 
 from nio import GeneratorBlock
+from nio.command import command
 from nio.modules.scheduler import Job
 from nio.properties import PropertyHolder, TimeDeltaProperty, \
-    ObjectProperty, StringProperty
+    ObjectProperty, StringProperty, SelectProperty, BoolProperty, \
+    IntProperty, FloatProperty
 from nio.signal.base import Signal
 from nio.util.discovery import not_discoverable
 from nio.util.threading.spawn import spawn
 
+from .async_engine import AsyncStream, StreamEngine
+from .backoff import Backoff
+from .buffers import BoundedResultBuffer, OverflowPolicy, ResultBuffer, \
+    ResultBuffers, Spool
+from .compression import Inflater
+from .decoding import Decoder, JSONDecoder
+from .dedup import RecentIds
+from .flushing import FlushScheduler
+from .framing import FrameParser, FrameReader
+from .latency import INGEST_ATTR, LatencyHistogram
+from .metrics import ByteCounts, StreamRates, Timer
+from .parallel import ParallelDecoder
+from .recording import RecordingMode, StreamRecorder, read_recordings, \
+    recordings
+from .sharding import ShardedStream
+from .wal import WriteAheadLog
+
 
 class TwitterCreds(PropertyHolder):
 
@@ -32,7 +52,87 @@ class TwitterCreds(PropertyHolder):
         title='Access Token Secret', default="[[TWITTER_ACCESS_TOKEN_SECRET]]")
 
 
+class BufferLimits(PropertyHolder):
+
+    """ Property holder for capping the signals buffered per output.
+
+    """
+    max_signals = IntProperty(title='Max Signals per Output', default=0)
+    max_bytes = IntProperty(title='Max Bytes per Output', default=0)
+    policy = SelectProperty(OverflowPolicy,
+                            default=OverflowPolicy.drop_oldest,
+                            title='Overflow Policy')
+    spool_dir = StringProperty(title='Spool Directory', default='')
+
+
+class ReconnectBackoff(PropertyHolder):
+
+    """ Property holder for the delay between reconnect attempts.
+
+    """
+    initial = TimeDeltaProperty(title='Initial Delay', default={"seconds": 1})
+    maximum = TimeDeltaProperty(title='Max Delay', default={"seconds": 320})
+    jitter = FloatProperty(title='Jitter', default=0.5)
+
+
+class Dedup(PropertyHolder):
+
+    """ Property holder for dropping tweets that are delivered twice.
+
+    """
+    enabled = BoolProperty(title='Enabled', default=False)
+    window = TimeDeltaProperty(title='Window', default={"minutes": 5})
+    max_ids = IntProperty(title='Max Remembered IDs', default=100000)
+
+
+class DecodePool(PropertyHolder):
+
+    """ Property holder for decoding messages on worker processes.
+
+    """
+    workers = IntProperty(title='Worker Processes', default=0)
+    batch_size = IntProperty(title='Batch Size', default=100)
+    max_delay = TimeDeltaProperty(title='Max Batch Delay',
+                                  default={"milliseconds": 50})
+
+
+class WriteAheadSpool(PropertyHolder):
+
+    """ Property holder for logging buffered signals to disk until they
+    are notified.
+
+    """
+    enabled = BoolProperty(title='Enabled', default=False)
+    directory = StringProperty(title='Directory', default='wal')
+    sync_interval = TimeDeltaProperty(title='Sync Interval',
+                                      default={"seconds": 1})
+
+
+class FlushPolicy(PropertyHolder):
+
+    """ Property holder for when buffered signals are notified.
+
+    """
+    max_batch = IntProperty(title='Max Batch Size', default=0)
+    min_interval = TimeDeltaProperty(title='Min Interval',
+                                     default={"seconds": 0})
+
+
+class Recording(PropertyHolder):
+
+    """ Property holder for recording the raw stream or replaying it.
+
+    """
+    mode = SelectProperty(RecordingMode, default=RecordingMode.off,
+                          title='Mode')
+    directory = StringProperty(title='Directory', default='recordings')
+    max_file_size = IntProperty(title='Max File Size (MB)', default=64)
+    max_files = IntProperty(title='Max Files', default=10)
+    replay_speed = FloatProperty(title='Replay Speed', default=1.0)
+
+
 @not_discoverable
+@command("stats")
 class TwitterStreamBlock(GeneratorBlock):
 
     """ A parent block for communicating with the Twitter Streaming API.
@@ -41,10 +141,36 @@ class TwitterStreamBlock(GeneratorBlock):
         fields (list(str)): Outgoing signals will pull these fields
             from incoming tweets. When empty/unset, all fields are
             included.
-        notify_freq (timedelta): The interval between signal notifications.
+        notify_freq (timedelta): The longest a signal is buffered before
+            it is notified.
         creds: Twitter app credentials, see above. Defaults to global settings.
         rc_interval (timedelta): Time to wait between receipts (either tweets
             or hearbeats) before attempting to reconnect to Twitter Streaming.
+        backoff: How long to wait between reconnect attempts, doubling
+            up to a maximum with some jitter, see above.
+        json_decoder (JSONDecoder): The JSON library used to decode messages.
+            `auto` uses the fastest one installed.
+        project_fields (bool): Only materialize the configured fields of
+            each tweet instead of decoding it in full.
+        buffer_limits: Caps on the signals buffered per output between
+            notifications and what to do when they are reached, see above.
+        engine (StreamEngine): Stream on a dedicated thread, or on an
+            asyncio event loop shared with other Twitter blocks.
+        recording: Record the raw stream to disk, or replay recordings
+            instead of connecting to Twitter, see above.
+        gzip (bool): Ask Twitter to gzip the stream, which is decompressed
+            as it is read.
+        flush_policy: Notify early once enough signals are buffered, and
+            never more often than a minimum interval, see above.
+        dedup: Drop messages whose `id_str` was already seen recently, such
+            as tweets redelivered after a reconnect, see above.
+        latency_stamps (bool): Stamp each signal with the monotonic time its
+            message was read, as the hidden `_ingest_ts` attribute, so
+            downstream blocks can measure end to end latency.
+        decode_pool: Decode messages in batches on worker processes
+            instead of the reading thread, see above.
+        wal: Log buffered signals to disk until they are notified, and
+            notify those left over when the block starts, see above.
 
     """
     notify_freq = TimeDeltaProperty(default={"seconds": 2},
@@ -53,49 +179,258 @@ class TwitterStreamBlock(GeneratorBlock):
                            default=TwitterCreds())
     rc_interval = TimeDeltaProperty(default={"seconds": 90},
                                     title='Reconnect Interval')
-
+    backoff = ObjectProperty(ReconnectBackoff, title='Reconnect Backoff',
+                             default=ReconnectBackoff(), advanced=True)
+    json_decoder = SelectProperty(JSONDecoder, default=JSONDecoder.auto,
+                                  title='JSON Decoder', advanced=True)
+    project_fields = BoolProperty(default=False, title='Project Fields',
+                                  advanced=True)
+    buffer_limits = ObjectProperty(BufferLimits, title='Buffer Limits',
+                                   default=BufferLimits(), advanced=True)
+    engine = SelectProperty(StreamEngine, default=StreamEngine.threaded,
+                            title='Streaming Engine', advanced=True)
+    recording = ObjectProperty(Recording, title='Recording',
+                               default=Recording(), advanced=True)
+    gzip = BoolProperty(default=False, title='Request Gzip', advanced=True)
+    flush_policy = ObjectProperty(FlushPolicy, title='Flush Policy',
+                                  default=FlushPolicy(), advanced=True)
+    dedup = ObjectProperty(Dedup, title='De-duplication', default=Dedup(),
+                           advanced=True)
+    latency_stamps = BoolProperty(default=False, title='Stamp Ingest Time',
+                                  advanced=True)
+    decode_pool = ObjectProperty(DecodePool, title='Decode Pool',
+                                 default=DecodePool(), advanced=True)
+    wal = ObjectProperty(WriteAheadSpool, title='Write-Ahead Spool',
+                         default=WriteAheadSpool(), advanced=True)
+
+    streaming_scheme = 'https'
     streaming_host = None
     streaming_endpoint = None
     verify_url = 'https://api.twitter.com/1.1/account/verify_credentials.json'
 
+    # messages containing one of these keys are never projected
+    notice_keys = ()
+
     def __init__(self):
         super().__init__()
-        self._result_signals = defaultdict(list)
-        self._result_lock = defaultdict(Lock)
-        self._lock_lock = Lock()
+        self._stall_timer = Timer()
+        self._result_signals = ResultBuffers(self._create_result_buffer)
+        self._latency = LatencyHistogram()
         self._stop_event = Event()
         self._stream = None
+        self._frames = None
+        self._async_stream = None
+        self._sharded_stream = None
+        self._recorder = None
+        self._bytes = ByteCounts()
+        self._inflate_timer = Timer()
+        self._rates = StreamRates()
+        self._keep_alive_gaps = LatencyHistogram()
+        self._parse_errors = 0
+        self._parse_errors_lock = Lock()
         self._last_rcv = datetime.utcnow()
-        self._limit_count = 0
+        # each reading thread's shard, if streams are split, the size and
+        # ingest stamp of the frame it is handling, and when its
+        # connection last received anything, for keep-alive gaps
+        self._reader = local()
+        # the last `limit` track count of each shard's connection
+        self._limit_counts = {}
+        self._decoder = None
+        self._decode_timer = Timer()
+        self._recent_ids = None
+        self._lazy = False         # notify frames as LazySignals
+        self._parallel = None      # decodes frames on worker processes
+        self._wal = None           # logs buffered signals until notified
+
+        self._flusher = None       # notifies signals
 
         # Jobs to run throughout execution
-        self._notify_job = None    # notifies signals
         self._monitor_job = None   # checks for heartbeats
         self._rc_job = None        # attempts reconnects
-        self._rc_delay = timedelta(seconds=1)
+        self._backoff = Backoff()
+        self._oauth = None         # (consumer, token, signature method)
 
     def start(self):
         super().start()
-        self._authorize()
-        self._start()
-        spawn(self._run_stream)
-        self._notify_job = Job(
-            self._notify_results,
-            self.notify_freq(),
-            True
-        )
+        self._backoff = Backoff(self.backoff().initial().total_seconds(),
+                                self.backoff().maximum().total_seconds(),
+                                self.backoff().jitter())
+        self._oauth = None
+        self._latency = LatencyHistogram()
+        self._rates = StreamRates()
+        self._keep_alive_gaps = LatencyHistogram()
+        self._parse_errors = 0
+        self._reader = local()
+        mode = self.recording().mode()
+        shard_params = []
+        if mode != RecordingMode.replay:
+            self._authorize()
+            self._start()
+            shard_params = self.shard_params()
+
+        # shards may match the same tweet, so they are always de-duplicated
+        dedup = self.dedup().enabled() or len(shard_params) > 1
+        if dedup and self.dedup().window().total_seconds() <= 0:
+            self.logger.warning(
+                "Messages are not de-duplicated without a positive window")
+            dedup = False
+        self._decoder = self._create_decoder(dedup)
+        self._recent_ids = None
+        if dedup:
+            self._recent_ids = RecentIds(self.dedup().window().total_seconds(),
+                                         self.dedup().max_ids())
+        self._lazy = self._lazy_signals()
+        if self._lazy and dedup:
+            self.logger.warning(
+                "Signals are decoded eagerly when de-duplicating, every "
+                "message is decoded for its id")
+            self._lazy = False
+        if self._lazy and self.wal().enabled():
+            self.logger.warning(
+                "Signals are decoded eagerly when logged ahead, every "
+                "message is logged as it is read")
+            self._lazy = False
+        self._parallel = None
+        on_event_loop = self.engine() == StreamEngine.asyncio and \
+            mode != RecordingMode.replay and len(shard_params) <= 1
+        if self.decode_pool().workers() > 0:
+            if self._lazy:
+                self.logger.warning(
+                    "Lazy signals are not decoded as they are read, the "
+                    "decode pool is not used")
+            elif on_event_loop:
+                # submitting waits on the pool, which would block the loop
+                self.logger.warning(
+                    "Messages read on the shared event loop are decoded "
+                    "there, the decode pool is not used")
+            else:
+                self._parallel = self._create_parallel_decoder(dedup)
+                self._parallel.start()
+        self._flusher = FlushScheduler(
+            self._flush_results,
+            self.notify_freq().total_seconds(),
+            self.flush_policy().max_batch(),
+            self.flush_policy().min_interval().total_seconds(),
+            self.logger)
+        self._flusher.start()
+        self._wal = None
+        if self.wal().enabled():
+            self._wal = self._open_wal()
+
+        if mode == RecordingMode.replay:
+            spawn(self._run_replay)
+        elif len(shard_params) > 1:
+            if mode == RecordingMode.record:
+                self.logger.warning(
+                    "Streams split across connections are not recorded")
+            if self.engine() == StreamEngine.asyncio:
+                self.logger.warning(
+                    "Each connection streams on its own thread when split")
+            self._sharded_stream = ShardedStream(self, shard_params)
+            self._sharded_stream.start()
+        else:
+            if mode == RecordingMode.record:
+                self._recorder = StreamRecorder(
+                    self.recording().directory(),
+                    self._recording_prefix(),
+                    self.recording().max_file_size() * 1024 * 1024,
+                    self.recording().max_files())
+            if on_event_loop:
+                self._async_stream = AsyncStream(self)
+                self._async_stream.start()
+            else:
+                spawn(self._run_stream)
 
     def _start(self):
         """ Override in blocks that need to run code before start """
         pass
 
+    def _open_wal(self):
+        """ Open the write-ahead log and buffer the signals a previous run
+        left in it, ahead of anything streamed.
+
+        """
+        wal = WriteAheadLog(self.wal().directory(), self._recording_prefix(),
+                            self.wal().sync_interval().total_seconds(),
+                            self.logger)
+        replayed = 0
+        for output, signal in wal.replay():
+            self._result_signals[output].append(signal)
+            self._flusher.added()
+            replayed += 1
+        if replayed:
+            self.logger.info(
+                "Notifying {} signals buffered before the block last "
+                "stopped".format(replayed))
+        wal.start()
+        return wal
+
+    def _create_decoder(self, dedup=False):
+        fields = self._decoded_fields(self.project_fields(), dedup)
+        try:
+            decoder = Decoder(self.json_decoder(), fields, self.notice_keys)
+        except ValueError as e:
+            self.logger.warning("{}, falling back to auto".format(e))
+            decoder = Decoder(JSONDecoder.auto, fields, self.notice_keys)
+        self.logger.debug(
+            "Decoding messages with {}".format(decoder.backend.name))
+        return decoder
+
+    def _create_parallel_decoder(self, dedup=False):
+        pool = self.decode_pool()
+        # workers filter fields as they decode so only those are sent back
+        fields = self._decoded_fields(True, dedup)
+        self.logger.debug(
+            "Decoding messages on {} worker processes".format(pool.workers()))
+        return ParallelDecoder(
+            self._record_decoded,
+            (self._decoder.backend, fields, self.notice_keys),
+            pool.workers(), pool.batch_size(),
+            pool.max_delay().total_seconds(), self.logger)
+
+    def _decoded_fields(self, project, dedup=False):
+        """ The fields decoders materialize, None for every field """
+        fields = self.projected_fields() if project else None
+        if fields and dedup and 'id_str' not in fields:
+            # dedup needs the id even when it is not notified
+            fields = list(fields) + ['id_str']
+        return fields
+
+    def projected_fields(self):
+        """ Override in blocks that only need some fields of each message.
+
+        Fields may be dotted paths into nested objects. Returning an empty
+        list decodes messages in full.
+        """
+        return []
+
     def stop(self):
         self._stop_event.set()
-        self._notify_job.cancel()
+        if self._sharded_stream is not None:
+            self._sharded_stream.stop()
+            self._sharded_stream = None
+        if self._async_stream is not None:
+            self._async_stream.stop()
+            self._async_stream = None
+        if self._parallel is not None:
+            self._parallel.stop()
+            self._parallel = None
+        if self._recorder is not None:
+            self._recorder.close()
+        self._recorder = None
+        self._bytes = ByteCounts()
+        self._inflate_timer = Timer()
+        if self._flusher is not None:
+            self._flusher.stop()
+        if self._wal is not None:
+            self._wal.stop()
+            self._wal = None
         if self._monitor_job is not None:
             self._monitor_job.cancel()
         if self._rc_job is not None:
             self._rc_job.cancel()
+        for buffer in list(self._result_signals.values()):
+            buffer.close()
         super().stop()
 
     def _run_stream(self):
@@ -108,9 +443,10 @@ class TwitterStreamBlock(GeneratorBlock):
         if self._stream:
             self._stream.close()
             self._stream = None
+            self._frames = None
 
         # This is a new stream so reset the limit count
-        self._limit_count = 0
+        self._limit_counts[None] = 0
 
         # Try to connect, if we can't, don't start streaming, but try reconnect
         if not self._connect_to_streaming():
@@ -137,45 +473,42 @@ class TwitterStreamBlock(GeneratorBlock):
     def _read_line(self):
         """Read the next line off of the stream.
 
-        This will first read the length of the line, then read the next
-        N bytes based on the length. It will return the read line if it reads
-        successfully. Otherwise, returns None.
+        Lines are sliced out of the buffered frame reader set up when the
+        stream was opened. It will return the read line if it reads
+        successfully. Keep-alives return None.
 
         Raises:
             Exception: if there was an error reading bytes - this will most
                 likely indicate a disconnection
         """
-        # build the length buffer
-        buf = bytes('', 'utf-8')
-        while not buf or buf[-1] != ord('\n'):
-            bytes_read = self._read_bytes(1)
-            if bytes_read:
-                buf += bytes_read
-            else:
-                raise Exception("No bytes read from stream")
-
-        # checking to see if it's a 'keep-alive'
-        if len(buf) <= 2:
-            # only recieved \r\n so it is a keep-alive. move on.
-            self.logger.debug('Received a keep-alive signal from Twitter.')
-            self._last_rcv = datetime.utcnow()
-            return None
-
-        return self._read_bytes(int(buf))
-
-    def _read_bytes(self, n_bytes):
-        """Read N bytes off of the current stream.
-
-        Returns:
-            len (int): number of bytes actually read - None if no bytes read
-        """
-        bytes_read = self._stream.read(n_bytes)
-        return bytes_read if len(bytes_read) > 0 else None
+        line = self._frames.read_frame()
+        if line is None:
+            self._on_keep_alive()
+        return line
+
+    def _on_keep_alive(self):
+        # only recieved \r\n so it is a keep-alive. move on.
+        self.logger.debug('Received a keep-alive signal from Twitter.')
+        self._last_rcv = datetime.utcnow()
+        now = time.monotonic()
+        last_rcv_ts = getattr(self._reader, 'last_rcv_ts', None)
+        if last_rcv_ts is not None:
+            self._keep_alive_gaps.record(now - last_rcv_ts)
+        self._reader.last_rcv_ts = now
 
     def get_params(self):
         """ Return URL connection parameters here """
         return {}
 
+    def shard_params(self):
+        """ Return the URL connection parameters of each connection.
+
+        Override in blocks that can split their stream across several
+        connections. Returning more than one set of parameters streams
+        each over its own connection and reader thread.
+        """
+        return [self.get_params()]
+
     def _connect_to_streaming(self):
         """Set up a connection to the Twitter Streaming API.
 
@@ -189,35 +522,7 @@ class TwitterStreamBlock(GeneratorBlock):
         """
 
         try:
-            self._conn = http.client.HTTPSConnection(
-                host=self.streaming_host,
-                timeout=45)
-
-            req_headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Accept': '*/*'
-            }
-
-            conn_url = 'https://{0}/{1}'.format(
-                self.streaming_host,
-                self.streaming_endpoint)
-
-            # get the signed request with the proper oauth creds
-            req = self._get_oauth_request(conn_url, self.get_params())
-
-            self.logger.debug("Connecting to {0}".format(conn_url))
-
-            if self.get_request_method() == "POST":
-                self._conn.request(self.get_request_method(),
-                                   conn_url,
-                                   body=req.to_postdata(),
-                                   headers=req_headers)
-            else:
-                self._conn.request(self.get_request_method(),
-                                   req.to_url(),
-                                   headers=req_headers)
-
-            response = self._conn.getresponse()
+            self._conn, response = self._open_connection(self.get_params())
 
             if response.status != 200:
                 self.logger.warning(
@@ -231,10 +536,9 @@ class TwitterStreamBlock(GeneratorBlock):
                 if self._rc_job is not None:
                     self.logger.error("We were reconnecting, now we're done!")
                     self._rc_job.cancel()
-                    self._rc_delay = timedelta(seconds=1)
                     self._rc_job = None
 
-                self._last_rcv = datetime.utcnow()
+                self._on_connected()
 
                 self._monitor_job = Job(
                     self._monitor_connection,
@@ -243,6 +547,7 @@ class TwitterStreamBlock(GeneratorBlock):
                 )
 
                 self._stream = response
+                self._frames = self._frame_reader(response)
                 # Return true, we are connected!
                 return True
 
@@ -250,17 +555,161 @@ class TwitterStreamBlock(GeneratorBlock):
             self.logger.error('Error opening connection : {0}'.format(e))
             return False
 
+    def _open_connection(self, params, timeout=45):
+        """Send a signed streaming request with the given parameters.
+
+        Returns
+            (connection, response): The HTTP connection and its response,
+                whatever its status.
+        """
+        if self.streaming_scheme == 'https':
+            connection_class = http.client.HTTPSConnection
+        else:
+            connection_class = http.client.HTTPConnection
+        conn = connection_class(host=self.streaming_host, timeout=timeout)
+
+        req_headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': '*/*'
+        }
+        if self.gzip():
+            req_headers['Accept-Encoding'] = 'deflate, gzip'
+
+        conn_url = '{0}://{1}/{2}'.format(
+            self.streaming_scheme,
+            self.streaming_host,
+            self.streaming_endpoint)
+
+        # get the signed request with the proper oauth creds
+        req = self._get_oauth_request(conn_url, params)
+
+        self.logger.debug("Connecting to {0}".format(conn_url))
+
+        if self.get_request_method() == "POST":
+            conn.request(self.get_request_method(),
+                         conn_url,
+                         body=req.to_postdata(),
+                         headers=req_headers)
+        else:
+            conn.request(self.get_request_method(),
+                         req.to_url(),
+                         headers=req_headers)
+
+        return conn, conn.getresponse()
+
+    def _frame_reader(self, response):
+        """Return a FrameReader over a streaming response that decompresses,
+        counts and records what it reads"""
+        if self._is_compressed(response.getheader('Content-Encoding')):
+            readinto = self._create_inflater().reader(response.read1)
+        else:
+            readinto = self._count_wire_bytes(response.readinto1)
+        return FrameReader(self._tee_reads(readinto))
+
     def _setup_reconnect_attempt(self):
-        """Add the reconnection job and double the delay for the next one"""
+        """Add the reconnection job, backing off further for the next one"""
         if self._monitor_job is not None:
             self._monitor_job.cancel()
 
+        delay = self._next_rc_delay()
         self.logger.debug(
-            "Reconnecting in {} seconds".format(self._rc_delay.total_seconds())
+            "Reconnecting in {} seconds".format(delay.total_seconds())
         )
-        self._rc_job = Job(self._run_stream,
-                           self._rc_delay, False)
-        self._rc_delay *= 2
+        self._rc_job = Job(self._run_stream, delay, False)
+
+    def _next_rc_delay(self):
+        """Return the delay before the next reconnect attempt"""
+        return timedelta(seconds=self._backoff.next_delay())
+
+    def _on_connected(self):
+        """Reset the reconnect backoff and heartbeat once connected"""
+        self._backoff.reset()
+        self._last_rcv = datetime.utcnow()
+        self._reader.last_rcv_ts = time.monotonic()
+        if self._recorder is not None:
+            self._recorder.new_connection()
+
+    def _is_compressed(self, content_encoding):
+        return (content_encoding or '').lower() in ('gzip', 'deflate')
+
+    def _create_inflater(self):
+        self.logger.debug('Decompressing the stream')
+        return Inflater(self._bytes, self._inflate_timer)
+
+    def _count_wire_bytes(self, readinto):
+        """Wrap an uncompressed stream's readinto to count its bytes"""
+        def counted(buf):
+            n_bytes = readinto(buf)
+            self._bytes.add_wire(n_bytes)
+            return n_bytes
+        return counted
+
+    def _tee_reads(self, readinto):
+        """Wrap a stream's readinto so what it reads is counted and
+        recorded"""
+        def tee(buf):
+            n_bytes = readinto(buf)
+            if n_bytes:
+                self._tee(buf[:n_bytes])
+            return n_bytes
+        return tee
+
+    def _tee(self, data):
+        """Count data read off the stream, and record it when recording is
+        on. Compressed streams are counted and recorded decompressed.
+
+        """
+        self._bytes.add_stream(len(data))
+        if self._recorder is not None:
+            self._recorder.write(data)
+
+    def _recording_prefix(self):
+        return re.sub(r'[^\w.-]', '_', self.name())
+
+    def _run_replay(self):
+        """ Feed recorded streams back through `_record_line` in place of
+        a connection, at the configured multiple of their recorded speed.
+        A replay speed of 0 replays as fast as possible.
+
+        """
+        paths = recordings(self.recording().directory(),
+                           self._recording_prefix())
+        if not paths:
+            self.logger.warning("No recordings found to replay")
+            return
+
+        speed = self.recording().replay_speed()
+        self.logger.info("Replaying {} recordings at {}".format(
+            len(paths), "{}x".format(speed) if speed > 0 else "max speed"))
+        parser = FrameParser()
+        frames = 0
+        first = None
+        start = time.monotonic()
+        for timestamp, data in read_recordings(paths, self.logger):
+            if first is None:
+                first = timestamp
+            if speed > 0:
+                delay = (timestamp - first) / speed - \
+                    (time.monotonic() - start)
+                if delay > 0 and self._stop_event.wait(delay):
+                    return
+            if self._stop_event.is_set():
+                return
+            if not data:
+                # a new connection, drop any partial frame
+                parser = FrameParser()
+                continue
+            for frame in parser.feed(data):
+                if frame is None:
+                    self._on_keep_alive()
+                else:
+                    self._record_line(frame)
+                    frames += 1
+
+        elapsed = time.monotonic() - start
+        self.logger.info(
+            "Replayed {} frames in {:.2f} seconds ({:.0f} frames/sec)".format(
+                frames, elapsed, frames / elapsed if elapsed else 0))
 
     def get_request_method(self):
         return "GET"
@@ -277,57 +726,222 @@ class TwitterStreamBlock(GeneratorBlock):
                             url=conn_url,
                             parameters=request_params)
 
-        req.sign_request(
-            signature_method=oauth.SignatureMethod_HMAC_SHA1(),
-            consumer=oauth.Consumer(
-                self.creds().consumer_key(), self.creds().app_secret()),
-            token=oauth.Token(
-                self.creds().oauth_token(), self.creds().oauth_token_secret())
-        )
+        consumer, token, signature_method = self._oauth_signing()
+        req.sign_request(signature_method=signature_method,
+                         consumer=consumer, token=token)
 
         return req
 
+    def _oauth_signing(self):
+        """Return the consumer, token and signature method used to sign
+        requests, built once and reused across reconnects.
+
+        """
+        if self._oauth is None:
+            self._oauth = (
+                oauth.Consumer(self.creds().consumer_key(),
+                               self.creds().app_secret()),
+                oauth.Token(self.creds().oauth_token(),
+                            self.creds().oauth_token_secret()),
+                oauth.SignatureMethod_HMAC_SHA1()
+            )
+        return self._oauth
+
     def _record_line(self, line):
         """ Decode the line and add it to the end of the list """
         try:
             # reset the last received timestamp
             self._last_rcv = datetime.utcnow()
-            data = json.loads(line.decode('utf-8'))
+            self._reader.last_rcv_ts = now = time.monotonic()
+            frame_len = len(line)
+            self._rates.record(frame_len, now)
+            ingest_ts = now if self.latency_stamps() else None
+            if self._parallel is not None:
+                # handed back to _record_decoded once decoded
+                self._parallel.submit(line, (frame_len, ingest_ts))
+                return
+            self._reader.frame = (frame_len, ingest_ts)
+            if self._lazy and self.create_lazy_signal(line):
+                return
+            start = time.perf_counter()
+            data = self._decoder.decode(line)
+            self._decode_timer.record(time.perf_counter() - start)
+            if self._is_duplicate(data):
+                return
             self.create_signal(data)
         except Exception as e:
-            self.logger.error("Could not parse line: %s" % str(e))
+            self._parse_error(e)
+
+    def _parse_error(self, error):
+        with self._parse_errors_lock:
+            self._parse_errors += 1
+        self.logger.error("Could not parse line: %s" % str(error))
+
+    def _record_decoded(self, data, error, context):
+        """ Handle a message decoded by the decode pool, on its dispatch
+        thread, in the order messages were read.
+
+        """
+        if error is not None:
+            self._parse_error(error)
+            return
+        self._reader.frame = context
+        try:
+            if self._is_duplicate(data):
+                return
+            self.create_signal(data)
+        except Exception as e:
+            self._parse_error(e)
+
+    def _is_duplicate(self, data):
+        """ Check whether a message was already seen when dedup is on.
+        Messages without an `id_str`, like notices, are never duplicates.
+
+        """
+        if self._recent_ids is None or not isinstance(data, dict):
+            return False
+        message_id = data.get('id_str')
+        return message_id is not None and \
+            not self._recent_ids.add(message_id)
 
     def create_signal(self, data):
         """ Override this method in the block implementation
 
-        Append the new Signal to appropriate list in the dictionary
-        `self._result_signals`, where the key is the name of the block output.
-        Below is an example implementation, meant to be overridden.
+        Queue the new Signal on the appropriate block output with
+        `self._enqueue`, which buffers it in `self._result_signals` until the
+        next notification. Below is an example implementation, meant to be
+        overridden.
         """
         self.logger.debug("Default message type")
         data = self.filter_results(data)
         if data:
-            with self._get_result_lock('default'):
-                self._result_signals['default'].append(Signal(data))
+            self._enqueue('default', Signal(data))
 
-    def _get_result_lock(self, key):
-        with self._lock_lock:
-            return self._result_lock[key]
+    def _lazy_signals(self):
+        """ Override in blocks that can notify messages as LazySignals,
+        returning whether they should.
+
+        """
+        return False
+
+    def create_lazy_signal(self, line):
+        """ Override in blocks that return True from `_lazy_signals`
+
+        Queue a LazySignal over the raw frame with `self._enqueue` and
+        return True, or return False to have the frame decoded and passed
+        to `create_signal` as usual.
+        """
+        return False
+
+    def _enqueue(self, output, signal):
+        """ Buffer a signal to be notified on an output, sized and stamped
+        by the frame the current thread is handling.
+
+        """
+        frame_len, ingest_ts = getattr(self._reader, 'frame', (0, None))
+        if ingest_ts is not None:
+            setattr(signal, INGEST_ATTR, ingest_ts)
+        self._result_signals[output].append(signal, frame_len)
+        wal = self._wal
+        if wal is not None:
+            wal.append(output, signal)
+        if self._flusher is not None:
+            self._flusher.added()
+
+    def _create_result_buffer(self, output):
+        limits = self.buffer_limits()
+        if not limits.max_signals() and not limits.max_bytes():
+            return ResultBuffer(self._stall_timer)
+        spool = None
+        if limits.policy() == OverflowPolicy.spill:
+            spool = Spool(os.path.join(
+                limits.spool_dir() or tempfile.gettempdir(),
+                '{}_{}.spool'.format(self.id(), output)))
+        return BoundedResultBuffer(limits.max_signals(), limits.max_bytes(),
+                                   limits.policy(), spool, self._stall_timer)
 
     def filter_results(self, data):
         return data
 
+    def _flush_results(self):
+        """ Notify buffered signals for the flush scheduler and return how
+        many were held back for a later batch.
+
+        """
+        self._notify_results()
+        return sum(buffer.backlog
+                   for buffer in list(self._result_signals.values()))
+
     def _notify_results(self):
-        """Method to be called from the notify job, will notify any tweets
-        that have been buffered by the block, then clear the buffer.
+        """Notify any tweets that have been buffered by the block, then
+        clear the buffer.
 
         """
-        for output in self._result_signals:
-            with self._get_result_lock(output):
-                signals = self._result_signals[output]
-                if signals:
-                    self.notify_signals(signals, output)
-                    self._result_signals[output] = []
+        # everything logged so far is in a buffer and is notified below
+        wal = self._wal
+        mark = wal.mark() if wal is not None else None
+        for output, buffer in list(self._result_signals.items()):
+            signals = buffer.swap()
+            if signals:
+                if self.latency_stamps():
+                    self._latency.record_signals(signals)
+                self.notify_signals(signals, output)
+            self._report_overflow(output, buffer)
+        # spooled signals are still to be notified, so are kept logged
+        if mark is not None and not any(
+                buffer.backlog
+                for buffer in list(self._result_signals.values())):
+            wal.release(mark)
+
+    def _report_overflow(self, output, buffer):
+        """ Notify a management signal when an output dropped or spilled
+        signals since the last notification.
+
+        """
+        dropped, spilled = buffer.take_overflow()
+        if dropped or spilled:
+            self.logger.warning(
+                "Output {} over its buffer limits, dropped {} and spilled {} "
+                "signals".format(output, dropped, spilled))
+            self.notify_management_signal(Signal({
+                'output': output,
+                'dropped': dropped,
+                'spilled': spilled,
+                'total_dropped': buffer.dropped,
+                'total_spilled': buffer.spilled
+            }))
+
+    def stats(self):
+        """ Command that returns the streaming metrics of the block """
+        reconnects = self._backoff.reconnect_timer.count
+        if self._sharded_stream is not None:
+            reconnects += self._sharded_stream.reconnects
+        return {
+            'stream': self._rates.to_dict(),
+            'keep_alive_gaps': self._keep_alive_gaps.to_dict(),
+            'parse_errors': self._parse_errors,
+            'reconnects': reconnects,
+            'limit_cumulative_count': sum(list(self._limit_counts.values())),
+            'decoder': self._decoder.backend.name if self._decoder else None,
+            'decode': self._decode_timer.to_dict(),
+            'reader_stall': self._stall_timer.to_dict(),
+            'bytes': self._bytes.to_dict(),
+            'decompress': self._inflate_timer.to_dict(),
+            'reconnect': self._backoff.to_dict(),
+            'dedup': self._recent_ids.to_dict()
+            if self._recent_ids is not None else None,
+            'shards': self._sharded_stream.to_dict()
+            if self._sharded_stream is not None else None,
+            'latency': self._latency.to_dict(),
+            'wal': self._wal.to_dict() if self._wal is not None else None,
+            'buffers': {
+                output: {
+                    'depth': len(buffer),
+                    'dropped': buffer.dropped,
+                    'spilled': buffer.spilled
+                } for output, buffer in list(self._result_signals.items())
+            }
+        }
 
     def _monitor_connection(self):
         """ Scheduled to run every self.rc_interval. Makes sure that some
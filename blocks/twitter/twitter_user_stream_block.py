@@ -14,14 +14,15 @@ class TwitterUserStream(TwitterStreamBlock):
     interface at a configurable interval.
 
     Properties:
-        notify_freq (timedelta): The interval between signal notifications.
+        notify_freq (timedelta): The longest a signal is buffered before
+            it is notified.
         creds: Twitter app credentials, see above. Defaults to global settings.
         rc_interval (timedelta): Time to wait between receipts (either tweets
             or hearbeats) before attempting to reconnect to Twitter Streaming.
 
     """
 
-    version = VersionProperty("2.0.0")
+    version = VersionProperty("2.1.0")
     only_user = BoolProperty(title="Only User Information", default=True)
     show_friends = BoolProperty(title="Include Friends List", default=False)
 
@@ -53,11 +54,9 @@ class TwitterUserStream(TwitterStreamBlock):
     def create_signal(self, data):
         if data and 'event' in data:
             self.logger.debug('Event message')
-            with self._get_result_lock('events'):
-                self._result_signals['events'].append(Signal(data))
+            self._enqueue('events', Signal(data))
         else:
             self.logger.debug('Other message')
             data = self.filter_results(data)
             if data:
-                with self._get_result_lock('other'):
-                    self._result_signals['other'].append(Signal(data))
+                self._enqueue('other', Signal(data))
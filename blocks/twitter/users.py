@@ -0,0 +1,141 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# users/lookup accepts up to 100 screen names per request
+LOOKUP_BATCH_SIZE = 100
+
+
+class UserIdCache(object):
+
+    """ A screen name to user id mapping persisted to a JSON file.
+
+    Entries older than the TTL are treated as missing so renamed or
+    deleted accounts are eventually looked up again. The file is replaced
+    atomically when saved, so blocks sharing it never read a partial one.
+
+    Args:
+        path (str): The cache file.
+        ttl (float): Seconds an entry stays valid.
+
+    """
+
+    def __init__(self, path, ttl):
+        self._path = path
+        self._ttl = ttl
+        self._lock = Lock()
+        self._entries = self._load()
+
+    def get(self, screen_names):
+        """ Split screen names into cached ids and names to look up.
+
+        Returns:
+            (dict, list): Cached ids by screen name and the screen names
+                that are missing or expired.
+        """
+        now = time.time()
+        found = {}
+        missing = []
+        with self._lock:
+            for name in screen_names:
+                entry = self._entries.get(name.lower())
+                if entry is not None and now - entry[1] < self._ttl:
+                    found[name] = entry[0]
+                else:
+                    missing.append(name)
+        return found, missing
+
+    def update(self, ids):
+        """ Cache ids by screen name and save the file """
+        now = time.time()
+        with self._lock:
+            for name, user_id in ids.items():
+                self._entries[name.lower()] = [user_id, now]
+            self._save()
+
+    def _load(self):
+        try:
+            with open(self._path) as cache:
+                return json.load(cache)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = '{}.{}.tmp'.format(self._path, os.getpid())
+        with open(tmp, 'w') as cache:
+            json.dump(self._entries, cache)
+        os.replace(tmp, self._path)
+
+
+def lookup_user_ids(endpoint, auth, screen_names, concurrency=4,
+                    logger=None):
+    """ Resolve screen names to user ids with `users/lookup`.
+
+    Names are looked up in batches of 100, with up to `concurrency`
+    batches in flight at once over a pooled session. Batches that fail,
+    or whose response is not a list of users, are logged and skipped.
+
+    Returns:
+        dict: User ids by screen name, for the users that were found.
+    """
+    batches = [screen_names[i:i + LOOKUP_BATCH_SIZE]
+               for i in range(0, len(screen_names), LOOKUP_BATCH_SIZE)]
+    if not batches:
+        return {}
+    workers = max(1, min(concurrency, len(batches)))
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.auth = auth
+
+        def lookup(batch):
+            try:
+                resp = session.post(
+                    endpoint, data={"screen_name": ','.join(batch)})
+            except requests.RequestException as e:
+                if logger is not None:
+                    logger.warning("User lookup failed: {}".format(e))
+                return []
+            if resp.status_code != 200:
+                if logger is not None:
+                    logger.warning("User lookup returned status {}".format(
+                        resp.status_code))
+                return []
+            try:
+                users = resp.json()
+            except ValueError as e:
+                if logger is not None:
+                    logger.warning(
+                        "User lookup returned an unreadable body: {}".format(
+                            e))
+                return []
+            if not isinstance(users, list):
+                if logger is not None:
+                    logger.warning(
+                        "User lookup returned {} instead of users".format(
+                            users))
+                return []
+            return users
+
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(lookup, batches))
+
+    # match names case insensitively, as Twitter does
+    requested = {name.lower(): name for name in screen_names}
+    ids = {}
+    for users in results:
+        for user in users:
+            name = requested.get((user.get('screen_name') or '').lower())
+            if name is not None and user.get('id_str') is not None:
+                ids[name] = user['id_str']
+    return ids
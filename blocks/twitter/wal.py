@@ -0,0 +1,206 @@
+import glob
+import json
+import os
+from threading import Event, Lock, Thread
+from time import perf_counter
+
+from nio.signal.base import Signal
+
+from .metrics import Timer
+
+
+class WriteAheadLog(object):
+
+    """ Logs buffered signals to disk until they are notified, so those
+    still buffered when the block stops or crashes are notified after it
+    starts again.
+
+    Appending serializes a signal as it is then and queues the record in
+    memory, so what is logged is not changed by blocks the signal is later
+    notified to. A writer thread writes what was queued in one go and
+    fsyncs every `sync_interval`, so the reading thread never waits on the
+    disk. A crash loses at most the signals of the last interval. Records
+    that fail to write are queued again and retried on the next interval.
+
+    The log is split into numbered segment files. Before buffered signals
+    are notified, `mark` starts a new segment, and once they have been
+    notified `release` deletes the segments before it, since everything
+    logged in them was in a buffer when it was swapped out. Signals
+    notified after the last release are logged again on the next start,
+    so delivery is at least once.
+
+    Args:
+        directory (str): Where segment files are written.
+        prefix (str): The start of every segment file name.
+        sync_interval (float): Seconds between writes to disk.
+        logger: Where write errors and unreadable records are logged.
+
+    """
+
+    def __init__(self, directory, prefix, sync_interval=1, logger=None):
+        self._directory = directory
+        self._prefix = prefix
+        self._sync_interval = sync_interval
+        self._logger = logger
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._thread = None
+        # serialized records, one line each
+        self._pending = []
+        # (segment, records) swapped out by mark and not yet written
+        self._batches = []
+        self._segment = 0
+        self._released = 0
+        self.records = 0
+        self.sync_timer = Timer()
+        os.makedirs(directory, exist_ok=True)
+        self._segments = self._existing_segments()
+        if self._segments:
+            self._segment = max(self._segments) + 1
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name='TwitterWAL',
+                              daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Write everything still queued and stop the writer """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def replay(self):
+        """ Yield the (output, signal) records left by a previous run, in
+        the order they were logged.
+
+        """
+        for segment in sorted(self._segments):
+            if segment >= self._segment:
+                break
+            with open(self._segments[segment], 'rb') as log:
+                for line in log:
+                    try:
+                        output, attrs = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        # the last record of a crash may be cut short
+                        if self._logger is not None:
+                            self._logger.warning(
+                                "Skipping an unreadable record in {}".format(
+                                    self._segments[segment]))
+                        continue
+                    yield output, Signal(attrs)
+
+    def append(self, output, signal):
+        """ Queue a signal that was buffered on an output """
+        record = json.dumps([output, signal.to_dict()],
+                            default=str).encode('utf-8') + b'\n'
+        with self._lock:
+            self._pending.append(record)
+
+    def mark(self):
+        """ Start a new segment, returning it to `release` once everything
+        buffered so far has been notified.
+
+        """
+        with self._lock:
+            if self._pending:
+                self._batches.append((self._segment, self._pending))
+                self._pending = []
+            self._segment += 1
+            return self._segment
+
+    def release(self, segment):
+        """ Forget every signal logged before `segment` was marked """
+        with self._lock:
+            self._released = max(self._released, segment)
+
+    def _run(self):
+        while not self._stop_event.wait(self._sync_interval):
+            self._try_write()
+        self._try_write()
+
+    def _try_write(self):
+        try:
+            self._write()
+        except Exception as e:
+            if self._logger is not None:
+                self._logger.error(
+                    "Could not write the write-ahead log: {}".format(e))
+
+    def _write(self):
+        with self._lock:
+            batches = self._batches
+            self._batches = []
+            if self._pending:
+                batches.append((self._segment, self._pending))
+                self._pending = []
+            released = self._released
+
+        start = perf_counter()
+        written = 0
+        for i, (segment, records) in enumerate(batches):
+            if segment < released:
+                # notified before it was written
+                continue
+            path = self._segments.get(segment) or self._path(segment)
+            try:
+                self._append_records(path, records)
+            except Exception:
+                # keep what was not written for the next try
+                with self._lock:
+                    self._batches[:0] = batches[i:]
+                raise
+            self._segments[segment] = path
+            written += len(records)
+        if written:
+            self.records += written
+            self.sync_timer.record(perf_counter() - start)
+
+        for segment in [s for s in self._segments if s < released]:
+            try:
+                os.remove(self._segments.pop(segment))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _append_records(path, records):
+        with open(path, 'ab') as log:
+            end = log.tell()
+            try:
+                log.write(b''.join(records))
+                log.flush()
+                os.fsync(log.fileno())
+            except Exception:
+                # a partly written batch would garble the retry
+                try:
+                    log.truncate(end)
+                except OSError:
+                    pass
+                raise
+
+    def _path(self, segment):
+        return os.path.join(self._directory, '{}-{:010d}.wal'.format(
+            self._prefix, segment))
+
+    def _existing_segments(self):
+        segments = {}
+        pattern = '{}-*.wal'.format(glob.escape(self._prefix))
+        for path in glob.glob(os.path.join(self._directory, pattern)):
+            try:
+                segments[int(path[:-len('.wal')].rsplit('-', 1)[1])] = path
+            except ValueError:
+                continue
+        return segments
+
+    def to_dict(self):
+        with self._lock:
+            queued = len(self._pending) + sum(
+                len(records) for _, records in self._batches)
+        return {
+            'records': self.records,
+            'queued': queued,
+            'segments': len(self._segments),
+            'sync': self.sync_timer.to_dict()
+        }